@@ -0,0 +1,158 @@
+# arc_client.py — Thin command-line client for the resident assistant daemon (daemon.py)
+#
+# Only the standard library is imported, so a command costs inference time,
+# not the tens of seconds torch, XTTS and Whisper take to load:
+#   python arc_client.py ask "How deep should a compost pile be?" [-o reply.wav]
+#   python arc_client.py speak "Hello from ARC" -o hello.wav [--voice samples/mike_boudet.wav]
+#   python arc_client.py transcribe question.wav
+#   python arc_client.py status | shutdown
+# Start the daemon first (python daemon.py), or pass --start to launch it in
+# the background when it is not running.
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# ARC_DAEMON_SOCKET sets where the daemon listens and the client connects (default: cache/ next to this file)
+SOCKET_PATH   = os.environ.get("ARC_DAEMON_SOCKET",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "daemon.sock"))
+START_TIMEOUT = 60    # Seconds --start waits for a new daemon to listen
+
+
+class DaemonUnavailable(ConnectionError):
+    pass
+
+
+def connect(path=SOCKET_PATH):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        sock.close()
+        raise DaemonUnavailable(f"No daemon listening on {path}") from e
+    return sock
+
+
+def request(message, path=SOCKET_PATH):
+    """Send one request; yields the daemon's replies up to the one marked done."""
+    with connect(path) as sock:
+        sock.sendall((json.dumps(message) + "\n").encode())
+        with sock.makefile("r", encoding="utf-8") as replies:
+            for line in replies:
+                reply = json.loads(line)
+                yield reply
+                if reply.get("done"):
+                    return
+    raise DaemonUnavailable("The daemon closed the connection before answering")
+
+
+def call(message, path=SOCKET_PATH, on_token=None):
+    """Send one request and return the final reply; raises RuntimeError if the daemon reports one."""
+    for reply in request(message, path):
+        if "token" in reply and on_token is not None:
+            on_token(reply["token"])
+        if reply.get("error"):
+            raise RuntimeError(reply["error"])
+        if reply.get("done"):
+            return reply
+
+
+def speak(text, out, ref_wav=None, session="cli", path=SOCKET_PATH, start=True):
+    """Have the daemon speak `text` into the WAV file `out`, cloning `ref_wav` if given; returns its reply."""
+    message = {"op": "speak", "text": text, "out": os.path.abspath(out), "session": session}
+    if ref_wav:
+        message["ref_wav"] = os.path.abspath(ref_wav)
+    ensure_daemon(path, start)
+    return call(message, path)
+
+
+def ensure_daemon(path=SOCKET_PATH, start=False):
+    """Raise DaemonUnavailable unless a daemon listens on `path`; with `start`, launch one instead."""
+    try:
+        connect(path).close()
+    except DaemonUnavailable:
+        if not start:
+            raise
+        print("⏳ Starting the assistant daemon...", file=sys.stderr)
+        start_daemon(path)
+
+
+def start_daemon(path=SOCKET_PATH, timeout=START_TIMEOUT):
+    """Launch daemon.py in the background (log next to the socket) and wait until it listens."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "daemon.py")
+    log_path = Path(path).with_suffix(".log")
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "a") as log:
+        proc = subprocess.Popen([sys.executable, script, "--socket", str(path)], stdin=subprocess.DEVNULL,
+                                stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise DaemonUnavailable(f"The daemon exited during start-up (see {log_path})")
+        try:
+            connect(path).close()
+            return
+        except DaemonUnavailable:
+            time.sleep(0.2)
+    raise DaemonUnavailable(f"The daemon did not start listening within {timeout}s (see {log_path})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Talk to the resident assistant daemon")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Daemon socket path")
+    parser.add_argument("--session", default="cli", help="Conversation/voice session on the daemon")
+    parser.add_argument("--start", action="store_true", help="Start the daemon if it is not running")
+    commands = parser.add_subparsers(dest="op", required=True)
+    ask = commands.add_parser("ask", help="Ask a question; the answer streams to stdout")
+    ask.add_argument("text")
+    ask.add_argument("-o", "--out", type=Path, help="Also speak the answer into this WAV file")
+    speak = commands.add_parser("speak", help="Speak text into a WAV file")
+    speak.add_argument("text")
+    speak.add_argument("-o", "--out", type=Path, default=Path("speech.wav"))
+    speak.add_argument("--voice", type=Path, help="Clone the voice of this reference WAV (kept for the session)")
+    transcribe = commands.add_parser("transcribe", help="Transcribe a WAV file")
+    transcribe.add_argument("path", type=Path)
+    commands.add_parser("status", help="Show pools, sessions and loaded models")
+    commands.add_parser("shutdown", help="Stop the daemon")
+    args = parser.parse_args()
+
+    # The daemon resolves paths in its own working directory, so send absolute ones
+    message = {"op": args.op, "session": args.session}
+    if args.op in ("ask", "speak"):
+        message["text"] = args.text
+        if args.out:
+            message["out"] = str(args.out.resolve())
+        if getattr(args, "voice", None):
+            message["ref_wav"] = str(args.voice.resolve())
+    elif args.op == "transcribe":
+        message["path"] = str(args.path.resolve())
+
+    try:
+        ensure_daemon(args.socket, start=args.start and args.op != "shutdown")
+        reply = call(message, args.socket, on_token=lambda token: print(token, end="", flush=True))
+    except DaemonUnavailable as e:
+        print(f"❌ {e} — start it with: python daemon.py (or pass --start)", file=sys.stderr)
+        sys.exit(2)
+    except RuntimeError as e:
+        print(f"\n❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.op == "ask":
+        print()
+    elif args.op == "transcribe":
+        print(reply["text"])
+    elif args.op == "status":
+        print(json.dumps({k: v for k, v in reply.items() if k != "done"}, indent=2))
+    elif args.op == "shutdown":
+        print("👋 Daemon stopped.", file=sys.stderr)
+    if reply.get("path"):
+        print(f"🔊 Saved {reply['seconds']:.1f}s of audio to {reply['path']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
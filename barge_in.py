@@ -0,0 +1,62 @@
+# barge_in.py — Keeps the microphone open while a reply plays and reports when the user starts talking
+#
+# The monitor feeds the capture engine's audio to its own VAD on a background
+# thread. On a confirmed onset it anchors the capture at the onset (pre-roll
+# included) and calls on_speech(), leaving the capture running, so
+# recorder.record_audio(resume=monitor) continues the same utterance and
+# nothing the user said while the reply was being cut off is lost.
+#
+# There is no echo cancellation: with open speakers the reply itself can
+# trigger the monitor, so it is off unless ARC_BARGE_IN=1 (use a headset).
+
+import threading
+import time
+
+from vad import VoiceActivityDetector
+
+SAMPLE_RATE   = 16000
+ONSET_SECONDS = 0.08    # Voiced run needed to interrupt (a little stricter than a normal onset)
+BLOCK_SECONDS = 0.02    # How often new microphone audio is checked
+
+
+class BargeInMonitor:
+    def __init__(self, capture, on_speech, sample_rate=SAMPLE_RATE, onset_seconds=ONSET_SECONDS,
+                 block_seconds=BLOCK_SECONDS, clock=time.monotonic):
+        self.capture = capture
+        self.vad = VoiceActivityDetector(sample_rate, onset_seconds=onset_seconds)
+        self.on_speech = on_speech
+        self.block = int(sample_rate * block_seconds)
+        self.block_seconds = block_seconds
+        self.clock = clock
+        self.detected_at = None   # clock() when the onset was confirmed
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def triggered(self):
+        return self.detected_at is not None
+
+    def start(self):
+        self.capture.start()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            block = self.capture.read(self.block, timeout=self.block_seconds * 5)
+            if block.size:
+                self.vad.process(block)
+            if self.vad.speech_started:
+                self.capture.anchor(self.vad.onset_sample)
+                self.detected_at = self.clock()
+                self.on_speech()
+                return
+
+    def stop(self):
+        """Stop listening; after a barge-in the capture keeps running for record_audio(resume=...)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if not self.triggered:
+            self.capture.stop()
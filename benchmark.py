@@ -0,0 +1,420 @@
+# benchmark.py — Offline end-to-end turn benchmark with stand-in models and audio devices
+#
+# Runs the assistant's real turn code (main.handle_user_input → recorder →
+# streaming ASR → llm_handler → TurnPipeline) with everything slow or
+# hardware-bound replaced:
+#   LLM      a fake worker speaking the llm_worker protocol, emitting tokens at --token-rate
+#   XTTS     sine audio, taking --rtf seconds of compute per second of speech
+#   Whisper  canned words with timestamps, taking --asr-rtf per second of audio
+#   audio    a scripted microphone (silence, speech, silence) and a null output
+#            that takes as long as the audio would to play
+# The devices run --speed times faster than real time. Latencies come from
+# the tracer: time to first audio (end of speech → playback start), first
+# token and turn latency (end of speech → end of playback), plus CPU and
+# peak RSS. Results can be saved as a JSON baseline and compared later.
+# The stand-ins are installed process-wide (model loaders, audio devices,
+# the LLM engine, environment knobs main.py reads at import) and stay in
+# place, so run the benchmark in a process of its own, as the CLI does.
+#
+# Usage: python benchmark.py [--turns 10] [--save baseline.json]
+#        python benchmark.py --baseline baseline.json [--tolerance 0.2]
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import shlex
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+REPLY = ("Start with a mix of green and brown material. Keep the pile about as damp as a wrung-out "
+         "sponge, and turn it every week or two so air reaches the middle. A thermometer helps: the "
+         "centre should feel warm within a few days. Avoid meat and dairy, which attract pests. ")
+QUERY_WORDS = "how do I start a compost pile at home".split()
+WORD_SECONDS = 0.35       # Spoken length of one canned ASR word
+CHARS_PER_SECOND = 15     # Speaking rate of the fake TTS
+TTS_SAMPLE_RATE = 24000
+MIC_BLOCK = 320           # 20 ms at 16 kHz, like the real input stream
+COMPARED = ("ttfa", "first_token", "turn")
+ABS_SLACK = 0.01          # Seconds a latency may grow before the tolerance applies
+
+
+# --- Fake LLM worker (runs as a subprocess: benchmark.py fake-llm ...) --------
+
+def fake_llm_worker(argv):
+    """Minimal llm_worker: same JSON-lines protocol, canned tokens at a fixed rate."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--token-rate", type=float, default=25.0)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--load-seconds", type=float, default=1.0)
+    args, _ = parser.parse_known_args(argv)   # --model/--context-size/--ngl from the engine
+
+    def emit(obj):
+        sys.stdout.write(json.dumps(obj) + "\n")
+        sys.stdout.flush()
+
+    from llm_worker import CancelState, read_requests
+    import queue
+
+    time.sleep(args.load_seconds)
+    emit({"ready": True})
+    requests, state = queue.Queue(), CancelState()
+    threading.Thread(target=read_requests, args=(requests, state), daemon=True).start()
+    words = [" " + word for word in REPLY.split()]
+    for seq, request in iter(requests.get, None):
+        count = min(args.tokens, request.get("max_tokens", args.tokens))
+        started = time.perf_counter()
+        for i in range(count):
+            # Paced against the start so the rate holds however long emit() takes
+            time.sleep(max(0.0, started + (i + 1) / args.token_rate - time.perf_counter()))
+            if state.is_cancelled(seq):
+                break
+            emit({"token": words[i % len(words)]})
+        emit({"done": True, "cancelled": True} if state.is_cancelled(seq) else {"done": True})
+
+
+# --- Fake models -------------------------------------------------------------
+
+class _Param:
+    """Enough of a torch parameter for the residency movers."""
+
+    def __init__(self):
+        self.is_cuda = True
+        self.data = self
+
+    def pin_memory(self):
+        return self
+
+
+class FakeXTTS:
+    def __init__(self, rtf):
+        self.rtf = rtf
+        self.synthesizer = SimpleNamespace(output_sample_rate=TTS_SAMPLE_RATE)
+        self._param = _Param()
+        self.calls = 0
+
+    def to(self, device):
+        self._param.is_cuda = device == "cuda"
+        return self
+
+    def parameters(self):
+        return iter([self._param])
+
+    def buffers(self):
+        return iter([])
+
+    def tts(self, text, speaker=None, language=None, **_):
+        seconds = max(len(text), 1) / CHARS_PER_SECOND
+        time.sleep(seconds * self.rtf)
+        self.calls += 1
+        t = np.arange(int(seconds * TTS_SAMPLE_RATE)) / TTS_SAMPLE_RATE
+        return (0.2 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+class _CTranslate2Model:
+    def __init__(self):
+        self.device = "cuda"
+        self.model_is_loaded = True
+
+    def load_model(self):
+        self.model_is_loaded = True
+
+    def unload_model(self, to_cpu=False):
+        self.model_is_loaded = False
+
+
+class FakeWhisper:
+    def __init__(self, rtf, sample_rate=16000):
+        self.rtf = rtf
+        self.sample_rate = sample_rate
+        self.model = _CTranslate2Model()
+
+    def transcribe(self, audio, word_timestamps=False, **_):
+        seconds = np.asarray(audio).size / self.sample_rate
+        time.sleep(seconds * self.rtf)
+        words = [SimpleNamespace(word=" " + QUERY_WORDS[i % len(QUERY_WORDS)],
+                                 start=i * WORD_SECONDS, end=(i + 1) * WORD_SECONDS)
+                 for i in range(int(seconds / WORD_SECONDS))]
+        text = "".join(w.word for w in words)
+        return [SimpleNamespace(text=text, words=words if word_timestamps else None)], None
+
+
+# --- Null audio devices ------------------------------------------------------
+
+class ScriptedMicrophone:
+    """Input stream stand-in: silence, one utterance, then silence until stopped."""
+
+    def __init__(self, callback, script, sample_rate, speed):
+        self.callback = callback
+        self.script = script
+        self.sample_rate = sample_rate
+        self.speed = speed
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name="fake-mic", daemon=True).start()
+
+    def _run(self):
+        silence = np.full(MIC_BLOCK, 1e-4, np.float32)
+        block_seconds = MIC_BLOCK / self.sample_rate / self.speed
+        started = time.perf_counter()
+        for i in range(sys.maxsize):
+            if self._stop.is_set():
+                return
+            start = i * MIC_BLOCK
+            block = self.script[start:start + MIC_BLOCK] if start < self.script.size else silence
+            if block.size < MIC_BLOCK:
+                block = np.concatenate([block, silence[block.size:]])
+            self.callback(block.reshape(-1, 1), MIC_BLOCK, None, None)
+            time.sleep(max(0.0, started + (i + 1) * block_seconds - time.perf_counter()))
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        pass
+
+
+class NullOutput:
+    """Output stream stand-in: write() takes as long as the audio would take to play."""
+
+    def __init__(self, sample_rate, speed):
+        self.sample_rate = sample_rate
+        self.speed = speed
+        self.samples = 0
+        self._aborted = threading.Event()
+
+    def start(self):
+        pass
+
+    def write(self, audio):
+        self.samples += len(audio)
+        self._aborted.wait(len(audio) / self.sample_rate / self.speed)
+
+    def abort(self):
+        self._aborted.set()
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def speech(seconds, sample_rate=16000, level=0.1):
+    """Harmonic, syllable-modulated signal the VAD takes for a voice."""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    tone = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate([450, 900, 1350, 1800], 1))
+    return (level * tone * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))).astype(np.float32)
+
+
+# --- Measurement -------------------------------------------------------------
+
+def turn_metrics(tracer, turn):
+    """Latencies of one turn in seconds, measured from the end of speech; None if incomplete."""
+    endpoint = tracer.first("vad_endpoint", turn)
+    first_token = tracer.first("llm_first_token", turn)
+    play_start = tracer.first("playback_start", turn)
+    play_end = tracer.last("playback_end", turn)
+    if None in (endpoint, first_token, play_start, play_end):
+        return None
+    return {"ttfa": play_start - endpoint, "first_token": first_token - endpoint, "turn": play_end - endpoint}
+
+
+def summarize(turns):
+    summary = {}
+    for name in COMPARED:
+        values = np.array([t[name] for t in turns])
+        summary[name] = {
+            "mean": float(values.mean()),
+            "p50": float(np.percentile(values, 50)),
+            "p90": float(np.percentile(values, 90)),
+            "p99": float(np.percentile(values, 99)),
+        }
+    return summary
+
+
+def cpu_seconds(who):
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+def max_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024   # Bytes on macOS, KiB elsewhere
+
+
+def compare(result, baseline, tolerance):
+    """Lines describing each compared figure, and whether any regressed past `tolerance`."""
+    lines, regressed = [], False
+    checks = [(f"{name} {stat}", result["latency"][name][stat], baseline["latency"][name][stat], ABS_SLACK)
+              for name in COMPARED for stat in ("p50", "p90")]
+    checks.append(("cpu_percent", result["cpu_percent"], baseline["cpu_percent"], 1.0))
+    for label, value, base, slack in checks:
+        change = (value - base) / base if base else 0.0
+        worse = value > base * (1 + tolerance) and value - base > slack
+        regressed |= worse
+        lines.append(f"{'❌' if worse else '✅'} {label:16s} {value:8.3f} vs {base:8.3f} ({change:+.1%})")
+    return lines, regressed
+
+
+# --- Run ---------------------------------------------------------------------
+
+def configure(config, workdir):
+    """Point the assistant at the stand-ins; must run before main is imported."""
+    worker = [sys.executable, os.path.abspath(__file__), "fake-llm",
+              "--token-rate", str(config["token_rate"]), "--tokens", str(config["tokens"]),
+              "--load-seconds", str(config["load_seconds"])]
+    os.environ["ARC_LLM_WORKER"] = shlex.join(worker)
+    os.environ["ARC_GPU_TELEMETRY"] = "fake"
+    os.environ["ARC_RESPONSE_CACHE"] = "0"   # Every turn asks the LLM
+    os.environ["ARC_MEMORY"] = "0"           # Prompt size stays the same across turns
+    os.environ["ARC_BARGE_IN"] = "0"         # The scripted mic is only read while recording
+    os.environ.pop("ARC_TRACE", None)
+    os.chdir(workdir)                        # Selection file, caches and logs stay out of the tree
+
+
+async def run_turns(main, config, on_turn=None):
+    from model_registry import registry
+    from pipeline import Console
+    from recorder import SAMPLE_RATE, set_input_stream_factory
+    from tracing import get_tracer
+    from tts_pipeline import set_output_factory
+    from vram_manager import get_residency_manager
+
+    registry.register("xtts", lambda: FakeXTTS(config["rtf"]))
+    registry.register("whisper", lambda: FakeWhisper(config["asr_rtf"]))
+    script = np.concatenate([np.full(int(0.3 * SAMPLE_RATE), 1e-4, np.float32),
+                             speech(config["speech_seconds"], SAMPLE_RATE)])
+    set_input_stream_factory(lambda callback: ScriptedMicrophone(callback, script, SAMPLE_RATE, config["speed"]))
+    set_output_factory(lambda sample_rate: NullOutput(sample_rate, config["speed"]))
+
+    tracer = get_tracer()
+    residency = get_residency_manager()
+    console = Console(read=lambda prompt: threading.Event().wait())   # Nobody types
+    main.initialize()
+
+    turns = []
+    for i in range(config["warmup"] + config["turns"]):
+        if i == config["warmup"]:
+            cpu_start = cpu_seconds(resource.RUSAGE_SELF) + cpu_seconds(resource.RUSAGE_CHILDREN)
+            wall_start = time.perf_counter()
+        turn = tracer.begin_turn()
+        _, query = await main.handle_user_input("", console)
+        if not query:
+            raise RuntimeError(f"turn {turn}: nothing transcribed")
+        await main.run_turn(query, residency, console)
+        metrics = turn_metrics(tracer, turn)
+        if metrics is None:
+            raise RuntimeError(f"turn {turn} did not complete: {tracer.summary(turn)}")
+        if i >= config["warmup"]:
+            turns.append(metrics)
+        if on_turn:
+            on_turn(i - config["warmup"], metrics, tracer.summary(turn))
+    wall = time.perf_counter() - wall_start
+
+    from llm_engine import get_engine
+    get_engine().shutdown()   # Reaped, so the worker's CPU time shows up in RUSAGE_CHILDREN
+    set_output_factory(None)
+    cpu = cpu_seconds(resource.RUSAGE_SELF) + cpu_seconds(resource.RUSAGE_CHILDREN) - cpu_start
+    return turns, cpu, wall
+
+
+def run_benchmark(config, quiet=True, on_turn=None):
+    """Run `config["turns"]` measured turns (after `config["warmup"]`); returns the result dict.
+
+    Leaves the stand-ins installed: call it from a process of its own.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="arc-bench-") as workdir:
+        configure(config, workdir)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        try:
+            with contextlib.ExitStack() as stack:
+                if quiet:
+                    import logging
+                    logging.getLogger().setLevel(logging.WARNING)
+                    stack.enter_context(contextlib.redirect_stdout(open(os.devnull, "w")))
+                import main
+                turns, cpu, wall = asyncio.run(run_turns(main, config, on_turn))
+        finally:
+            os.chdir(cwd)
+    return {
+        "config": config,
+        "latency": summarize(turns),
+        "cpu_seconds": cpu,
+        "cpu_percent": 100.0 * cpu / wall,
+        "max_rss_mb": max_rss_mb(),
+        "wall_seconds": wall,
+    }
+
+
+def print_report(result):
+    print("\n📊 Turn latency (from end of speech)")
+    print(f"   {'':12s} {'mean':>7s} {'p50':>7s} {'p90':>7s} {'p99':>7s}")
+    for name in COMPARED:
+        stats = result["latency"][name]
+        print(f"   {name:12s} " + " ".join(f"{stats[k]:7.3f}" for k in ("mean", "p50", "p90", "p99")))
+    print(f"   ├─ CPU: {result['cpu_seconds']:.2f}s over {result['wall_seconds']:.1f}s ({result['cpu_percent']:.0f}%)")
+    print(f"   └─ Peak RSS: {result['max_rss_mb']:.0f} MB")
+
+
+def main():
+    if sys.argv[1:2] == ["fake-llm"]:
+        return fake_llm_worker(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(description="Benchmark assistant turns with stand-in models and devices")
+    parser.add_argument("--turns", type=int, default=10, help="Measured turns")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured turns first (model loads, worker start)")
+    parser.add_argument("--token-rate", type=float, default=25.0, help="Fake LLM tokens per second")
+    parser.add_argument("--tokens", type=int, default=60, help="Tokens per reply")
+    parser.add_argument("--load-seconds", type=float, default=1.0, help="Fake LLM worker start-up time")
+    parser.add_argument("--rtf", type=float, default=0.3, help="Fake TTS compute seconds per second of audio")
+    parser.add_argument("--asr-rtf", type=float, default=0.1, help="Fake Whisper compute seconds per second of audio")
+    parser.add_argument("--speech-seconds", type=float, default=1.5, help="Length of the scripted question")
+    parser.add_argument("--speed", type=float, default=4.0, help="Microphone and playback run this much faster than real time")
+    parser.add_argument("--save", type=Path, help="Write the result as a JSON baseline")
+    parser.add_argument("--baseline", type=Path, help="Compare against a saved baseline; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown against the baseline")
+    parser.add_argument("--verbose", action="store_true", help="Show the assistant's own output")
+    args = parser.parse_args()
+
+    config = {key: getattr(args, key) for key in
+              ("turns", "warmup", "token_rate", "tokens", "load_seconds", "rtf", "asr_rtf", "speech_seconds", "speed")}
+    save = args.save.resolve() if args.save else None
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+
+    def on_turn(index, metrics, summary):
+        label = "warm-up" if index < 0 else f"turn {index + 1}"
+        print(f"⏱️ {label:8s} ttfa {metrics['ttfa']:.3f}s | first token {metrics['first_token']:.3f}s | "
+              f"turn {metrics['turn']:.3f}s", file=sys.stderr)
+        if args.verbose:
+            print(f"[Trace] {summary}", file=sys.stderr)
+
+    result = run_benchmark(config, quiet=not args.verbose, on_turn=on_turn)
+    print_report(result)
+
+    if save:
+        save.write_text(json.dumps(result, indent=2))
+        print(f"💾 Baseline saved to {save}")
+    if baseline:
+        if baseline["config"] != config:
+            print("⚠️ Baseline was recorded with different settings — comparison is only indicative.")
+        lines, regressed = compare(result, baseline, args.tolerance)
+        print(f"\n📈 Against {args.baseline} (tolerance {args.tolerance:.0%})")
+        for line in lines:
+            print(f"   {line}")
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
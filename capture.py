@@ -0,0 +1,142 @@
+# capture.py — Callback-driven microphone capture into one preallocated numpy ring buffer
+#
+# Before voice onset the buffer is used as a ring, so the most recent audio is
+# always available. When the VAD confirms onset, anchor() moves the pre-roll
+# (audio just before the onset) to the front of the buffer and capture turns
+# linear from there. The utterance is then always contiguous and is handed out
+# as a zero-copy view. Memory is fixed at (MAX_RECORD_TIME + pre-roll) seconds.
+
+import threading
+
+import numpy as np
+
+SAMPLE_RATE     = 16000
+MAX_SECONDS     = 15      # Longest utterance kept after onset
+PREROLL_SECONDS = 0.3     # Audio kept from before the detected onset
+BLOCK_SECONDS   = 0.02    # sounddevice callback block size
+
+
+class CaptureEngine:
+    def __init__(self, sample_rate=SAMPLE_RATE, max_seconds=MAX_SECONDS,
+                 preroll_seconds=PREROLL_SECONDS, stream_factory=None):
+        self.sample_rate = sample_rate
+        self.preroll = int(preroll_seconds * sample_rate)
+        self.capacity = int(max_seconds * sample_rate) + self.preroll
+        self.stream_factory = stream_factory or self._sounddevice_stream
+        self._buf = np.zeros(self.capacity, dtype=np.float32)
+        self._cond = threading.Condition()
+        self._stream = None
+        self.reset()
+
+    def reset(self):
+        with self._cond:
+            self.total = 0          # Absolute samples received since start
+            self.anchored = False   # Linear (post-onset) mode
+            self.full = False       # Linear region exhausted; further audio is dropped
+            self.overflows = 0
+            self._base = 0          # Absolute index stored at _buf[0] once anchored
+            self._read = 0          # Absolute index of the next sample read() returns
+
+    # --- Stream lifecycle -------------------------------------------------
+
+    def _sounddevice_stream(self, callback):
+        import sounddevice as sd
+        return sd.InputStream(
+            samplerate=self.sample_rate,
+            channels=1,
+            dtype="float32",
+            blocksize=int(self.sample_rate * BLOCK_SECONDS),
+            callback=callback,
+        )
+
+    def start(self):
+        self.reset()
+        self._stream = self.stream_factory(self.callback)
+        self._stream.start()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        with self._cond:
+            self._cond.notify_all()
+
+    # --- Producer side (audio thread) -------------------------------------
+
+    def callback(self, indata, frames, time_info, status):
+        if status:
+            self.overflows += 1
+        self.feed(indata[:, 0] if indata.ndim > 1 else indata)
+
+    def feed(self, samples):
+        with self._cond:
+            n = samples.shape[0]
+            if self.anchored:
+                pos = self.total - self._base
+                room = self.capacity - pos
+                if n > room:
+                    n = room
+                    self.full = True
+                self._buf[pos:pos + n] = samples[:n]
+            else:
+                pos = self.total % self.capacity
+                first = min(n, self.capacity - pos)
+                self._buf[pos:pos + first] = samples[:first]
+                if first < n:
+                    self._buf[:n - first] = samples[first:n]
+            self.total += n
+            self._cond.notify_all()
+
+    # --- Consumer side ----------------------------------------------------
+
+    def _slice(self, start, end):
+        """Samples [start, end) in absolute indices; a view unless the ring wraps."""
+        if self.anchored:
+            return self._buf[start - self._base:end - self._base]
+        a, b = start % self.capacity, end % self.capacity
+        if end - start == 0:
+            return self._buf[0:0]
+        if a < b or b == 0:
+            return self._buf[a:b or self.capacity]
+        return np.concatenate([self._buf[a:], self._buf[:b]])
+
+    def read(self, min_samples=1, timeout=0.5):
+        """Block until at least `min_samples` new samples arrive; return what is new.
+
+        Returns whatever is available (possibly nothing) on timeout, stop or full buffer.
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self.total - self._read >= min_samples or self.full or self._stream is None,
+                timeout,
+            )
+            start = max(self._read, self.total - self.capacity)
+            if self.anchored:
+                start = max(start, self._base)
+            end = self.total
+            self._read = end
+            return self._slice(start, end)
+
+    def anchor(self, onset):
+        """Switch to linear capture, keeping pre-roll before absolute sample `onset`."""
+        with self._cond:
+            if self.anchored:
+                return
+            start = max(onset - self.preroll, self.total - self.capacity, 0)
+            kept = np.array(self._slice(start, self.total))   # Small: pre-roll + VAD delay
+            self._buf[:kept.size] = kept
+            self._base = start
+            self.anchored = True
+
+    def utterance(self, end=None):
+        """Zero-copy view of the anchored utterance up to absolute index `end`."""
+        with self._cond:
+            if not self.anchored:
+                return self._buf[0:0]
+            end = self.total if end is None else min(end, self.total)
+            return self._buf[:max(0, end - self._base)]
+
+    @property
+    def utterance_start(self):
+        return self._base if self.anchored else None
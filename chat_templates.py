@@ -0,0 +1,227 @@
+# chat_templates.py — Prompt formatting from the model's own chat template, compiled once per model
+#
+# A model's GGUF usually embeds its chat format as a Jinja template
+# (tokenizer.chat_template). When jinja2 is installed that template is compiled
+# and used directly. Otherwise — or when the model has none — a named built-in
+# format is picked from the embedded template's markers or, as a last resort,
+# from the model name. Templates are cached per model file.
+
+import hashlib
+import os
+from pathlib import Path
+
+SENTINEL = "\ue000"   # Private-use character used to find where the user turn starts
+
+
+class ChatTemplate:
+    name = "base"
+    source = ""
+    stop = ()   # Strings that mean the model has started a new turn
+
+    def __init__(self):
+        self._prefixes = {}
+
+    @property
+    def ident(self):
+        """Stable identity of the template (for cache keys)."""
+        return f"{self.name}:{hashlib.sha256(self.source.encode('utf-8')).hexdigest()[:16]}"
+
+    def render(self, messages, add_generation_prompt=True):
+        raise NotImplementedError
+
+    def prefix(self, system):
+        """The rendered text that precedes the first user message; identical on every turn."""
+        if system not in self._prefixes:
+            text = self.render([{"role": "system", "content": system},
+                                {"role": "user", "content": SENTINEL}])
+            cut = text.find(SENTINEL)
+            self._prefixes[system] = text[:cut] if cut > 0 else ""
+        return self._prefixes[system]
+
+
+class FormatTemplate(ChatTemplate):
+    """A chat format described by one format string per role."""
+
+    def __init__(self, name, system, user, assistant, generation, system_in_user=False, stop=()):
+        super().__init__()
+        self.name = name
+        self.stop = tuple(stop)
+        self.formats = {"system": system, "user": user, "assistant": assistant}
+        self.generation = generation
+        self.system_in_user = system_in_user   # Format has no system role (e.g. Mistral [INST])
+        self.source = "\x1f".join([system, user, assistant, generation, str(system_in_user)])
+
+    def render(self, messages, add_generation_prompt=True):
+        parts = []
+        pending_system = None
+        for message in messages:
+            role, content = message["role"], message["content"]
+            if role == "system" and self.system_in_user:
+                pending_system = content
+                continue
+            if role == "user" and pending_system:
+                content = f"{pending_system}\n\n{content}"
+                pending_system = None
+            parts.append(self.formats[role].format(content=content))
+        if add_generation_prompt:
+            parts.append(self.generation)
+        return "".join(parts)
+
+
+class JinjaTemplate(ChatTemplate):
+    """A tokenizer.chat_template compiled with jinja2 (optional dependency)."""
+
+    def __init__(self, source, eos_token="</s>"):
+        super().__init__()
+        from jinja2.exceptions import TemplateError
+        from jinja2.sandbox import ImmutableSandboxedEnvironment
+
+        def raise_exception(message):
+            raise TemplateError(message)
+
+        env = ImmutableSandboxedEnvironment(trim_blocks=True, lstrip_blocks=True)
+        env.globals["raise_exception"] = raise_exception
+        self.name = "jinja"
+        self.source = source
+        self._template = env.from_string(source)
+        self._error = TemplateError
+        # llama.cpp adds BOS itself when tokenizing, so the template must not repeat it
+        self._tokens = {"bos_token": "", "eos_token": eos_token or ""}
+        self.stop = (eos_token,) if eos_token else ()
+
+    def render(self, messages, add_generation_prompt=True):
+        try:
+            return self._template.render(messages=messages, add_generation_prompt=add_generation_prompt,
+                                         **self._tokens)
+        except self._error:
+            if not messages or messages[0]["role"] != "system":
+                raise
+            # Some templates reject a system role; fold it into the first user turn
+            system, rest = messages[0]["content"], [dict(m) for m in messages[1:]]
+            for message in rest:
+                if message["role"] == "user":
+                    message["content"] = f"{system}\n\n{message['content']}"
+                    break
+            return self._template.render(messages=rest, add_generation_prompt=add_generation_prompt,
+                                         **self._tokens)
+
+
+# --- Built-in formats ---------------------------------------------------------
+
+TEMPLATES = {
+    "zephyr": FormatTemplate(
+        "zephyr",
+        system="<|system|>\n{content}</s>\n",
+        user="<|user|>\n{content}</s>\n",
+        assistant="<|assistant|>\n{content}</s>\n",
+        generation="<|assistant|>\n",
+        stop=("</s>", "<|user|>"),
+    ),
+    "chatml": FormatTemplate(
+        "chatml",
+        system="<|im_start|>system\n{content}<|im_end|>\n",
+        user="<|im_start|>user\n{content}<|im_end|>\n",
+        assistant="<|im_start|>assistant\n{content}<|im_end|>\n",
+        generation="<|im_start|>assistant\n",
+        stop=("<|im_end|>", "<|im_start|>"),
+    ),
+    "airoboros": FormatTemplate(
+        "airoboros",
+        system="{content}\n",
+        user="### Human:\n{content}\n",
+        assistant="### Assistant:\n{content}\n",
+        generation="### Assistant:",
+        stop=("### Human:",),
+    ),
+    "alpaca": FormatTemplate(
+        "alpaca",
+        system="{content}\n\n",
+        user="### Instruction:\n{content}\n\n",
+        assistant="### Response:\n{content}\n\n",
+        generation="### Response:\n",
+        stop=("### Instruction:",),
+    ),
+    "mistral": FormatTemplate(
+        "mistral",
+        system="",
+        user="[INST] {content} [/INST]",
+        assistant="{content}</s>",
+        generation="",
+        system_in_user=True,
+        stop=("</s>", "[INST]"),
+    ),
+    "raw": FormatTemplate(
+        "raw",
+        system="{content}\n\n",
+        user="{content}\n",
+        assistant="{content}\n",
+        generation="",
+    ),
+}
+
+# Markers in an embedded template that identify a built-in format (used without jinja2)
+TEMPLATE_MARKERS = [
+    ("<|im_start|>", "chatml"),
+    ("<|assistant|>", "zephyr"),
+    ("[INST]", "mistral"),
+    ("### Instruction", "alpaca"),
+]
+
+# Last resort for models without an embedded template; checked against general.name and filename
+FAMILY_PATTERNS = [
+    ("openhermes", "chatml"),
+    ("hermes", "chatml"),
+    ("dolphin", "chatml"),
+    ("airoboros", "airoboros"),
+    ("mytho", "alpaca"),
+    ("zephyr", "zephyr"),
+    ("mistral", "mistral"),
+    ("adventurouswinds", "raw"),
+    ("dan", "raw"),
+]
+
+DEFAULT_TEMPLATE = "raw"
+
+
+def detect_builtin(chat_template=None, names=()):
+    """Name of the built-in format for an embedded template's markers or the model's names."""
+    if chat_template:
+        for marker, name in TEMPLATE_MARKERS:
+            if marker in chat_template:
+                return name
+    haystack = " ".join(n.lower() for n in names if n)
+    for pattern, name in FAMILY_PATTERNS:
+        if pattern in haystack:
+            return name
+    return DEFAULT_TEMPLATE
+
+
+def template_for_info(info):
+    """Compile the best template for a model_catalog.ModelInfo."""
+    if info is not None and info.chat_template:
+        try:
+            return JinjaTemplate(info.chat_template, info.eos_token or "</s>")
+        except ImportError:
+            pass   # jinja2 not installed
+        except Exception as e:
+            print(f"⚠️ [Templates] Embedded chat template of {info.name} failed to compile: {e}")
+    if info is None:
+        return TEMPLATES[DEFAULT_TEMPLATE]
+    return TEMPLATES[detect_builtin(info.chat_template, (info.title, info.name))]
+
+
+_compiled = {}   # (path, size, mtime) → ChatTemplate
+
+
+def get_template(model_path):
+    """Chat template for a model file, compiled on first use and reused afterwards."""
+    from model_catalog import get_model_info
+
+    try:
+        stat = os.stat(model_path)
+    except OSError:
+        return TEMPLATES[detect_builtin(names=(Path(model_path).name,))]
+    key = (os.path.abspath(model_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _compiled:
+        _compiled[key] = template_for_info(get_model_info(model_path))
+    return _compiled[key]
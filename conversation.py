@@ -0,0 +1,254 @@
+# conversation.py — Turn history counted in model tokens and kept in an append-only log
+#
+# Token counts come from the model's own vocabulary (tokenizer.ggml.tokens in
+# the GGUF header), matched greedily longest-first. That is not the exact BPE
+# merge order, but it tracks llama.cpp's count closely and never needs the
+# model loaded. Each turn is appended to a JSON-lines log as it happens, so a
+# long session neither rewrites the whole history nor loses it on a crash;
+# only the turns that fit the context window are sent to the model, and the
+# ones that no longer fit are folded into a one-line summary.
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from gguf_reader import GGUFError, read_vocab
+
+LOG_FILE        = Path("cache/conversation.jsonl")
+MAX_TURNS       = 200     # Turns kept in memory (the log itself keeps everything)
+CHARS_PER_TOKEN = 3.0     # Conservative estimate when the vocabulary cannot be read
+MAX_TOKEN_CHARS = 32      # Longest vocabulary entry tried by the greedy matcher
+SUMMARY_TOKENS  = 96      # Budget for the summary of turns that no longer fit
+TURN_OVERHEAD   = 8       # Role markers per turn when the template cannot be measured
+
+
+def _gpt2_byte_chars():
+    """The byte → printable character table GPT-2 style BPE vocabularies are written in."""
+    printable = list(range(ord("!"), ord("~") + 1)) + list(range(0xA1, 0xAD)) + list(range(0xAE, 0x100))
+    chars = {b: chr(b) for b in printable}
+    extra = 0
+    for b in range(256):
+        if b not in chars:
+            chars[b] = chr(256 + extra)
+            extra += 1
+    return chars
+
+
+class TokenCounter:
+    """Greedy longest-match token counter over a GGUF vocabulary."""
+
+    def __init__(self, tokens, model="llama"):
+        self.vocab = set(tokens)
+        self.max_len = min(max((len(t) for t in self.vocab), default=1), MAX_TOKEN_CHARS)
+        self.model = model
+        self.ident = f"{model}-{len(self.vocab)}"   # Key for token counts stored with each turn
+        self.byte_tokens = "<0x0A>" in self.vocab   # SentencePiece byte fallback
+        self._gpt2_chars = _gpt2_byte_chars() if model == "gpt2" else None
+
+    def _normalize(self, text):
+        if self._gpt2_chars is not None:
+            return "".join(self._gpt2_chars[b] for b in text.encode("utf-8"))
+        # SentencePiece marks spaces with ▁ and adds one in front of the text
+        return "▁" + text.replace(" ", "▁")
+
+    def count(self, text):
+        if not text:
+            return 0
+        text = self._normalize(text)
+        vocab, max_len = self.vocab, self.max_len
+        n, pos, tokens = len(text), 0, 0
+        while pos < n:
+            for length in range(min(max_len, n - pos), 0, -1):
+                if text[pos:pos + length] in vocab:
+                    pos += length
+                    tokens += 1
+                    break
+            else:
+                # Not in the vocabulary: one byte token per UTF-8 byte (or one unknown token)
+                tokens += len(text[pos].encode("utf-8")) if self.byte_tokens else 1
+                pos += 1
+        return tokens
+
+
+class EstimateCounter:
+    """Character-based fallback for models whose vocabulary cannot be read."""
+
+    model = ident = "estimate"
+
+    def count(self, text):
+        return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+_counters = {}   # (path, size, mtime) → TokenCounter
+
+
+def get_token_counter(model_path):
+    """Token counter for a model file, built from its vocabulary on first use."""
+    try:
+        stat = os.stat(model_path)
+    except OSError:
+        return EstimateCounter()
+    key = (os.path.abspath(model_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _counters:
+        try:
+            tokens, tokenizer = read_vocab(model_path)
+            _counters[key] = TokenCounter(tokens, tokenizer) if tokens else EstimateCounter()
+        except (GGUFError, OSError, ValueError) as e:
+            print(f"⚠️ [Memory] Could not read the vocabulary of {Path(model_path).name}: {e}")
+            _counters[key] = EstimateCounter()
+    return _counters[key]
+
+
+def turn_overhead(template, counter):
+    """Tokens a template adds around one user/assistant exchange, per turn."""
+    try:
+        empty = template.render([{"role": "user", "content": ""}, {"role": "assistant", "content": ""}],
+                                add_generation_prompt=False)
+        return max(1, math.ceil(counter.count(empty) / 2))
+    except Exception:
+        return TURN_OVERHEAD
+
+
+def _first_sentence(text, limit=80):
+    text = " ".join(text.split())
+    for end in (". ", "? ", "! "):
+        cut = text.find(end)
+        if 0 < cut < limit:
+            return text[:cut + 1]
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+class Conversation:
+    """Turn history backed by an append-only JSON-lines log."""
+
+    def __init__(self, log_file=LOG_FILE, max_turns=MAX_TURNS, clock=time.time):
+        self.log_file = Path(log_file) if log_file else None
+        self.turns = deque(maxlen=max_turns)   # {"role", "content", "ts", "tokens": {vocab: n}}
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._log = None
+        if self.log_file is not None:
+            self.load()
+
+    # --- Log --------------------------------------------------------------
+
+    def load(self):
+        """Replay the log; a clear marker drops everything before it."""
+        self.turns.clear()
+        try:
+            with open(self.log_file, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue   # Torn final line from an interrupted write
+                    if record.get("event") == "clear":
+                        self.turns.clear()
+                    elif record.get("role") in ("user", "assistant"):
+                        self.turns.append(record)
+        except FileNotFoundError:
+            pass
+        return len(self.turns)
+
+    def _write(self, record):
+        if self.log_file is None:
+            return
+        if self._log is None:
+            self.log_file.parent.mkdir(parents=True, exist_ok=True)
+            self._log = open(self.log_file, "a", encoding="utf-8")
+        self._log.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._log.flush()
+
+    def append(self, role, content, counter=None):
+        record = {"role": role, "content": content, "ts": self.clock()}
+        if counter is not None:
+            record["tokens"] = {counter.ident: counter.count(content)}
+        with self._lock:
+            self.turns.append(record)
+            self._write(record)
+        return record
+
+    def add_exchange(self, query, reply, counter=None):
+        self.append("user", query, counter)
+        self.append("assistant", reply, counter)
+
+    def last_query(self):
+        """The most recent user turn's text, or None."""
+        with self._lock:
+            for turn in reversed(self.turns):
+                if turn["role"] == "user":
+                    return turn["content"]
+        return None
+
+    def clear(self):
+        with self._lock:
+            self.turns.clear()
+            self._write({"event": "clear", "ts": self.clock()})
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    # --- Context window ---------------------------------------------------
+
+    def _tokens(self, turn, counter):
+        counts = turn.setdefault("tokens", {})
+        if counter.ident not in counts:
+            counts[counter.ident] = counter.count(turn["content"])
+        return counts[counter.ident]
+
+    def window(self, budget, counter, overhead=TURN_OVERHEAD):
+        """Most recent whole exchanges that fit in `budget` tokens, as chat messages.
+
+        Older exchanges are dropped; if anything was dropped and room is left, the
+        oldest kept user message is prefixed with a short summary of what was.
+        """
+        with self._lock:
+            turns = list(self.turns)
+        # Only whole user → assistant exchanges are replayed
+        exchanges = [(turns[i], turns[i + 1]) for i in range(len(turns) - 1)
+                     if turns[i]["role"] == "user" and turns[i + 1]["role"] == "assistant"]
+
+        kept, used = [], 0
+        for user, reply in reversed(exchanges):
+            cost = self._tokens(user, counter) + self._tokens(reply, counter) + 2 * overhead
+            if used + cost > budget:
+                break
+            kept.append((user, reply))
+            used += cost
+        kept.reverse()
+        dropped = exchanges[:len(exchanges) - len(kept)]
+
+        messages = []
+        for user, reply in kept:
+            messages.append({"role": "user", "content": user["content"]})
+            messages.append({"role": "assistant", "content": reply["content"]})
+
+        if dropped and messages:
+            summary = self.summarize(dropped, min(SUMMARY_TOKENS, budget - used), counter)
+            if summary:
+                messages[0]["content"] = f"{summary}\n\n{messages[0]['content']}"
+        return messages
+
+    @staticmethod
+    def summarize(exchanges, budget, counter):
+        """One line naming the most recent dropped topics that fit in `budget` tokens."""
+        topics = []
+        for user, _ in reversed(exchanges):
+            candidate = "Earlier we talked about: " + "; ".join([_first_sentence(user["content"])] + topics)
+            if counter.count(candidate) > budget:
+                break
+            topics.insert(0, _first_sentence(user["content"]))
+        return "Earlier we talked about: " + "; ".join(topics) if topics else ""
+
+
+def get_conversation():
+    """The console assistant's conversation (the default session's, logged to LOG_FILE)."""
+    from state import get_session
+    return get_session().conversation
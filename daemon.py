@@ -0,0 +1,203 @@
+# daemon.py — Resident assistant: Whisper, XTTS and the LLM worker stay loaded behind a Unix socket
+#
+# Every script that imports the assistant pays for torch, XTTS, Whisper and
+# the LLM load before it does any work. The daemon pays that once; the thin
+# client (arc_client.py) then answers in inference time:
+#   python daemon.py &
+#   python arc_client.py ask "What's on my list today?"
+#
+# Protocol (one JSON object per line; a connection may send several requests,
+# each answered in turn; "session" names a conversation, default "cli"):
+#   → {"op": "ask", "text", "out"?}       ← {"token": "..."} lines, then {"done": true, "text": "<reply>"}
+#                                            (with "out", the reply is also spoken into that WAV file)
+#   → {"op": "speak", "text", "out"}      ← {"done": true, "path", "seconds", "sample_rate"}
+#                                            ("ref_wav" on ask or speak switches the session to that cloned voice)
+#   → {"op": "transcribe", "path"}        ← {"done": true, "text": "..."}
+#   → {"op": "status"} | {"op": "ping"}   ← {"done": true, ...}
+#   → {"op": "shutdown"}                  ← {"done": true}, then the daemon exits
+#   A failed request is answered with {"error": "...", "done": true}.
+# File paths are read and written by the daemon, so clients send absolute
+# ones. The socket is owner-only (0600): whoever can connect can make the
+# daemon read and write files as this user.
+#
+# Usage: python daemon.py [--socket PATH] [--no-warm]   (default socket: cache/daemon.sock beside this file)
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+from pathlib import Path
+
+import soundfile as sf
+
+from arc_client import SOCKET_PATH
+from service import AssistantService, read_wav
+from worker_pool import QUEUE_LIMIT, PoolBusy
+
+DEFAULT_SESSION = "cli"
+LINE_LIMIT      = 1024 * 1024   # Longest request line accepted (bytes)
+
+
+class AssistantDaemon(AssistantService):
+    """The assistant service behind a JSON-lines Unix socket."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stopped = asyncio.Event()
+
+    async def handle(self, reader, writer):
+        async def send(message):
+            writer.write((json.dumps(message) + "\n").encode())
+            await writer.drain()   # Waits while the client is behind
+
+        try:
+            while not self.stopped.is_set():
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError
+                except ValueError:
+                    await send({"error": "requests must be JSON objects", "done": True})
+                    continue
+                try:
+                    await send({"done": True, **await self.answer(message, send)})
+                except (PoolBusy, ValueError, OSError, RuntimeError) as e:
+                    await send({"error": str(e), "done": True})
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass   # Client went away mid-request
+        finally:
+            writer.close()
+
+    async def answer(self, message, send):
+        """Run one request; returns the fields of its final reply."""
+        op = message.get("op")
+        if op == "ping":
+            return {}
+        if op == "status":
+            return self.status()
+        if op == "shutdown":
+            self.stopped.set()
+            return {}
+        session = self.session(str(message.get("session", DEFAULT_SESSION)))
+        if op == "transcribe":
+            if not message.get("path"):
+                raise ValueError('transcribe needs a "path"')
+            audio = await asyncio.to_thread(read_wav, message["path"])
+            return {"text": await self.transcribe_audio(session, audio)}
+
+        text = str(message.get("text", "")).strip()
+        if op not in ("ask", "speak") or not text:
+            raise ValueError('expected {"op": "ask" | "speak" | "transcribe" | "status" | "shutdown", ...}')
+        if op == "speak" and not message.get("out"):
+            raise ValueError('speak needs an "out" WAV path')
+        async with session.lock:
+            if message.get("ref_wav"):
+                if not os.path.isfile(message["ref_wav"]):
+                    raise ValueError(f"no reference WAV at {message['ref_wav']}")
+                session.use_clone, session.ref_wav = True, str(message["ref_wav"])
+            reply = {}
+            if op == "ask":
+                pieces = []
+                async for piece in self.chat(session, text):
+                    pieces.append(piece)
+                    await send({"token": piece})
+                text = reply["text"] = "".join(pieces).strip()
+            if message.get("out") and text:
+                reply.update(await self.speak_to_file(session, text, message["out"]))
+            return reply
+
+    async def speak_to_file(self, session, text, out):
+        """Speak `text` in the session's voice into a 16-bit WAV, written a sentence at a time."""
+        out = Path(out)
+        wav, sample_rate, seconds = None, None, 0.0
+        try:
+            async for sample_rate, audio in self.speak(session, text):
+                if wav is None:
+                    out.parent.mkdir(parents=True, exist_ok=True)
+                    wav = sf.SoundFile(out, "w", samplerate=sample_rate, channels=1, subtype="PCM_16")
+                await asyncio.to_thread(wav.write, audio)
+                seconds += len(audio) / sample_rate
+        finally:
+            if wav is not None:
+                wav.close()
+        if wav is None:
+            raise ValueError("nothing to speak")
+        return {"path": str(out), "seconds": round(seconds, 2), "sample_rate": sample_rate}
+
+
+def claim_socket(path):
+    """Remove a stale socket left by a daemon that died; refuse if one is still listening."""
+    path = Path(path)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+    except (ConnectionRefusedError, FileNotFoundError):
+        path.unlink(missing_ok=True)
+        return
+    finally:
+        probe.close()
+    raise SystemExit(f"❌ A daemon is already listening on {path}")
+
+
+async def serve(daemon, path=SOCKET_PATH, warm=None):
+    """Listen on `path` until a shutdown request or signal; `warm` is awaited once listening."""
+    claim_socket(path)
+    server = await asyncio.start_unix_server(daemon.handle, path=str(path), limit=LINE_LIMIT)
+    os.chmod(path, 0o600)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, daemon.stopped.set)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass   # Not the main thread (tests) or no signal support
+    warming = asyncio.ensure_future(warm()) if warm is not None else None
+    print(f"🛰️ [Daemon] Listening on {path}")
+    try:
+        async with server:
+            await daemon.stopped.wait()
+    finally:
+        if warming is not None:
+            warming.cancel()
+        Path(path).unlink(missing_ok=True)
+        daemon.close()
+        print("👋 [Daemon] Stopped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the assistant's models loaded and answer arc_client.py")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--queue-limit", type=int, default=QUEUE_LIMIT, help="Requests allowed to wait per engine")
+    parser.add_argument("--no-warm", action="store_true", help="Load models on first use instead of at start")
+    args = parser.parse_args()
+
+    from llm_engine import get_engine
+    from llm_handler import warm_worker
+    from model_registry import registry
+    from vram_manager import get_residency_manager
+
+    async def run():
+        daemon = AssistantDaemon(residency=get_residency_manager(), queue_limit=args.queue_limit)
+
+        async def warm():
+            registry.warm(["xtts", "whisper"])            # Loaded in the background; requests wait if needed
+            await daemon.pools["llm"].run(warm_worker)   # In the LLM pool, so a first "ask" queues behind it
+            print("✅ [Daemon] Models warm.")
+
+        try:
+            await serve(daemon, args.socket, warm=None if args.no_warm else warm)
+        finally:
+            await asyncio.to_thread(get_engine().shutdown)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
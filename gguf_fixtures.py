@@ -0,0 +1,54 @@
+# gguf_fixtures.py — Header-only GGUF files written for the tests (no tensor data)
+
+import struct
+
+import gguf_reader
+
+Q4_K = 12
+F32 = 0
+
+
+def gguf_string(text):
+    data = text.encode("utf-8")
+    return struct.pack("<Q", len(data)) + data
+
+
+def gguf_kv(key, value):
+    if isinstance(value, str):
+        return gguf_string(key) + struct.pack("<I", gguf_reader.STRING) + gguf_string(value)
+    if isinstance(value, list):
+        body = struct.pack("<IQ", gguf_reader.STRING, len(value)) + b"".join(gguf_string(v) for v in value)
+        return gguf_string(key) + struct.pack("<I", gguf_reader.ARRAY) + body
+    return gguf_string(key) + struct.pack("<II", gguf_reader.UINT32, value)
+
+
+def write_gguf(path, metadata, tensors):
+    """Write a header-only GGUF v3 file; tensors are (name, shape, ggml_type)."""
+    out = [b"GGUF", struct.pack("<IQQ", 3, len(tensors), len(metadata))]
+    out += [gguf_kv(k, v) for k, v in metadata.items()]
+    offset = 0
+    for name, shape, ggml_type in tensors:
+        out.append(gguf_string(name) + struct.pack("<I", len(shape)) + struct.pack(f"<{len(shape)}Q", *shape))
+        out.append(struct.pack("<IQ", ggml_type, offset))
+        offset += 1024
+    path.write_bytes(b"".join(out))
+    return path
+
+
+TEMPLATE = "{% for m in messages %}<|{{ m.role }}|>{{ m.content }}</s>{% endfor %}<|assistant|>"
+
+
+def write_model(path, name="zephyr", layers=32, template=TEMPLATE):
+    metadata = {
+        "general.architecture": "llama",
+        "general.name": name,
+        "general.file_type": 15,
+        "llama.block_count": layers,
+        "llama.context_length": 4096,
+        "tokenizer.ggml.tokens": ["<unk>", "<s>", "</s>"] + ["tok"] * 997,
+        "tokenizer.ggml.bos_token_id": 1,
+        "tokenizer.ggml.eos_token_id": 2,
+    }
+    if template:
+        metadata["tokenizer.chat_template"] = template
+    return write_gguf(path, metadata, [("blk.0.attn_q.weight", (4096, 4096), Q4_K)])
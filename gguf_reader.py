@@ -0,0 +1,249 @@
+# gguf_reader.py — Minimal GGUF header reader (metadata KV + tensor infos, no tensor data)
+#
+# Only the header at the front of the file is touched, through mmap, so reading
+# a multi-GB model costs a few page faults rather than a full read.
+
+import functools
+import mmap
+import os
+import struct
+
+GGUF_MAGIC = b"GGUF"
+
+# GGUF metadata value types
+UINT8, INT8, UINT16, INT16, UINT32, INT32, FLOAT32, BOOL, STRING, ARRAY, UINT64, INT64, FLOAT64 = range(13)
+
+_SCALARS = {
+    UINT8: "<B", INT8: "<b", UINT16: "<H", INT16: "<h", UINT32: "<I", INT32: "<i",
+    FLOAT32: "<f", BOOL: "<?", UINT64: "<Q", INT64: "<q", FLOAT64: "<d",
+}
+
+# ggml tensor type → (elements per block, bytes per block)
+GGML_TYPE_SIZES = {
+    0: (1, 4),       # F32
+    1: (1, 2),       # F16
+    2: (32, 18),     # Q4_0
+    3: (32, 20),     # Q4_1
+    6: (32, 22),     # Q5_0
+    7: (32, 24),     # Q5_1
+    8: (32, 34),     # Q8_0
+    9: (32, 36),     # Q8_1
+    10: (256, 84),   # Q2_K
+    11: (256, 110),  # Q3_K
+    12: (256, 144),  # Q4_K
+    13: (256, 176),  # Q5_K
+    14: (256, 210),  # Q6_K
+    15: (256, 292),  # Q8_K
+    16: (256, 66),   # IQ2_XXS
+    17: (256, 74),   # IQ2_XS
+    18: (256, 98),   # IQ3_XXS
+    19: (256, 50),   # IQ1_S
+    20: (32, 18),    # IQ4_NL
+    21: (256, 110),  # IQ3_S
+    22: (256, 82),   # IQ2_S
+    23: (256, 136),  # IQ4_XS
+    24: (1, 1),      # I8
+    25: (1, 2),      # I16
+    26: (1, 4),      # I32
+    27: (1, 8),      # I64
+    28: (1, 8),      # F64
+    29: (256, 56),   # IQ1_M
+    30: (1, 2),      # BF16
+}
+
+# general.file_type → quantization label used in model filenames
+FILE_TYPES = {
+    0: "F32", 1: "F16", 2: "Q4_0", 3: "Q4_1", 7: "Q8_0", 8: "Q5_0", 9: "Q5_1",
+    10: "Q2_K", 11: "Q3_K_S", 12: "Q3_K_M", 13: "Q3_K_L", 14: "Q4_K_S", 15: "Q4_K_M",
+    16: "Q5_K_S", 17: "Q5_K_M", 18: "Q6_K", 19: "IQ2_XXS", 20: "IQ2_XS", 21: "Q2_K_S",
+    22: "IQ3_XS", 23: "IQ3_XXS", 24: "IQ1_S", 25: "IQ4_NL", 26: "IQ3_S", 27: "IQ3_M",
+    28: "IQ2_S", 29: "IQ2_M", 30: "IQ4_XS", 31: "IQ1_M", 32: "BF16",
+}
+
+
+class GGUFError(ValueError):
+    pass
+
+
+class TensorInfo:
+    __slots__ = ("name", "shape", "ggml_type", "offset")
+
+    def __init__(self, name, shape, ggml_type, offset):
+        self.name = name
+        self.shape = shape
+        self.ggml_type = ggml_type
+        self.offset = offset
+
+    @property
+    def n_elements(self):
+        n = 1
+        for dim in self.shape:
+            n *= dim
+        return n
+
+    @property
+    def n_bytes(self):
+        block, size = GGML_TYPE_SIZES.get(self.ggml_type, (1, 4))
+        return self.n_elements // block * size
+
+
+class GGUFHeader:
+    def __init__(self, version, metadata, tensors, header_size, array_offsets=None):
+        self.version = version
+        self.metadata = metadata
+        self.tensors = tensors
+        self.header_size = header_size
+        self.array_offsets = array_offsets or {}   # Skipped array key → file offset, for read_array_items
+
+    def get(self, key, default=None):
+        return self.metadata.get(key, default)
+
+    @property
+    def architecture(self):
+        return self.metadata.get("general.architecture", "llama")
+
+    def arch_get(self, suffix, default=None):
+        """Architecture-scoped key, e.g. arch_get('block_count') → llama.block_count."""
+        return self.metadata.get(f"{self.architecture}.{suffix}", default)
+
+
+class _Cursor:
+    def __init__(self, buf):
+        self.buf = buf
+        self.pos = 0
+
+    def unpack(self, fmt):
+        try:
+            value = struct.unpack_from(fmt, self.buf, self.pos)
+        except struct.error:
+            raise GGUFError("Truncated GGUF header")
+        self.pos += struct.calcsize(fmt)
+        return value[0] if len(value) == 1 else value
+
+    def string(self):
+        length = self.unpack("<Q")
+        end = self.pos + length
+        if end > len(self.buf):
+            raise GGUFError("Truncated GGUF string")
+        value = bytes(self.buf[self.pos:end]).decode("utf-8", errors="replace")
+        self.pos = end
+        return value
+
+    def skip_string(self):
+        self.skip(self.unpack("<Q"))
+
+    def skip(self, n_bytes):
+        if self.pos + n_bytes > len(self.buf):
+            raise GGUFError("Truncated GGUF header")
+        self.pos += n_bytes
+
+    def value(self, vtype, skip_arrays):
+        if vtype == STRING:
+            return self.string()
+        if vtype == ARRAY:
+            elem_type, count = self.unpack("<IQ")
+            if skip_arrays:
+                self.skip_array(elem_type, count)
+                return None
+            if elem_type in _SCALARS:
+                fmt = _SCALARS[elem_type]
+                if self.pos + struct.calcsize(fmt) * count > len(self.buf):
+                    raise GGUFError("Truncated GGUF array")
+                values = struct.unpack_from(f"<{count}{fmt[1]}", self.buf, self.pos)
+                self.pos += struct.calcsize(fmt) * count
+                return list(values)
+            return [self.value(elem_type, skip_arrays) for _ in range(count)]
+        if vtype in _SCALARS:
+            return self.unpack(_SCALARS[vtype])
+        raise GGUFError(f"Unknown GGUF value type {vtype}")
+
+    def skip_array(self, elem_type, count):
+        if elem_type in _SCALARS:
+            self.skip(struct.calcsize(_SCALARS[elem_type]) * count)
+        elif elem_type == STRING:
+            for _ in range(count):
+                self.skip_string()
+        else:
+            for _ in range(count):
+                self.value(elem_type, skip_arrays=True)
+
+
+def parse_header(buf, tensors=True, skip_arrays=False, keep_arrays=()):
+    """Parse a GGUF header from a bytes-like buffer.
+
+    `skip_arrays` leaves array values (tokenizer vocab etc.) out of the metadata
+    unless their key is listed in `keep_arrays`; `tensors=False` stops after the KV section.
+    """
+    cursor = _Cursor(buf)
+    if bytes(buf[:4]) != GGUF_MAGIC:
+        raise GGUFError("Not a GGUF file")
+    cursor.pos = 4
+    version = cursor.unpack("<I")
+    if version < 2:
+        raise GGUFError(f"Unsupported GGUF version {version}")
+    n_tensors, n_kv = cursor.unpack("<QQ")
+
+    metadata = {}
+    array_offsets = {}
+    for _ in range(n_kv):
+        key = cursor.string()
+        vtype = cursor.unpack("<I")
+        skip = skip_arrays and key not in keep_arrays
+        if vtype == ARRAY and skip:
+            array_offsets[key] = cursor.pos
+        value = cursor.value(vtype, skip)
+        if value is not None:
+            metadata[key] = value
+
+    infos = []
+    if tensors:
+        for _ in range(n_tensors):
+            name = cursor.string()
+            n_dims = cursor.unpack("<I")
+            shape = tuple(cursor.unpack("<Q") for _ in range(n_dims))
+            ggml_type, offset = cursor.unpack("<IQ")
+            infos.append(TensorInfo(name, shape, ggml_type, offset))
+
+    return GGUFHeader(version, metadata, infos, cursor.pos, array_offsets)
+
+
+def read_header(path, tensors=True, skip_arrays=False, keep_arrays=()):
+    """Read the GGUF header of `path` through mmap."""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return parse_header(mm, tensors=tensors, skip_arrays=skip_arrays, keep_arrays=keep_arrays)
+
+
+def read_array_items(path, offset, indexes):
+    """Decode only the `indexes` of the string array at `offset` (see GGUFHeader.array_offsets).
+
+    The strings before the last wanted index are stepped over by their length
+    prefix, so picking the BOS/EOS tokens never decodes the whole vocabulary.
+    """
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            cursor = _Cursor(mm)
+            cursor.pos = offset
+            elem_type, count = cursor.unpack("<IQ")
+            if elem_type != STRING:
+                raise GGUFError(f"Array at {offset} holds type {elem_type}, not strings")
+            wanted = {i for i in indexes if i is not None and 0 <= i < count}
+            items = {}
+            for i in range(max(wanted, default=-1) + 1):
+                if i in wanted:
+                    items[i] = cursor.string()
+                else:
+                    cursor.skip_string()
+            return items
+
+
+def read_vocab(path):
+    """(tokens, tokenizer model) of a GGUF file; the last few are kept, keyed on path, size and mtime."""
+    stat = os.stat(path)
+    return _read_vocab(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=2)
+def _read_vocab(path, size, mtime_ns):
+    header = read_header(path, tensors=False, skip_arrays=True, keep_arrays=("tokenizer.ggml.tokens",))
+    return header.get("tokenizer.ggml.tokens") or [], header.get("tokenizer.ggml.model", "llama")
@@ -1,22 +1,17 @@
-import torch
-from pynvml import (
-    nvmlInit,
-    nvmlDeviceGetHandleByIndex,
-    nvmlDeviceGetMemoryInfo,
-)
-
-nvmlInit()
+from gpu_telemetry import get_telemetry
 
 DEFAULT_GPU_INDEX = 0
 DEFAULT_THRESHOLD_MB = 2100
 
-def get_free_gpu_mem_mb(idx=DEFAULT_GPU_INDEX):
-    handle = nvmlDeviceGetHandleByIndex(idx)
-    info = nvmlDeviceGetMemoryInfo(handle)
-    return info.free / (1024 * 1024)
+def get_free_gpu_mem_mb(idx=DEFAULT_GPU_INDEX, fresh=False):
+    # Served from the background sampler; fresh=True forces a new reading
+    return get_telemetry(idx).free_mb(fresh=fresh)
+
+def get_fresh_free_gpu_mem_mb(idx=DEFAULT_GPU_INDEX):
+    return get_free_gpu_mem_mb(idx, fresh=True)
 
 def can_use_gpu(threshold_mb=DEFAULT_THRESHOLD_MB):
-    if not torch.cuda.is_available():
+    if not get_telemetry().available:
         return False
     free_mb = get_free_gpu_mem_mb()
     print(f"[GPU Manager] Free GPU memory: {free_mb:.2f} MB (Threshold: {threshold_mb} MB)")
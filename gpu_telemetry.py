@@ -0,0 +1,211 @@
+# gpu_telemetry.py — Cached GPU memory/utilization readings sampled on a background thread
+#
+# Callers used to shell out to nvidia-smi (tens of ms each, several times per
+# turn). Here one backend (NVML, torch, or a fake for tests) is polled by a
+# daemon thread into a ring buffer; readers get the latest sample from memory.
+
+import collections
+import os
+import sys
+import threading
+import time
+
+SAMPLE_INTERVAL = 0.25   # Seconds between background samples
+HISTORY_SIZE    = 240    # Samples kept (one minute at the default interval)
+MAX_AGE         = 1.0    # Older cached samples are refreshed synchronously on read
+
+MB = 1024 * 1024
+
+
+class GPUSample:
+    __slots__ = ("time", "free_mb", "used_mb", "total_mb", "utilization", "temperature")
+
+    def __init__(self, time, free_mb, used_mb, total_mb, utilization=None, temperature=None):
+        self.time = time
+        self.free_mb = free_mb
+        self.used_mb = used_mb
+        self.total_mb = total_mb
+        self.utilization = utilization   # Percent, if the backend reports it
+        self.temperature = temperature   # °C, if the backend reports it
+
+
+# --- Backends ---------------------------------------------------------------
+
+class NvmlBackend:
+    name = "nvml"
+    available = True
+
+    def __init__(self, index=0):
+        import pynvml
+        pynvml.nvmlInit()
+        self._nvml = pynvml
+        self._handle = pynvml.nvmlDeviceGetHandleByIndex(index)
+
+    def sample(self):
+        nvml = self._nvml
+        mem = nvml.nvmlDeviceGetMemoryInfo(self._handle)
+        try:
+            util = nvml.nvmlDeviceGetUtilizationRates(self._handle).gpu
+        except nvml.NVMLError:
+            util = None
+        try:
+            temp = nvml.nvmlDeviceGetTemperature(self._handle, nvml.NVML_TEMPERATURE_GPU)
+        except nvml.NVMLError:
+            temp = None
+        return GPUSample(time.monotonic(), mem.free / MB, mem.used / MB, mem.total / MB, util, temp)
+
+
+class TorchBackend:
+    name = "torch"
+    available = True
+
+    def __init__(self, index=0):
+        import torch
+        if not torch.cuda.is_available():
+            raise RuntimeError("CUDA is not available to torch")
+        self._torch = torch
+        self._index = index
+
+    def sample(self):
+        free, total = self._torch.cuda.mem_get_info(self._index)
+        return GPUSample(time.monotonic(), free / MB, (total - free) / MB, total / MB)
+
+
+class FakeBackend:
+    """Simulated card for tests and machines without a GPU driver."""
+
+    name = "fake"
+    available = True
+
+    def __init__(self, total_mb=8192, used_mb=0, utilization=0):
+        self.total_mb = total_mb
+        self.used_mb = used_mb
+        self.utilization = utilization
+        self.reads = 0
+
+    def sample(self):
+        self.reads += 1
+        return GPUSample(time.monotonic(), self.total_mb - self.used_mb, self.used_mb,
+                         self.total_mb, self.utilization)
+
+
+class NullBackend:
+    """No usable GPU: reports zero memory and never samples in the background."""
+
+    name = "none"
+    available = False
+
+    def sample(self):
+        return GPUSample(time.monotonic(), 0.0, 0.0, 0.0)
+
+
+def select_backend(index=0, preferred=None):
+    """NVML if present, else torch (only if already imported — it is slow to import), else none."""
+    preferred = preferred or os.environ.get("ARC_GPU_TELEMETRY")
+    if preferred == "fake":
+        return FakeBackend()
+    if preferred == "none":
+        return NullBackend()
+    if preferred in (None, "nvml"):
+        try:
+            return NvmlBackend(index)
+        except Exception:
+            pass
+    if preferred == "torch" or "torch" in sys.modules:
+        try:
+            return TorchBackend(index)
+        except Exception:
+            pass
+    return NullBackend()
+
+
+# --- Telemetry --------------------------------------------------------------
+
+class GPUTelemetry:
+    def __init__(self, backend, interval=SAMPLE_INTERVAL, history=HISTORY_SIZE, max_age=MAX_AGE):
+        self.backend = backend
+        self.interval = interval
+        self.max_age = max_age
+        self._samples = collections.deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def available(self):
+        return self.backend.available
+
+    def start(self):
+        if self._thread is not None or not self.backend.available:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="gpu-telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ [GPU] Telemetry sample failed: {e}")
+            self._stop.wait(self.interval)
+
+    def refresh(self):
+        """Take a sample now (e.g. right after a large allocation) and return it."""
+        sample = self.backend.sample()
+        with self._lock:
+            self._samples.append(sample)
+        return sample
+
+    def latest(self):
+        """The most recent sample; refreshed synchronously only if missing or stale."""
+        with self._lock:
+            sample = self._samples[-1] if self._samples else None
+        if sample is None or time.monotonic() - sample.time > self.max_age:
+            sample = self.refresh()
+        return sample
+
+    def free_mb(self, fresh=False):
+        return (self.refresh() if fresh else self.latest()).free_mb
+
+    def history(self, seconds=None):
+        with self._lock:
+            samples = list(self._samples)
+        if seconds is not None:
+            cutoff = time.monotonic() - seconds
+            samples = [s for s in samples if s.time >= cutoff]
+        return samples
+
+    def summary(self):
+        if not self.available:
+            return "no GPU telemetry"
+        s = self.latest()
+        parts = [f"{s.used_mb:.0f}/{s.total_mb:.0f} MB used", f"{s.free_mb:.0f} MB free"]
+        if s.utilization is not None:
+            parts.append(f"util {s.utilization}%")
+        if s.temperature is not None:
+            parts.append(f"{s.temperature}°C")
+        recent = self.history(seconds=10)
+        if len(recent) > 1:
+            parts.append(f"min free 10s {min(r.free_mb for r in recent):.0f} MB")
+        return f"[{self.backend.name}] " + " | ".join(parts)
+
+
+_telemetry = {}
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry(index=0):
+    """Shared telemetry for GPU `index`; the backend is chosen and the sampler started on first use."""
+    with _telemetry_lock:
+        if index not in _telemetry:
+            telemetry = GPUTelemetry(select_backend(index))
+            telemetry.start()
+            _telemetry[index] = telemetry
+        return _telemetry[index]
@@ -0,0 +1,173 @@
+# layer_planner.py — Picks --ngl and context size from GGUF metadata and measured free VRAM
+#
+# Instead of launching llama.cpp with a ladder of ngl/context guesses and
+# retrying on failure, read the layer count, per-layer tensor sizes and KV-cache
+# dimensions from the model header and compute the largest offload that fits.
+
+import logging
+import os
+from pathlib import Path
+
+from gguf_reader import FILE_TYPES, GGUFError, read_header
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_SIZES   = (4096, 2048, 1024)   # Candidate contexts, largest first
+CUDA_CONTEXT_MB = 300     # CUDA runtime + cuBLAS workspace of a fresh worker process
+SAFETY_MB       = 256     # Headroom for fragmentation and other processes
+BATCH_SIZE      = 512     # llama.cpp default n_batch; sizes the compute buffer
+KV_BYTES        = 2       # f16 KV cache
+FALLBACK_NGL    = 24      # Used when the header cannot be read (old behaviour)
+
+MB = 1024 * 1024
+
+
+class ModelLayout:
+    """Sizes needed for planning, derived once from a GGUF header."""
+
+    def __init__(self, n_layer, layer_bytes, output_bytes, n_embd, n_head, n_embd_k, n_embd_v,
+                 n_vocab, n_ctx_train=None, quant=None):
+        self.n_layer = n_layer
+        self.layer_bytes = layer_bytes      # list, one entry per repeating block
+        self.output_bytes = output_bytes    # output norm + output projection
+        self.n_embd = n_embd
+        self.n_head = n_head
+        self.n_embd_k = n_embd_k            # K width per token per layer (all KV heads)
+        self.n_embd_v = n_embd_v
+        self.n_vocab = n_vocab
+        self.n_ctx_train = n_ctx_train
+        self.quant = quant
+
+    @classmethod
+    def from_header(cls, header):
+        n_layer = int(header.arch_get("block_count", 0))
+        if not n_layer:
+            raise GGUFError("GGUF header has no block_count")
+        n_embd = int(header.arch_get("embedding_length"))
+        n_head = int(header.arch_get("attention.head_count"))
+        n_head_kv = int(header.arch_get("attention.head_count_kv", n_head))
+        head_dim = n_embd // n_head
+        n_embd_k = int(header.arch_get("attention.key_length", head_dim)) * n_head_kv
+        n_embd_v = int(header.arch_get("attention.value_length", head_dim)) * n_head_kv
+
+        layer_bytes = [0] * n_layer
+        output_bytes = 0
+        n_vocab = header.arch_get("vocab_size")
+        for tensor in header.tensors:
+            if tensor.name.startswith("blk."):
+                index = int(tensor.name.split(".", 2)[1])
+                if index < n_layer:
+                    layer_bytes[index] += tensor.n_bytes
+            elif tensor.name.startswith("output"):
+                output_bytes += tensor.n_bytes
+            if tensor.name == "token_embd.weight" and n_vocab is None:
+                n_vocab = tensor.shape[-1]
+
+        return cls(
+            n_layer=n_layer,
+            layer_bytes=layer_bytes,
+            output_bytes=output_bytes,
+            n_embd=n_embd,
+            n_head=n_head,
+            n_embd_k=n_embd_k,
+            n_embd_v=n_embd_v,
+            n_vocab=int(n_vocab or 32000),
+            n_ctx_train=header.arch_get("context_length"),
+            quant=FILE_TYPES.get(header.get("general.file_type")),
+        )
+
+    def kv_bytes_per_layer(self, context_size):
+        return context_size * (self.n_embd_k + self.n_embd_v) * KV_BYTES
+
+    def compute_bytes(self, context_size, output_on_gpu):
+        # f32 activations for one batch plus the KQ score matrix; logits if the output layer is offloaded
+        scratch = BATCH_SIZE * self.n_embd * 4 * 8 + BATCH_SIZE * context_size * self.n_head * 4
+        if output_on_gpu:
+            scratch += BATCH_SIZE * self.n_vocab * 4
+        return scratch
+
+    def vram_mb(self, ngl, context_size):
+        """Estimated VRAM for offloading `ngl` layers (n_layer + 1 includes the output layer)."""
+        if ngl <= 0:
+            return 0.0
+        layers = min(ngl, self.n_layer)
+        output_on_gpu = ngl > self.n_layer
+        total = sum(self.layer_bytes[self.n_layer - layers:])   # llama.cpp offloads the last layers
+        total += layers * self.kv_bytes_per_layer(context_size)
+        total += self.compute_bytes(context_size, output_on_gpu)
+        if output_on_gpu:
+            total += self.output_bytes
+        return total / MB + CUDA_CONTEXT_MB
+
+
+class LayerPlan:
+    __slots__ = ("ngl", "context_size", "vram_mb", "n_layer", "reason")
+
+    def __init__(self, ngl, context_size, vram_mb, n_layer, reason):
+        self.ngl = ngl
+        self.context_size = context_size
+        self.vram_mb = vram_mb
+        self.n_layer = n_layer
+        self.reason = reason
+
+    @property
+    def on_gpu(self):
+        return self.ngl > 0
+
+    def __repr__(self):
+        return (f"LayerPlan(ngl={self.ngl}, context_size={self.context_size}, "
+                f"vram_mb={self.vram_mb:.0f}, reason={self.reason!r})")
+
+
+def plan_layers(layout, free_mb, contexts=CONTEXT_SIZES, safety_mb=SAFETY_MB):
+    """Largest ngl that fits `free_mb`; among equal ngl, the largest context."""
+    usable = free_mb - safety_mb
+    candidates = [c for c in contexts if not layout.n_ctx_train or c <= layout.n_ctx_train] or [min(contexts)]
+
+    best = None
+    for context_size in candidates:
+        ngl = 0
+        for n in range(layout.n_layer + 1, 0, -1):
+            if layout.vram_mb(n, context_size) <= usable:
+                ngl = n
+                break
+        if best is None or ngl > best[0] or (ngl == best[0] and context_size > best[1]):
+            best = (ngl, context_size)
+
+    ngl, context_size = best
+    if ngl == 0:
+        reason = f"cpu: {free_mb:.0f} MB free is below one layer"
+    elif ngl > layout.n_layer:
+        reason = "full offload"
+    else:
+        reason = f"partial offload {ngl}/{layout.n_layer + 1}"
+    return LayerPlan(ngl, context_size, layout.vram_mb(ngl, context_size), layout.n_layer, reason)
+
+
+_layouts = {}   # (path, size, mtime) → ModelLayout
+
+
+def load_layout(model_path):
+    """ModelLayout for a GGUF file, memoized on path, size and mtime."""
+    stat = os.stat(model_path)
+    key = (os.path.abspath(model_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _layouts:
+        _layouts[key] = ModelLayout.from_header(read_header(model_path, skip_arrays=True))
+    return _layouts[key]
+
+
+def plan_for_model(model_path, free_mb, contexts=CONTEXT_SIZES, safety_mb=SAFETY_MB):
+    """Plan a launch for `model_path`; falls back to the old fixed ngl if the header is unreadable."""
+    try:
+        layout = load_layout(model_path)
+    except (OSError, GGUFError, KeyError, TypeError, ValueError) as e:
+        logger.warning(f"[Planner] Cannot read GGUF header of {model_path}: {e}")
+        ngl = FALLBACK_NGL if free_mb > 0 else 0
+        return LayerPlan(ngl, contexts[0], 0.0, None, "header unreadable, using defaults")
+
+    plan = plan_layers(layout, free_mb, contexts, safety_mb)
+    logger.info(
+        f"[Planner] {Path(model_path).name} ({layout.quant or 'unknown quant'}, {layout.n_layer} layers) "
+        f"| free {free_mb:.0f} MB → ngl={plan.ngl}, ctx={plan.context_size}, ~{plan.vram_mb:.0f} MB ({plan.reason})"
+    )
+    return plan
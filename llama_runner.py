@@ -4,6 +4,7 @@ import subprocess
 import shutil
 import os
 import torch
+from layer_planner import plan_for_model
 
 MODEL_PATH = "/home/strongwatchman/llama.cpp/models/zephyr/zephyr-7b-alpha.Q4_K_M.gguf"
 LLAMA_CPP_PATH = "/home/strongwatchman/llama.cpp"
@@ -12,23 +13,23 @@ DEFAULT_TEMP_FILE = "llm_reply.txt"
 def run_llm_query(prompt, temp_file=DEFAULT_TEMP_FILE):
     # Check for GPU availability
     has_gpu = torch.cuda.is_available()
-    fallback_ngl = [24, 20, 16, 12, 8, 4]
+    mem_free = torch.cuda.mem_get_info()[0] / 1024**2 if has_gpu else 0
 
     if has_gpu:
-        mem_free = torch.cuda.mem_get_info()[0] / 1024**2
         print(f"[LLM] GPU available. Free memory: {mem_free:.2f} MB")
     else:
         print("[LLM] No CUDA GPU detected. Using CPU.")
-        fallback_ngl = []
 
-    for ngl in fallback_ngl:
-        print(f"[LLM] Attempting with --ngl {ngl}, free GPU memory: {mem_free:.2f} MB")
-        result = _run_llama(prompt, ngl=ngl, temp_file=temp_file)
+    # One launch sized from the model header instead of retrying a list of ngl values
+    plan = plan_for_model(MODEL_PATH, mem_free)
+    if plan.ngl:
+        print(f"[LLM] Planned --ngl {plan.ngl} (~{plan.vram_mb:.0f} MB of {mem_free:.2f} MB free)")
+        result = _run_llama(prompt, ngl=plan.ngl, temp_file=temp_file)
         if result:
             return result
 
     # CPU fallback
-    print("[LLM] GPU attempts exhausted — switching to CPU.")
+    print("[LLM] GPU launch unavailable or failed — switching to CPU.")
     return _run_llama(prompt, ngl=None, temp_file=temp_file)
 
 def _run_llama(prompt, ngl=None, temp_file=DEFAULT_TEMP_FILE):
@@ -0,0 +1,219 @@
+# llm_engine.py — Owns one long-lived LLM worker process and routes prompts to it
+
+import json
+import logging
+import os
+import queue
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_worker.py")
+READY_TIMEOUT = 180   # Seconds to wait for the worker to load the model
+TOKEN_TIMEOUT = 180   # Seconds to wait for the next token before giving up
+
+logger = logging.getLogger(__name__)
+
+
+class LLMWorkerError(RuntimeError):
+    pass
+
+
+class LLMEngine:
+    """Keeps one worker process alive per (model, context size, ngl) configuration.
+
+    The worker is started on first use, reused for every prompt, and restarted
+    only when the requested configuration changes or the process has died.
+    """
+
+    def __init__(self, worker_cmd=None, ready_timeout=READY_TIMEOUT, token_timeout=TOKEN_TIMEOUT):
+        self.worker_cmd = list(worker_cmd) if worker_cmd else [sys.executable, WORKER_SCRIPT]
+        self.ready_timeout = ready_timeout
+        self.token_timeout = token_timeout
+        self._proc = None
+        self._lines = None
+        self._config = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()   # stdin is shared by stream() and cancel()
+        self._streaming = False
+        self.starts = 0
+        self.cancels = 0
+
+    # --- Worker lifecycle -------------------------------------------------
+
+    def is_alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    @property
+    def config(self):
+        """(model_path, context_size, ngl) of the running worker, or None."""
+        return self._config if self.is_alive() else None
+
+    def needs_restart(self, model_path, context_size, ngl):
+        return not self.is_alive() or self._config != (str(model_path), context_size, ngl)
+
+    def ensure_worker(self, model_path, context_size=2048, ngl=24):
+        if not self.needs_restart(model_path, context_size, ngl):
+            return
+        if self._proc is not None:
+            reason = "crashed" if not self.is_alive() else "model/config changed"
+            logger.info(f"[LLM] Restarting worker ({reason})")
+            self.shutdown()
+        self._start(str(model_path), context_size, ngl)
+
+    def _start(self, model_path, context_size, ngl):
+        cmd = self.worker_cmd + [
+            "--model", model_path,
+            "--context-size", str(context_size),
+            "--ngl", str(ngl),
+        ]
+        logger.info(f"[LLM] Starting worker: {' '.join(cmd)}")
+        start_time = time.time()
+        self._proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._pump_stdout, args=(self._proc, self._lines), daemon=True).start()
+        threading.Thread(target=self._pump_stderr, args=(self._proc,), daemon=True).start()
+        self._config = (model_path, context_size, ngl)
+        self.starts += 1
+
+        message = self._next_message(self.ready_timeout)
+        if not message.get("ready"):
+            self.shutdown()
+            raise LLMWorkerError(f"Worker failed to start: {message.get('error', message)}")
+        logger.info(f"[LLM] Worker ready in {time.time() - start_time:.2f}s")
+
+    @staticmethod
+    def _pump_stdout(proc, lines):
+        for line in proc.stdout:
+            lines.put(line)
+        lines.put(None)  # EOF — worker exited
+
+    @staticmethod
+    def _pump_stderr(proc):
+        for line in proc.stderr:
+            logger.debug(f"[LLM worker] {line.rstrip()}")
+
+    def _next_message(self, timeout):
+        while True:
+            try:
+                line = self._lines.get(timeout=timeout)
+            except queue.Empty:
+                self.shutdown()
+                raise LLMWorkerError(f"Worker did not respond within {timeout}s")
+            if line is None:
+                code = self._proc.poll() if self._proc else None
+                self._proc = None
+                raise LLMWorkerError(f"Worker exited unexpectedly (code {code})")
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                return json.loads(line)
+            except json.JSONDecodeError:
+                logger.debug(f"[LLM worker] {line}")
+
+    def _send(self, message):
+        with self._write_lock:
+            self._proc.stdin.write(json.dumps(message) + "\n")
+            self._proc.stdin.flush()
+
+    def cancel(self):
+        """Ask the worker to stop the response in progress; returns False if none is running.
+
+        Safe to call from any thread. The stream ends soon after with whatever
+        text was produced so far.
+        """
+        proc = self._proc
+        if not self._streaming or proc is None or proc.poll() is not None:
+            return False
+        try:
+            self._send({"cancel": True})
+        except (BrokenPipeError, OSError, ValueError):
+            return False
+        self.cancels += 1
+        logger.info("[LLM] Cancelling the response in progress")
+        return True
+
+    def shutdown(self):
+        proc, self._proc = self._proc, None
+        self._config = None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+    # --- Inference --------------------------------------------------------
+
+    def stream(self, prompt, model_path, context_size=2048, ngl=24, **params):
+        """Yield raw text pieces for one prompt as the worker produces them."""
+        with self._lock:
+            self.ensure_worker(model_path, context_size, ngl)
+            request = dict(params, prompt=prompt)
+            try:
+                self._send(request)
+            except (BrokenPipeError, OSError) as e:
+                self.shutdown()
+                raise LLMWorkerError(f"Worker pipe closed: {e}")
+
+            finished = False
+            self._streaming = True
+            try:
+                while True:
+                    message = self._next_message(self.token_timeout)
+                    if message.get("done"):
+                        finished = True
+                        self._streaming = False
+                    if message.get("cancelled"):
+                        logger.info("[LLM] Response cancelled")
+                    if "prefix_cache" in message:
+                        logger.info(f"[LLM] Prompt prefix state: {message['prefix_cache']}")
+                    if "token" in message:
+                        yield message["token"]
+                    if message.get("error"):
+                        raise LLMWorkerError(message["error"])
+                    if finished:
+                        return
+            finally:
+                if not finished and self.is_alive():
+                    # Caller stopped early — stop the worker and drain so the next prompt starts clean
+                    self.cancel()
+                    self._drain()
+                self._streaming = False
+
+    def _drain(self):
+        try:
+            while not self._next_message(self.token_timeout).get("done"):
+                pass
+        except LLMWorkerError:
+            pass
+
+    def generate(self, prompt, model_path, context_size=2048, ngl=24, **params):
+        return "".join(self.stream(prompt, model_path, context_size, ngl, **params))
+
+
+_engine = None
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        # ARC_LLM_WORKER replaces the worker command (e.g. a stand-in worker for benchmarks)
+        worker_cmd = os.environ.get("ARC_LLM_WORKER")
+        _engine = LLMEngine(worker_cmd=shlex.split(worker_cmd) if worker_cmd else None)
+    return _engine
@@ -1,154 +1,296 @@
 # llm_handler.py
 
-import subprocess
-import gc
 import time
 import logging
 import os
 import re
 import traceback
 from model_selector import get_selected_model
+from config import SYSTEM_PROMPT
+from llm_engine import get_engine, LLMWorkerError
+from layer_planner import plan_for_model
+from model_catalog import get_model_info
+from chat_templates import get_template
+from conversation import get_token_counter, turn_overhead
+from gpu_telemetry import get_telemetry
+from vram_gate import get_vram_gate
+from tracing import get_tracer
 
-LLAMA_RUN_PATH = "/home/strongwatchman/AI_Assistant/llama.cpp/build/bin/llama-run"
+MAX_TOKENS = 300
+SAMPLING_PARAMS = dict(max_tokens=MAX_TOKENS, temperature=0.7, top_k=40, top_p=0.95, repeat_penalty=1.1)
+CONTEXT_SIZES = (2048, 1024)   # Preferred first; the planner drops to 1024 only if it buys more layers
+LLM_MIN_VRAM_MB = 1500         # Below this a GPU launch is not worth it
+VRAM_WAIT_SECONDS = 6          # How long a worker start waits for memory before going CPU-only
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 
-def get_free_gpu_memory():
-    try:
-        output = subprocess.check_output(
-            ["nvidia-smi", "--query-gpu=memory.free", "--format=csv,nounits,noheader"],
-            encoding="utf-8"
-        )
-        free_memory = int(output.strip().split('\n')[0])
-        return free_memory  # Already in MB
-    except Exception as e:
-        logger.warning(f"[VRAM] Could not read GPU memory via nvidia-smi: {e}")
-        return 4096  # Fallback assumption
+def get_free_gpu_memory(fresh=False):
+    # Cached reading from the background sampler (no nvidia-smi subprocess)
+    return get_telemetry().free_mb(fresh=fresh)
 
 def gpu_available():
-    try:
-        subprocess.run(["nvidia-smi"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-        return True
-    except:
-        return False
-
-def clean_gpu_memory():
-    gc.collect()
-    if gpu_available():
-        try:
-            subprocess.run(["nvidia-smi", "--gpu-reset"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        except:
-            pass  # Ignore reset if unsupported
-        gc.collect()
+    return get_telemetry().available
 
 def log_gpu_status(header="GPU Status"):
-    logger.info("=" * 80)
-    logger.info(f"🧠 {header} — {time.strftime('%Y-%m-%d %H:%M:%S')}")
-    try:
-        output = subprocess.run(["nvidia-smi"], stdout=subprocess.PIPE, text=True)
-        logger.info(output.stdout)
-    except Exception as e:
-        logger.warning(f"[Diagnostics] Could not execute nvidia-smi: {e}")
-    logger.info("=" * 80)
-
-def wait_for_memory(threshold_mb=1500, max_attempts=10, delay=1.2):
-    logger.info("[VRAM] Attempting memory release...")
-    for attempt in range(1, max_attempts + 1):
-        clean_gpu_memory()
-        free_mem = get_free_gpu_memory()
-        logger.info(f"[VRAM] Freeing memory attempt {attempt}... Free: {free_mem:.2f} MB")
-        if free_mem >= threshold_mb:
-            logger.info(f"[VRAM] Enough memory freed after {attempt} attempts.")
-            return True
-        time.sleep(delay)
-    logger.warning(f"[VRAM] Cleanup failed: final free {get_free_gpu_memory():.2f} MB")
-    return False
+    logger.info(f"🧠 {header} — {get_telemetry().summary()}")
 
-def clean_llama_output(output: str) -> str:
-    output = re.sub(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])', '', output)
-    lines = output.splitlines()
-    filtered = [
-        line for line in lines
-        if not any(word in line.lower() for word in [
-            "loading model", "ggml", "llama", "warning", "error",
-            "initialize", "backend", "igor", "📊", "🧠", "🔍"
-        ])
+ANSI_ESCAPE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+NOISE_WORDS = [
+    "loading model", "ggml", "llama", "warning", "error",
+    "initialize", "backend", "igor", "📊", "🧠", "🔍"
+]
+SENTENCE_END = re.compile(r'[.!?]["\')\]]*\s')
+
+def is_output_line(line: str) -> bool:
+    return (
+        not any(word in line.lower() for word in NOISE_WORDS)
         and not line.strip().startswith("[")
-        and line.strip()
-    ]
+        and bool(line.strip())
+    )
+
+def clean_llama_output(output: str) -> str:
+    output = ANSI_ESCAPE.sub('', output)
+    filtered = [line for line in output.splitlines() if is_output_line(line)]
     return "\n".join(filtered).strip()
 
-def generate_response(prompt: str) -> str:
-    import traceback
+class LlamaOutputFilter:
+    """Applies the clean_llama_output rules to text as it streams in.
+
+    A line is judged once it is complete, or earlier as soon as its first
+    sentence has ended and that prefix passes the rules — after that the rest
+    of the line is passed through as it arrives, so long single-paragraph
+    answers still stream.
+    """
+
+    def __init__(self):
+        self._line = ""          # Raw text of the current, undecided line
+        self._passing = False    # Current line already accepted
+        self._emitted = False    # Anything emitted yet (for line separators)
+
+    def _start_line(self, text):
+        text = text.lstrip() if not self._emitted else text
+        prefix = "\n" if self._emitted else ""
+        self._emitted = True
+        return prefix + text
+
+    def _visible(self, text):
+        # Hold back an escape sequence that has not been fully received yet
+        cut = text.rfind("\x1b")
+        if cut != -1 and not ANSI_ESCAPE.match(text, cut):
+            return ANSI_ESCAPE.sub('', text[:cut]), text[cut:]
+        return ANSI_ESCAPE.sub('', text), ""
+
+    def feed(self, text: str) -> str:
+        out = []
+        self._line += text
+        while True:
+            newline = self._line.find("\n")
+            if newline == -1:
+                break
+            line, self._line = self._line[:newline], self._line[newline + 1:]
+            clean = ANSI_ESCAPE.sub('', line)
+            if self._passing:
+                out.append(clean)
+            elif is_output_line(clean):
+                out.append(self._start_line(clean))
+            self._passing = False
+
+        visible, held = self._visible(self._line)
+        if self._passing:
+            out.append(visible)
+            self._line = held
+        elif SENTENCE_END.search(visible) and is_output_line(visible):
+            out.append(self._start_line(visible))
+            self._passing = True
+            self._line = held
+        return "".join(out)
+
+    def flush(self) -> str:
+        clean = ANSI_ESCAPE.sub('', self._line)
+        self._line = ""
+        if self._passing:
+            self._passing = False
+            return clean.rstrip()
+        if is_output_line(clean):
+            return self._start_line(clean).rstrip()
+        return ""
+
+def _start_worker(engine, model_path):
+    """Reserve VRAM for a new worker, plan its offload and start it; CPU plan on timeout."""
+    if not gpu_available():
+        plan = plan_for_model(model_path, 0, contexts=CONTEXT_SIZES)
+        engine.ensure_worker(model_path, plan.context_size, plan.ngl)
+        return plan
+
+    gate = get_vram_gate()
+    reservation = gate.reserve(LLM_MIN_VRAM_MB, timeout=VRAM_WAIT_SECONDS, name="llm")
+    if reservation is None:
+        logger.warning(f"[VRAM] {LLM_MIN_VRAM_MB} MB not free within {VRAM_WAIT_SECONDS}s — running the LLM on CPU")
+        plan = plan_for_model(model_path, 0, contexts=CONTEXT_SIZES)
+        engine.ensure_worker(model_path, plan.context_size, plan.ngl)
+        return plan
+
+    with reservation:   # Settled once the worker has loaded its layers
+        plan = plan_for_model(model_path, reservation.mb + gate.available_mb(), contexts=CONTEXT_SIZES)
+        gate.grow(reservation, plan.vram_mb)
+        log_gpu_status("🔍 Before worker start")
+        engine.ensure_worker(model_path, plan.context_size, plan.ngl)
+    return plan
+
+def _ensure_worker(engine, model_path):
+    """(context_size, ngl) of a worker serving `model_path`, starting one if needed."""
+    # The worker keeps the model loaded between turns; only a (re)start needs free
+    # VRAM and a fresh layer plan (re-planning a running worker would restart it)
+    config = engine.config
+    if config and config[0] == str(model_path):
+        _, context_size, ngl = config
+        return context_size, ngl
+    if config:
+        engine.shutdown()          # Free the old model's VRAM before measuring
+        get_vram_gate().release()
+    plan = _start_worker(engine, model_path)
+    return plan.context_size, plan.ngl
+
+def warm_worker(model_path=None):
+    """Start the LLM worker for `model_path` (default: the selected model) before the first prompt."""
+    model_path = model_path or get_selected_model()
+    context_size, ngl = _ensure_worker(get_engine(), model_path)
+    logger.info(f"[LLM] Worker warm: {os.path.basename(str(model_path))} (ctx={context_size}, ngl={ngl})")
+
+def format_prompt(prompt: str, model_path, history=()):
+    """Render system prompt, history and user turn with the model's chat template.
+
+    Returns (formatted prompt, stable system prefix for the worker's prompt cache).
+    """
+    template = get_template(model_path)
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}, *history, {"role": "user", "content": prompt}]
+    return template.render(messages), template.prefix(SYSTEM_PROMPT)
+
+def response_cache_key(query: str, previous=None, model_path=None):
+    """Response-cache key for `query` under the model (default: the selected one), template and sampling settings.
+
+    `previous` is the question asked before this one: with conversation memory a
+    follow-up ("and how long does that take?") only means the same thing after
+    the same question.
+    """
+    from response_cache import make_key, normalize_query
+    model_path = model_path or get_selected_model()
+    params = dict(SAMPLING_PARAMS, previous=normalize_query(previous)) if previous else SAMPLING_PARAMS
+    return make_key(query, model_path, get_template(model_path).ident, params)
+
+def fit_history(prompt: str, model_path, context_size, conversation):
+    """Past turns from `conversation` that fit the context next to the prompt and the reply."""
+    if conversation is None:
+        return []
+    counter = get_token_counter(model_path)
+    bare_prompt, _ = format_prompt(prompt, model_path)
+    budget = context_size - SAMPLING_PARAMS["max_tokens"] - counter.count(bare_prompt)
+    if budget <= 0:
+        return []
+    history = conversation.window(budget, counter, turn_overhead(get_template(model_path), counter))
+    if history:
+        logger.info(f"[Memory] {len(history) // 2} past exchange(s) in context (budget {budget} tokens)")
+    return history
+
+def _prepare_request(prompt: str, conversation=None, model_path=None):
+    """Pick the model, make sure the worker can start and format the prompt with history."""
     from pathlib import Path
 
+    model_path = model_path or get_selected_model()
+    engine = get_engine()
+    stop = list(get_template(model_path).stop)
+    context_size, ngl = _ensure_worker(engine, model_path)
+
+    history = fit_history(prompt, model_path, context_size, conversation)
+    formatted_prompt, prefix = format_prompt(prompt, model_path, history)
+
+    info = get_model_info(model_path)
+    details = f" | {info.summary()}" if info else ""
+    logger.info(f"[LLM] Prompting worker: {Path(model_path).name} (ctx={context_size}, ngl={ngl}){details}")
+    return engine, formatted_prompt, dict(
+        model_path=model_path,
+        context_size=context_size,
+        ngl=ngl,
+        prefix=prefix,
+        stop=stop,
+        **SAMPLING_PARAMS,
+    )
+
+def cancel_response():
+    """Stop the LLM response in progress (barge-in); safe from any thread."""
+    return get_engine().cancel()
+
+def generate_response(prompt: str, conversation=None, model_path=None) -> str:
+    tracer = get_tracer()
     try:
-        model_path = get_selected_model()
-        model_name = Path(model_path).name.lower()
-
-        if not wait_for_memory():
-            logger.warning("[VRAM] Proceeding despite low memory — will attempt anyway.")
-
-        # Default LLM settings
-        default_ngl = 24
-        context_size = 2048
-        formatted_prompt = prompt
-        use_prompt_flag = True  # Default behavior: pass prompt as argument
-
-        # Model-specific prompt formatting
-        if "zephyr" in model_name or "mytho" in model_name or "mistral" in model_name:
-            # OpenChat-style format (Zephyr, Mythomist, Mistral variants)
-            formatted_prompt = f"<|user|>{prompt}<|assistant|>"
-            use_prompt_flag = False  # These expect prompt from STDIN
-
-        elif "airoboros" in model_name:
-            # Airoboros chat format
-            formatted_prompt = f"### Human:\n{prompt}\n### Assistant:"
-            use_prompt_flag = True
-
-        elif "openhermes" in model_name:
-            formatted_prompt = f"<|im_start|>user\n{prompt}<|im_end|>\n<|im_start|>assistant"
-            use_prompt_flag = True
-
-        elif "dan" in model_name or "adventurouswinds" in model_name:
-            formatted_prompt = f"{prompt}"
-            use_prompt_flag = False
-
-        # Llama-run command
-        cmd = [
-            LLAMA_RUN_PATH,
-            "--context-size", str(context_size),
-            "--ngl", str(default_ngl),
-            model_path
-        ]
-
-        if use_prompt_flag:
-            cmd += ["--prompt", formatted_prompt]
-
-        logger.info(f"[LLM] Launching: {' '.join(cmd)}")
-        log_gpu_status("🔍 Before inference")
+        with tracer.span("llm_prepare"):
+            engine, formatted_prompt, options = _prepare_request(prompt, conversation, model_path)
 
         start_time = time.time()
-        if use_prompt_flag:
-            result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=180)
-        else:
-            result = subprocess.run(cmd, input=formatted_prompt, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=180)
-
+        with tracer.span("llm"):
+            output = engine.generate(formatted_prompt, **options).strip()
         duration = time.time() - start_time
-        output = result.stdout.strip()
-        log_gpu_status("📊 After inference")
 
         logger.info(f"[LLM] Duration: {duration:.2f}s | Output length: {len(output)}")
-        clean_gpu_memory()
 
         return clean_llama_output(output) or "🤖 No response generated."
 
-    except subprocess.TimeoutExpired:
-        return "⏱️ Timeout during response generation."
+    except LLMWorkerError as e:
+        logger.error(f"❌ LLM worker failure: {e}")
+        return f"❌ LLM error occurred:\n{e}"
 
     except Exception as e:
         error_details = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
         logger.error(f"❌ LLM Critical Failure:\n{error_details}")
         return f"❌ LLM error occurred:\n{error_details}"
 
+def stream_response(prompt: str, conversation=None, model_path=None):
+    """Yield cleaned response text increments as the model produces them.
+
+    With a conversation.Conversation, the past turns that fit the worker's
+    context are sent along; recording the new exchange is left to the caller.
+    `model_path` overrides the selected model (a session's own choice).
+    """
+    emitted = False
+    tracer = get_tracer()
+    try:
+        with tracer.span("llm_prepare"):
+            engine, formatted_prompt, options = _prepare_request(prompt, conversation, model_path)
+        output_filter = LlamaOutputFilter()
+
+        start_time = time.time()
+        generate_start = tracer.clock()
+        first_token = None
+        length = 0
+        for token in engine.stream(formatted_prompt, **options):
+            if first_token is None:
+                first_token = time.time() - start_time
+                tracer.mark("llm_first_token")
+                logger.info(f"[LLM] First token after {first_token:.2f}s")
+            length += len(token)
+            piece = output_filter.feed(token)
+            if piece:
+                emitted = True
+                yield piece
+        tail = output_filter.flush()
+        tracer.mark("llm_last_token")
+        tracer.add_span("llm", generate_start, chars=length)
+        if tail:
+            emitted = True
+            yield tail
+
+        duration = time.time() - start_time
+        logger.info(f"[LLM] Duration: {duration:.2f}s | Output length: {length}")
+
+        if not emitted:
+            yield "🤖 No response generated."
+
+    except LLMWorkerError as e:
+        logger.error(f"❌ LLM worker failure: {e}")
+        yield f"❌ LLM error occurred:\n{e}"
+
+    except Exception as e:
+        error_details = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
+        logger.error(f"❌ LLM Critical Failure:\n{error_details}")
+        yield f"❌ LLM error occurred:\n{error_details}"
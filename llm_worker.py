@@ -0,0 +1,119 @@
+# llm_worker.py — Long-lived llama.cpp worker: loads a GGUF once and serves prompts over stdin/stdout
+#
+# Protocol (one JSON object per line):
+#   stdin  → {"prompt": "...", "max_tokens": 300, "temperature": 0.7, "stop": [...],
+#             "prefix": "..."}                 optional stable start of the prompt (KV state cached)
+#   stdin  → {"cancel": true}                 stop the response in progress (ignored when idle)
+#   stdout ← {"ready": true}                  once, after the model is loaded
+#   stdout ← {"prefix_cache": "disk"}         where the prefix state came from (memory/disk/computed)
+#   stdout ← {"token": "..."}                 for every generated piece of text
+#   stdout ← {"done": true}                   end of one response
+#   stdout ← {"done": true, "cancelled": true} response stopped early by a cancel
+#   stdout ← {"error": "...", "done": true}   request failed, worker keeps running
+
+import argparse
+import json
+import queue
+import sys
+import threading
+
+from prompt_cache import CACHE_DIR, DISK_BUDGET_MB, PromptCache, prime
+
+
+def emit(obj):
+    sys.stdout.write(json.dumps(obj) + "\n")
+    sys.stdout.flush()
+
+
+class CancelState:
+    """Which requests have been cancelled; a cancel applies to the latest prompt received."""
+
+    def __init__(self):
+        self.received = 0    # Prompts read from stdin so far
+        self.cancelled = 0   # Every prompt up to this number is cancelled
+
+    def is_cancelled(self, seq):
+        return self.cancelled >= seq
+
+
+def read_requests(requests, state):
+    """stdin reader thread: cancels take effect at once, prompts are queued in order."""
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            emit({"error": f"bad request: {e}", "done": True})
+            continue
+        if message.get("cancel"):
+            state.cancelled = state.received
+        else:
+            state.received += 1
+            requests.put((state.received, message))
+    requests.put(None)   # stdin closed — shut down
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Persistent llama.cpp worker")
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--context-size", type=int, default=2048)
+    parser.add_argument("--ngl", type=int, default=24)
+    parser.add_argument("--prompt-cache-dir", default=str(CACHE_DIR))
+    parser.add_argument("--prompt-cache-mb", type=float, default=DISK_BUDGET_MB)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    from llama_cpp import Llama
+
+    llm = Llama(
+        model_path=args.model,
+        n_ctx=args.context_size,
+        n_gpu_layers=args.ngl,
+        use_mmap=True,
+        use_mlock=False,
+        verbose=False,
+    )
+    prompt_cache = PromptCache(args.prompt_cache_dir, args.prompt_cache_mb)
+    emit({"ready": True})
+
+    requests = queue.Queue()
+    state = CancelState()
+    threading.Thread(target=read_requests, args=(requests, state), daemon=True).start()
+
+    for seq, request in iter(requests.get, None):
+        try:
+            prefix = request.get("prefix")
+            if prefix and request["prompt"].startswith(prefix):
+                emit({"prefix_cache": prime(llm, prompt_cache, args.model, args.context_size, prefix)})
+            chunks = llm(
+                request["prompt"],
+                max_tokens=request.get("max_tokens", 300),
+                temperature=request.get("temperature", 0.7),
+                top_k=request.get("top_k", 40),
+                top_p=request.get("top_p", 0.95),
+                repeat_penalty=request.get("repeat_penalty", 1.1),
+                stop=request.get("stop") or None,
+                stream=True,
+            )
+            for chunk in chunks:
+                if state.is_cancelled(seq):
+                    chunks.close()
+                    break
+                text = chunk["choices"][0]["text"]
+                if text:
+                    emit({"token": text})
+            if state.is_cancelled(seq):
+                emit({"done": True, "cancelled": True})
+            else:
+                emit({"done": True})
+        except Exception as e:
+            emit({"error": str(e), "done": True})
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,84 @@
 # main.py — Cleaned version with 'm' key for model selector
 
+import asyncio
 import os
+import sys
 import time
-import torch
 import gc
-from transcriber import transcribe
-from llm_handler import generate_response
-from tts_handler import speak_xtts
-from recorder import record_audio
-from state import init_xtts_model, get_xtts_model
+from contextlib import ExitStack
+from transcriber import transcribe, start_streaming
+from llm_handler import stream_response, response_cache_key, cancel_response
+from tts_handler import make_synthesizer, current_voice_id
+from pipeline import Console, TurnPipeline
+from response_cache import get_response_cache
+from conversation import get_conversation, get_token_counter
+from model_selector import get_selected_model
+from recorder import record_audio, get_capture_engine
+from barge_in import BargeInMonitor
+from tracing import get_tracer
+from model_registry import registry
+from vram_manager import get_residency_manager
 from voice_selector import choose_voice, test_voice, toggle_xtts_clone
 from model_selector import choose_model  # ✅ ADDED for 'm' key model switch
 
+# Set ARC_DEBUG_WAV=input.wav to keep a copy of each recording on disk
+DEBUG_WAV_PATH = os.environ.get("ARC_DEBUG_WAV")
+# Set ARC_STREAMING_ASR=0 to fall back to one Whisper pass after recording
+STREAMING_ASR = os.environ.get("ARC_STREAMING_ASR", "1") != "0"
+# Set ARC_RESPONSE_CACHE=0 to always ask the LLM (ARC_RESPONSE_CACHE_TTL=seconds expires answers)
+RESPONSE_CACHE = os.environ.get("ARC_RESPONSE_CACHE", "1") != "0"
+# Set ARC_MEMORY=0 to answer every question without the earlier turns
+MEMORY = os.environ.get("ARC_MEMORY", "1") != "0"
+# Set ARC_BARGE_IN=1 to let speech interrupt replies (headset only: there is no echo cancellation,
+# so with open speakers the reply's own audio would cut it off)
+BARGE_IN = os.environ.get("ARC_BARGE_IN", "0") == "1"
+# Set ARC_TRACE=trace.json to keep a Chrome trace (chrome://tracing, Perfetto) of every turn
+TRACE_PATH = os.environ.get("ARC_TRACE")
+
 def clean_gpu_memory():
     gc.collect()
-    if torch.cuda.is_available():
+    # Nothing to release until a model has pulled torch in
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
         torch.cuda.empty_cache()
 
 def initialize():
     print("🧹 Initializing assistant...")
-    clean_gpu_memory()
-    init_xtts_model()
-    print("\n✅ Voice Assistant Ready. XTTS expressive model active.\n")
+    print("\n✅ Voice Assistant Ready. Voice models are loading in the background.\n")
     print("🔘 Press Enter to talk | Type 't' to type | Press 'C' to choose voice")
-    print("🎤 Press 'X' to toggle XTTS cloning | Press 'V' to test voice | Press 'M' to switch model | Type 'q' to quit\n")
+    print("🎤 Press 'X' to toggle XTTS cloning | Press 'V' to test voice | Press 'M' to switch model | Type 'q' to quit")
+    if BARGE_IN:
+        print("⏹️ Press Enter while IGOR is speaking to stop the reply, or just start talking\n")
+    else:
+        print("⏹️ Press Enter while IGOR is speaking to stop the reply\n")
+    # Whisper and XTTS load concurrently; whichever stage needs one first waits for it
+    registry.warm(["xtts", "whisper"])
+
+def show_partial(committed, partial):
+    print(f"\r📝 {committed} {partial}".rstrip(), end="", flush=True)
 
-def handle_user_input(user_input):
+async def handle_user_input(user_input, console):
+    # Interactive menus call input() themselves; they run while no console read is pending
     if user_input.lower() == 'q':
         print("👋 Exiting.")
         return False, None
     elif user_input.lower() == 't':
-        query = input("📝 Type your message: ")
+        query = await console.readline("📝 Type your message: ")
     elif user_input.lower() == 'c':
-        choose_voice()
+        await asyncio.to_thread(choose_voice)
         return True, None
     elif user_input.lower() == 'v':
-        test_voice()
+        await asyncio.to_thread(test_voice)
         return True, None
     elif user_input.lower() == 'x':
-        toggle_xtts_clone()
+        await asyncio.to_thread(toggle_xtts_clone)
         return True, None
     elif user_input.lower() == 'm':
-        choose_model()  # ✅ Fixed block for 'm' model selector
+        await asyncio.to_thread(choose_model)  # ✅ Fixed block for 'm' model selector
         return True, None
     elif user_input == '':
-        record_audio("input.wav")
         try:
-            query = transcribe("input.wav")
+            query = await asyncio.to_thread(listen_resident)
         except Exception as e:
             print(f"❌ Transcription failed: {e}")
             return True, None
@@ -56,40 +88,206 @@ def handle_user_input(user_input):
 
     return True, query
 
-def assistant_loop():
+def listen_resident(resume=None):
+    with get_residency_manager().use("whisper"):
+        return listen_and_transcribe(resume)
+
+def listen_and_transcribe(resume=None):
+    if STREAMING_ASR:
+        # Whisper decodes while the user is still speaking; only the tail is left at the end
+        asr = start_streaming(on_update=show_partial)
+        try:
+            record_audio(DEBUG_WAV_PATH, on_chunk=asr.feed, resume=resume)
+            query = asr.finalize()
+        finally:
+            asr.close()   # A failed recording must not leave the decoder thread waiting
+        print()
+        return query
+    return transcribe(record_audio(DEBUG_WAV_PATH, resume=resume))
+
+def echo(pieces):
+    """on_text callback that prints streamed text and collects it into `pieces`."""
+    def on_text(piece):
+        print(piece, end="", flush=True)
+        pieces.append(piece)
+    return on_text
+
+async def hold_resident(stack, residency, *names):
+    # Loading or evicting models blocks, so it happens off the event loop
+    for name in names:
+        await asyncio.to_thread(stack.enter_context, residency.use(name))
+
+async def play_cached(path):
+    import soundfile as sf
+    audio, sample_rate = await asyncio.to_thread(sf.read, path, dtype="float32")
+    await TurnPipeline(None, sample_rate).play(audio)
+
+def load_voice(residency):
+    """(synthesize, sample_rate) for the current voice; XTTS is held resident per sentence."""
+    with residency.use("xtts"):   # Waits for the background XTTS load on first use
+        synthesize, sample_rate = make_synthesizer()
+
+    def synthesize_resident(sentence):
+        with residency.use("xtts"):
+            return synthesize(sentence)
+    return synthesize_resident, sample_rate
+
+async def speak(text, residency, keep_audio=False, on_text=None):
+    # The synthesis stage loads the voice, so the reply text streams even while XTTS is still loading
+    pipeline = TurnPipeline(None, None, load_voice=lambda: load_voice(residency))
+    return await pipeline.speak(text, keep_audio=keep_audio, on_text=on_text)
+
+def _lookup_cached(query, conversation=None):
+    """(cache, key, voice, cached entry or None); cache is None when disabled or unusable."""
+    if not RESPONSE_CACHE:
+        return None, None, None, None
+    try:
+        cache = get_response_cache()
+        key = response_cache_key(query, conversation.last_query() if conversation else None)
+        voice = current_voice_id()
+        return cache, key, voice, cache.get(key, voice=voice)
+    except Exception as e:
+        print(f"⚠️ [Cache] Lookup failed: {e}")
+        return None, None, None, None
+
+def _store_audio(cache, key, voice, stats):
+    if stats and stats.get("audio") is not None and stats["audio"].size:
+        cache.put_audio(key, voice, stats["audio"], stats["sample_rate"])
+
+def _remember(conversation, query, text):
+    if conversation is not None:
+        conversation.add_exchange(query, text, get_token_counter(get_selected_model()))
+
+async def answer(query, residency):
+    """Speak the reply to `query`, from the response cache when possible."""
+    conversation = get_conversation() if MEMORY else None
+    cache, key, voice, cached = _lookup_cached(query, conversation)
+    if cached is not None:
+        _remember(conversation, query, cached.text)
+        print(cached.text)
+        if cached.audio_path:
+            await play_cached(cached.audio_path)   # Neither the LLM nor XTTS is needed
+        else:
+            _store_audio(cache, key, voice, await speak(cached.text, residency, keep_audio=True))
+        print(f"[Cache] {cache.stats()}")
+        return
+
+    pieces = []
+    # The LLM is held for the whole turn; XTTS is taken by the synthesis stage once it is loaded
+    with ExitStack() as stack:
+        await hold_resident(stack, residency, "llm")
+        # Decoding, synthesis and playback run as concurrent stages
+        stats = await speak(stream_response(query, conversation), residency, keep_audio=cache is not None,
+                            on_text=echo(pieces))
+
+    text = "".join(pieces).strip()
+    if not text or "❌" in text or text.startswith("🤖 No response"):
+        return
+    _remember(conversation, query, text)
+    if cache is not None:
+        cache.put(key, query, text)
+        _store_audio(cache, key, voice, stats)
+
+def start_barge_in(on_speech):
+    """Listen on the microphone during the reply; None if barge-in is off or the mic is unavailable."""
+    if not BARGE_IN:
+        return None
+    try:
+        return BargeInMonitor(get_capture_engine(), on_speech).start()
+    except Exception as e:
+        print(f"⚠️ [Barge-in] Microphone unavailable during replies: {e}")
+        return None
+
+async def stop_turn(turn):
+    turn.cancel()
+    try:
+        await turn
+    except asyncio.CancelledError:
+        pass
+
+async def run_turn(query, residency, console):
+    """Answer `query`; returns (keep going, next query).
+
+    A line entered meanwhile stops the reply ('q' also quits). Speech stops it
+    too: the LLM request is cancelled, queued synthesis dropped, playback cut,
+    and the interrupting utterance becomes the next query.
+    """
+    loop = asyncio.get_running_loop()
+    heard = asyncio.Event()
+    monitor = start_barge_in(lambda: loop.call_soon_threadsafe(heard.set))
+    turn = asyncio.ensure_future(answer(query, residency))
+    interrupt = console.request()
+    barge_in = asyncio.ensure_future(heard.wait())
+    try:
+        await asyncio.wait({turn, interrupt, barge_in}, return_when=asyncio.FIRST_COMPLETED)
+        if turn.done():
+            turn.result()
+            return True, None   # A pending console read carries over to the next prompt
+
+        if barge_in.done():
+            cancel_response()   # The worker stops now rather than at the next token handed over
+            await stop_turn(turn)
+            delay = time.monotonic() - monitor.detected_at
+            print(f"\n✋ Barge-in — reply stopped {delay * 1000:.0f} ms after speech was detected")
+            report_turn()
+            get_tracer().begin_turn()   # The interrupting question starts the next turn
+            return True, await asyncio.to_thread(listen_resident, monitor)
+
+        line = console.take()
+        await stop_turn(turn)
+        print("\n⏹️ Reply stopped.")
+        return line is None or line.strip().lower() != 'q', None
+    finally:
+        barge_in.cancel()
+        if monitor is not None:
+            monitor.stop()
+
+def report_turn():
+    tracer = get_tracer()
+    if tracer.events(tracer.turn):
+        print(f"[Trace] {tracer.summary()}")
+        if TRACE_PATH:
+            tracer.export_chrome(TRACE_PATH)
+
+async def assistant_loop():
     initialize()
+    console = Console()
+    residency = get_residency_manager()
+    tracer = get_tracer()
     while True:
-        user_input = input("🟢 Your turn: ")
-        continue_loop, query = handle_user_input(user_input)
+        user_input = await console.readline("🟢 Your turn: ")
+        tracer.begin_turn()
+        continue_loop, query = await handle_user_input("q" if user_input is None else user_input, console)
         if not continue_loop:
             break
         if not query or not query.strip():
             print("⚠️  No input detected.")
             continue
 
-        print(f"🗣️  You said: {query}")
-        try:
-            response = generate_response(query)
-            print(f"🤖 IGOR: {response}")
-        except Exception as e:
-            print(f"❌ LLM error: {e}")
-            continue
-        finally:
-            clean_gpu_memory()
-
-        try:
-            speak_xtts(response)
-        except Exception as e:
-            print(f"❌ TTS error: {e}")
-        finally:
-            clean_gpu_memory()
+        # An utterance that interrupted the reply is answered straight away
+        while query:
+            print(f"🗣️  You said: {query}")
+            print("🤖 IGOR: ", end="", flush=True)
+            said, query = query, None
+            try:
+                continue_loop, query = await run_turn(said, residency, console)
+            except Exception as e:
+                print(f"❌ LLM/TTS error: {e}")
+            finally:
+                print()
+                clean_gpu_memory()
+                print(f"[VRAM] {residency.metrics()}")
+                if query is None:   # A barge-in turn is reported once its reply is done
+                    report_turn()
+        if not continue_loop:
+            print("👋 Exiting.")
+            break
 
 if __name__ == "__main__":
     try:
-        assistant_loop()
+        asyncio.run(assistant_loop())
     except Exception as e:
         import traceback
         print("\n❌ Critical error occurred:")
         traceback.print_exc()
         print("\n⚠️ Returned to shell safely.")
-
@@ -0,0 +1,174 @@
+# model_catalog.py — Metadata for every GGUF in ./models, read from headers and cached in an index
+#
+# Only the KV section at the front of each file is parsed (through mmap). The
+# results are stored in an index keyed by path and invalidated by size and
+# mtime, so listing the models after the first scan does not open any GGUF.
+
+import json
+import os
+from pathlib import Path
+
+from gguf_reader import FILE_TYPES, GGUFError, read_array_items, read_header
+
+MODEL_DIR  = Path("./models")
+INDEX_FILE = Path("cache/model_index.json")
+INDEX_VERSION = 2
+
+# Approximate bits per weight, used when the header has no parameter count
+BITS_PER_WEIGHT = {
+    "F32": 32.0, "F16": 16.0, "BF16": 16.0, "Q8_0": 8.5, "Q6_K": 6.56, "Q5_1": 6.0,
+    "Q5_K_M": 5.69, "Q5_K_S": 5.54, "Q5_0": 5.54, "Q4_1": 5.0, "Q4_K_M": 4.85,
+    "Q4_K_S": 4.58, "Q4_0": 4.55, "IQ4_XS": 4.25, "Q3_K_L": 4.27, "Q3_K_M": 3.91,
+    "Q3_K_S": 3.5, "Q2_K": 3.35,
+}
+
+
+class ModelInfo:
+    __slots__ = ("path", "name", "size", "mtime_ns", "title", "architecture", "parameters",
+                 "quant", "context_length", "block_count", "chat_template", "bos_token", "eos_token",
+                 "error")
+
+    def __init__(self, path, name, size, mtime_ns, title=None, architecture=None, parameters=None,
+                 quant=None, context_length=None, block_count=None, chat_template=None,
+                 bos_token=None, eos_token=None, error=None):
+        self.path = path
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.title = title                    # general.name
+        self.architecture = architecture
+        self.parameters = parameters          # Parameter count (exact or estimated)
+        self.quant = quant
+        self.context_length = context_length  # Training context
+        self.block_count = block_count
+        self.chat_template = chat_template    # tokenizer.chat_template (Jinja source) if embedded
+        self.bos_token = bos_token            # Token strings the chat template may reference
+        self.eos_token = eos_token
+        self.error = error
+
+    def to_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{slot: data.get(slot) for slot in cls.__slots__})
+
+    @property
+    def parameters_label(self):
+        if not self.parameters:
+            return "?"
+        return f"{self.parameters / 1e9:.1f}B" if self.parameters >= 1e9 else f"{self.parameters / 1e6:.0f}M"
+
+    def summary(self):
+        if self.error:
+            return f"unreadable ({self.error})"
+        parts = [
+            self.architecture or "?",
+            self.parameters_label,
+            self.quant or "?",
+            f"ctx {self.context_length}" if self.context_length else "ctx ?",
+            f"{self.block_count} layers" if self.block_count else "? layers",
+            "chat template" if self.chat_template else "no chat template",
+        ]
+        return " · ".join(parts)
+
+
+def read_model_info(path):
+    """Parse one GGUF header (KV section only) into a ModelInfo."""
+    path = Path(path)
+    stat = path.stat()
+    info = ModelInfo(str(path.resolve()), path.name, stat.st_size, stat.st_mtime_ns)
+    try:
+        header = read_header(path, tensors=False, skip_arrays=True)
+        # Templates need the BOS/EOS token strings: only those two are decoded from the vocab
+        ids = {"bos_token": header.get("tokenizer.ggml.bos_token_id"),
+               "eos_token": header.get("tokenizer.ggml.eos_token_id")}
+        offset = header.array_offsets.get("tokenizer.ggml.tokens")
+        tokens = read_array_items(path, offset, ids.values()) if offset is not None else {}
+    except (GGUFError, OSError, ValueError) as e:
+        info.error = str(e)
+        return info
+
+    info.title = header.get("general.name")
+    info.architecture = header.architecture
+    info.quant = FILE_TYPES.get(header.get("general.file_type"))
+    info.context_length = header.arch_get("context_length")
+    info.block_count = header.arch_get("block_count")
+    info.chat_template = header.get("tokenizer.chat_template")
+    for attr, token_id in ids.items():
+        if token_id in tokens:
+            setattr(info, attr, tokens[token_id])
+    info.parameters = header.get("general.parameter_count")
+    if not info.parameters and info.quant in BITS_PER_WEIGHT:
+        info.parameters = int(stat.st_size * 8 / BITS_PER_WEIGHT[info.quant])
+    return info
+
+
+class ModelCatalog:
+    def __init__(self, model_dir=MODEL_DIR, index_file=INDEX_FILE):
+        self.model_dir = Path(model_dir)
+        self.index_file = Path(index_file)
+        self._index = None
+        self.parsed = 0   # Headers read (not served from the index) since creation
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                data = json.loads(self.index_file.read_text())
+                self._index = data["models"] if data.get("version") == INDEX_VERSION else {}
+            except (OSError, ValueError, KeyError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.index_file.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps({"version": INDEX_VERSION, "models": self._index}))
+        os.replace(tmp_file, self.index_file)
+
+    def info(self, path, _save=True):
+        """ModelInfo for one file, from the index unless its size or mtime changed."""
+        path = Path(path)
+        index = self._load_index()
+        key = str(path.resolve())
+        stat = path.stat()
+        cached = index.get(key)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return ModelInfo.from_dict(cached)
+        info = read_model_info(path)
+        self.parsed += 1
+        index[key] = info.to_dict()
+        if _save:
+            self._save_index()
+        return info
+
+    def scan(self):
+        """ModelInfo for every *.gguf in the model directory, sorted by filename."""
+        index = self._load_index()
+        parsed_before = self.parsed
+        infos = [self.info(path, _save=False) for path in sorted(self.model_dir.glob("*.gguf"))]
+        present = {info.path for info in infos}
+        model_dir = str(self.model_dir.resolve())
+        stale = [key for key in index if os.path.dirname(key) == model_dir and key not in present]
+        for key in stale:
+            del index[key]
+        if self.parsed != parsed_before or stale:
+            self._save_index()
+        return infos
+
+
+_catalog = None
+
+
+def get_catalog():
+    global _catalog
+    if _catalog is None:
+        _catalog = ModelCatalog()
+    return _catalog
+
+
+def get_model_info(path):
+    """Header metadata for a model file (None if it does not exist)."""
+    if not Path(path).exists():
+        return None
+    return get_catalog().info(path)
@@ -0,0 +1,94 @@
+# model_registry.py — Lazy, thread-safe loading of heavy models with background warm-up
+#
+# Modules register a loader under a name at import time (cheap). The model is
+# only built on the first get(), or earlier when warm() loads it on a background
+# thread. Concurrent callers wait for the same load instead of starting a second one.
+
+import threading
+import time
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._errors = {}
+        self._guard = threading.Lock()
+        self.load_times = {}
+
+    def register(self, name, loader):
+        with self._guard:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+
+    def __contains__(self, name):
+        return name in self._loaders
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def get(self, name, loader=None):
+        """Return the model, loading it now (or waiting for a warm-up in progress).
+
+        `loader` replaces the registered one if the model has to be loaded
+        (e.g. a CPU copy when the GPU is full).
+        """
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self._loaders:
+            raise KeyError(f"No loader registered for model '{name}'")
+        with self._locks[name]:
+            if name in self._models:
+                return self._models[name]
+            print(f"⏳ [Models] Loading {name}...")
+            start_time = time.time()
+            try:
+                model = (loader or self._loaders[name])()
+            except Exception as e:
+                self._errors[name] = e
+                raise
+            self.load_times[name] = time.time() - start_time
+            self._models[name] = model
+            self._errors.pop(name, None)
+            print(f"✅ [Models] {name} ready in {self.load_times[name]:.2f}s")
+            return model
+
+    def peek(self, name):
+        """Return the model if it is already loaded, without triggering a load."""
+        return self._models.get(name)
+
+    def unload(self, name):
+        """Drop a loaded model (e.g. to replace it); returns it, or None if it was not loaded."""
+        with self._locks.get(name, self._guard):
+            return self._models.pop(name, None)
+
+    def warm(self, names=None):
+        """Load models concurrently on daemon threads; returns the threads."""
+        threads = []
+        for name in names or list(self._loaders):
+            if self.is_loaded(name):
+                continue
+            thread = threading.Thread(target=self._warm_one, args=(name,), name=f"warm-{name}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def _warm_one(self, name):
+        try:
+            self.get(name)
+        except Exception as e:
+            print(f"❌ [Models] Background load of {name} failed: {e}")
+
+    def report(self):
+        for name in self._loaders:
+            if name in self.load_times:
+                print(f"   ├─ {name}: {self.load_times[name]:.2f}s")
+            elif name in self._errors:
+                print(f"   ├─ {name}: failed ({self._errors[name]})")
+            else:
+                print(f"   ├─ {name}: not loaded")
+
+
+registry = ModelRegistry()
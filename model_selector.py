@@ -1,6 +1,7 @@
 # model_selector.py
 import os
 from pathlib import Path
+from model_catalog import get_catalog
 
 MODEL_DIR = Path("./models")
 SELECTION_FILE = Path(".selected_model")
@@ -12,14 +13,19 @@ def list_models():
 
 
 def print_model_menu(models, default_name):
+    # Metadata comes from the GGUF headers, cached in an index so this stays instant
+    infos = {info.name: info for info in get_catalog().scan()}
     print("\n🧠 Available GGUF Models:\n")
     for idx, model in enumerate(models, 1):
         label = " (default)" if default_name in str(model.name) else ""
         print(f"{idx}. {model.name}{label}")
+        if model.name in infos:
+            print(f"     {infos[model.name].summary()}")
     print("\nEnter model number to select it, or press Enter to keep current selection.")
 
 
-def choose_model():
+def choose_model(session=None):
+    """Pick a model from ./models; with a session.Session, only that session switches."""
     models = list_models()
     if not models:
         print("❌ No .gguf models found in ./models directory.")
@@ -37,8 +43,11 @@ def choose_model():
         idx = int(choice) - 1
         if 0 <= idx < len(models):
             selected_model = models[idx].resolve()
-            with open(SELECTION_FILE, "w") as f:
-                f.write(str(selected_model))
+            if session is not None:
+                session.model_path = str(selected_model)
+            else:
+                with open(SELECTION_FILE, "w") as f:
+                    f.write(str(selected_model))
             print(f"✅ Model selected: {selected_model.name}")
             return selected_model
         else:
@@ -48,7 +57,17 @@ def choose_model():
     return None
 
 
-def get_selected_model():
+def find_model(name):
+    """Path of the model called `name` in ./models, or None."""
+    return next((str(m.resolve()) for m in list_models() if m.name == name), None)
+
+
+def get_selected_model(session=None):
+    """The session's own model if it picked one, else the shared selection."""
+    if session is not None and session.model_path:
+        if Path(session.model_path).exists():
+            return session.model_path
+        print(f"⚠️ Session {session.id}: model {session.model_path} not found. Using the shared selection.")
     if SELECTION_FILE.exists():
         with open(SELECTION_FILE) as f:
             path = f.read().strip()
@@ -0,0 +1,274 @@
+# pipeline.py — Asyncio turn pipeline: LLM text → sentences → synthesis → playback as concurrent stages
+#
+# Each stage is a task and the stages are joined by bounded asyncio queues, so
+# decoding, synthesis and playback overlap while a slow stage holds the earlier
+# ones back instead of letting audio pile up. Blocking work (the LLM stream,
+# XTTS, the audio device) runs in threads. Cancelling a turn cancels every
+# stage: the LLM thread stops at the next token, queued sentences are dropped
+# and playback is aborted.
+
+import asyncio
+import collections
+import concurrent.futures
+import threading
+import time
+
+import numpy as np
+
+from tracing import get_tracer
+from tts_pipeline import QUEUE_SIZE, SentenceChunker, open_output
+
+TEXT_QUEUE_SIZE     = 64   # LLM text increments waiting to be split into sentences
+SENTENCE_QUEUE_SIZE = 4    # Sentences waiting for synthesis
+
+_END = object()   # End of a stage's output
+
+
+class _Stopped(Exception):
+    """The turn was cancelled while a thread was handing over its output."""
+
+
+async def run_stages(*coroutines):
+    """Run stage coroutines together; the first failure or a cancel stops them all."""
+    tasks = [asyncio.ensure_future(c) for c in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def pump(iterable, queue, on_item=None, executor=None):
+    """Iterate a blocking iterable (e.g. the LLM stream) on a thread, putting each item on `queue`.
+
+    The thread waits while the queue is full (backpressure). If the caller is
+    cancelled the thread stops at the next item, and the iterable is closed
+    either way so it can clean up its request.
+    """
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+
+    def put(item):
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                return future.result(timeout=0.1)
+            except concurrent.futures.TimeoutError:
+                if stop.is_set():
+                    future.cancel()
+                    raise _Stopped()
+
+    def produce():
+        items = iter(iterable)
+        try:
+            for item in items:
+                if stop.is_set():
+                    break
+                if on_item is not None:
+                    on_item(item)
+                put(item)
+        except _Stopped:
+            pass
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                close()
+
+    try:
+        await loop.run_in_executor(executor, produce)
+    finally:
+        stop.set()
+
+
+class TurnPipeline:
+    """Speaks one reply with every stage running concurrently.
+
+    `synthesize(sentence)` returns mono float32 samples at `sample_rate`;
+    `output_factory(sample_rate)` returns an object with start/write/stop/close
+    (and optionally abort), a sounddevice.OutputStream by default.
+    With `load_voice`, a blocking call returning (synthesize, sample_rate),
+    the voice is loaded by the synthesis stage while the reply text streams.
+    """
+
+    def __init__(self, synthesize, sample_rate, output_factory=None, queue_size=QUEUE_SIZE,
+                 text_queue_size=TEXT_QUEUE_SIZE, sentence_queue_size=SENTENCE_QUEUE_SIZE, load_voice=None):
+        self.synthesize = synthesize
+        self.sample_rate = sample_rate
+        self.load_voice = load_voice
+        self.output_factory = output_factory or open_output
+        self.queue_size = queue_size
+        self.text_queue_size = text_queue_size
+        self.sentence_queue_size = sentence_queue_size
+
+    async def speak(self, text, keep_audio=False, on_text=None):
+        """Speak a string or an iterable of text increments (e.g. an LLM stream).
+
+        `on_text(piece)` sees each increment as it arrives (console echo).
+        Returns the same stats as PipelinedSpeaker.speak.
+        """
+        stats = {"time_to_first_audio": None, "sentences": 0, "audio_seconds": 0.0,
+                 "sample_rate": self.sample_rate}
+        text_q = asyncio.Queue(self.text_queue_size)
+        sentence_q = asyncio.Queue(self.sentence_queue_size)
+        audio_q = asyncio.Queue(self.queue_size)
+        kept = [] if keep_audio else None
+
+        await run_stages(
+            self._generate(text, text_q, on_text),
+            self._segment(text_q, sentence_q),
+            self._synthesize(sentence_q, audio_q),
+            self._play(audio_q, stats, kept, time.time()),
+        )
+        stats["sample_rate"] = self.sample_rate
+        if keep_audio:
+            stats["audio"] = np.concatenate(kept) if kept else np.zeros(0, dtype=np.float32)
+        return stats
+
+    async def play(self, audio):
+        """Play prepared samples (e.g. a cached reply) through the playback stage; cancellable."""
+        audio_q = asyncio.Queue()
+        audio_q.put_nowait(audio)
+        audio_q.put_nowait(_END)
+        stats = {"time_to_first_audio": None, "sentences": 0, "audio_seconds": 0.0,
+                 "sample_rate": self.sample_rate}
+        await self._play(audio_q, stats, None, time.time())
+        return stats
+
+    # --- Stages -----------------------------------------------------------
+
+    async def _generate(self, text, text_q, on_text):
+        if isinstance(text, str):
+            text = [text]
+        on_item = None
+        if on_text is not None:
+            loop = asyncio.get_running_loop()
+            on_item = lambda piece: loop.call_soon_threadsafe(on_text, piece)
+        await pump(text, text_q, on_item)
+        await text_q.put(_END)
+
+    async def _segment(self, text_q, sentence_q):
+        chunker = SentenceChunker()
+        while True:
+            piece = await text_q.get()
+            if piece is _END:
+                break
+            for sentence in chunker.feed(piece):
+                await sentence_q.put(sentence)
+        tail = chunker.flush()
+        if tail:
+            await sentence_q.put(tail)
+        await sentence_q.put(_END)
+
+    async def _load_voice(self, sentence_q, backlog):
+        # Up to a queue's worth of sentences are taken while the voice loads, so the reply text is not held back
+        loading = asyncio.ensure_future(asyncio.to_thread(self.load_voice))
+        try:
+            while not loading.done() and len(backlog) < self.sentence_queue_size:
+                getter = asyncio.ensure_future(sentence_q.get())
+                try:
+                    await asyncio.wait({loading, getter}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    if getter.done():
+                        backlog.append(getter.result())
+                    else:
+                        getter.cancel()
+            await loading
+        except asyncio.CancelledError:
+            loading.cancel()   # The load finishes on its thread; its result is dropped
+            raise
+        self.synthesize, self.sample_rate = loading.result()
+
+    async def _synthesize(self, sentence_q, audio_q):
+        tracer = get_tracer()
+        first = True
+        backlog = collections.deque()
+        if self.load_voice is not None:
+            await self._load_voice(sentence_q, backlog)
+        while True:
+            sentence = backlog.popleft() if backlog else await sentence_q.get()
+            if sentence is _END:
+                break
+            start = tracer.clock()
+            audio = await asyncio.to_thread(self.synthesize, sentence)
+            tracer.add_span("tts", start, chars=len(sentence))
+            if first:
+                tracer.mark("tts_first_chunk")
+                first = False
+            await audio_q.put(audio)
+        await audio_q.put(_END)
+
+    async def _play(self, audio_q, stats, kept, start_time):
+        stream = None
+        finished = False
+        try:
+            while True:
+                audio = await audio_q.get()
+                if audio is _END:
+                    break
+                if stream is None:
+                    stream = self.output_factory(self.sample_rate)
+                    stream.start()
+                    get_tracer().mark("playback_start")
+                    stats["time_to_first_audio"] = time.time() - start_time
+                    print(f"⏱️ [TTS] Time to first audio: {stats['time_to_first_audio']:.2f}s")
+                await asyncio.to_thread(stream.write, audio)
+                if kept is not None:
+                    kept.append(audio)
+                stats["sentences"] += 1
+                stats["audio_seconds"] += len(audio) / self.sample_rate
+            finished = True
+        finally:
+            if stream is not None:
+                if finished or not hasattr(stream, "abort"):
+                    await asyncio.to_thread(stream.stop)   # Returns once queued audio has played
+                else:
+                    stream.abort()                         # Cancelled: cut the sound now
+                stream.close()
+                get_tracer().mark("playback_end", cancelled=not finished,
+                                  seconds=round(stats["audio_seconds"], 2))
+
+
+class Console:
+    """Line input on a daemon thread, awaitable from the event loop.
+
+    Only one read is outstanding at a time. A line requested while a turn runs
+    (to catch a stop key) is reused as the next prompt's answer, so interactive
+    commands that call input() themselves never compete with a hidden reader.
+    """
+
+    def __init__(self, read=input):
+        self._read = read
+        self._pending = None
+
+    def request(self, prompt=""):
+        """Future for the next line; starts a read unless one is already waiting."""
+        if self._pending is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+
+            def read():
+                try:
+                    line = self._read(prompt)
+                except EOFError:
+                    line = None
+                except Exception as e:
+                    loop.call_soon_threadsafe(lambda: future.done() or future.set_exception(e))
+                    return
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result(line))
+
+            threading.Thread(target=read, daemon=True).start()
+            self._pending = future
+        elif prompt:
+            print(prompt, end="", flush=True)
+        return self._pending
+
+    def take(self):
+        """Result of a completed read (None on end of input); the next request starts a new one."""
+        line = self._pending.result()
+        self._pending = None
+        return line
+
+    async def readline(self, prompt=""):
+        await asyncio.shield(self.request(prompt))
+        return self.take()
@@ -0,0 +1,115 @@
+# prompt_cache.py — Persisted llama.cpp KV state for stable prompt prefixes (system prompt)
+#
+# The system prompt sits unchanged at the front of every request. Its evaluated
+# KV state is saved once per (model file, context size, prefix) and restored
+# whenever the worker has lost it (fresh start, model switch, eviction), so only
+# the new suffix of a prompt is prefilled. Files are evicted oldest-first once
+# the directory exceeds its disk budget.
+
+import hashlib
+import os
+import pickle
+import sys
+import time
+from pathlib import Path
+
+CACHE_DIR       = Path("cache/prompts")
+DISK_BUDGET_MB  = 512
+SUFFIX          = ".state"
+
+
+def prefix_key(model_path, context_size, prefix):
+    """Cache key: model identity (path, size, mtime) + context size + prefix hash."""
+    stat = os.stat(model_path)
+    prefix_hash = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+    ident = f"{os.path.abspath(model_path)}|{stat.st_size}|{stat.st_mtime_ns}|{context_size}|{prefix_hash}"
+    return hashlib.sha256(ident.encode("utf-8")).hexdigest()[:32]
+
+
+class PromptCache:
+    def __init__(self, cache_dir=CACHE_DIR, budget_mb=DISK_BUDGET_MB):
+        self.cache_dir = Path(cache_dir)
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, key):
+        return self.cache_dir / f"{key}{SUFFIX}"
+
+    def load(self, key):
+        """Return the stored state or None; a hit refreshes the file's LRU position."""
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            path.unlink(missing_ok=True)   # Corrupt or from an incompatible llama_cpp
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return state
+
+    def store(self, key, state):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """Delete least recently used state files until the directory fits the budget."""
+        entries = []
+        for path in self.cache_dir.glob(f"*{SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.budget_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed.append(path)
+        return removed
+
+
+def _holds(llm, tokens):
+    """True if the evaluated tokens in the model's KV cache start with `tokens`."""
+    return llm.n_tokens >= len(tokens) and list(llm.input_ids[:len(tokens)]) == list(tokens)
+
+
+def prime(llm, cache, model_path, context_size, prefix):
+    """Make the model's KV cache start with `prefix`; returns where the state came from.
+
+    llama_cpp reuses the longest evaluated prefix of the previous prompt, so once
+    the state holds the prefix tokens, only the rest of the prompt is evaluated.
+    """
+    tokens = llm.tokenize(prefix.encode("utf-8"), add_bos=True, special=True)
+    if _holds(llm, tokens):
+        return "memory"
+
+    key = prefix_key(model_path, context_size, prefix)
+    state = cache.load(key)
+    if state is not None:
+        llm.load_state(state)
+        if _holds(llm, tokens):
+            return "disk"
+
+    start_time = time.time()
+    llm.reset()
+    llm.eval(tokens)
+    cache.store(key, llm.save_state())
+    print(f"🗂️ [Prompt cache] Stored {len(tokens)}-token prefix in {time.time() - start_time:.2f}s",
+          file=sys.stderr)   # stdout carries the worker protocol
+    return "computed"
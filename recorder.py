@@ -1,48 +1,91 @@
-import time
-import numpy as np
-import sounddevice as sd
 import soundfile as sf
 
+from capture import CaptureEngine
+from tracing import get_tracer
+from vad import VoiceActivityDetector
+
 SAMPLE_RATE       = 16000
-THRESHOLD         = 0.005   # Lowered for better silence sensitivity
-MIN_SILENCE_TIME  = 2    # Time of silence to auto-stop (in seconds)
+NO_SPEECH_TIMEOUT = 4       # Give up if nobody starts talking (seconds)
 MAX_RECORD_TIME   = 15      # Maximum record duration (seconds)
+PREROLL_SECONDS   = 0.3     # Audio kept from before voice onset
+CHUNK_SECONDS     = 0.1     # How often the VAD looks at new audio
+
+_capture = None
+
+def get_capture_engine():
+    """Shared capture engine — its buffer is allocated once per process."""
+    global _capture
+    if _capture is None:
+        _capture = CaptureEngine(SAMPLE_RATE, MAX_RECORD_TIME, PREROLL_SECONDS)
+    return _capture
 
-def record_audio(filename="input.wav"):
-    print("🎙️ Recording... Speak now. Auto-stop after {:.1f}s of silence.".format(MIN_SILENCE_TIME))
+def set_input_stream_factory(stream_factory):
+    """Capture from `stream_factory(callback)` instead of the sounddevice microphone (benchmarks, headless)."""
+    global _capture
+    _capture = CaptureEngine(SAMPLE_RATE, MAX_RECORD_TIME, PREROLL_SECONDS, stream_factory)
 
-    frames = []
-    silence_start = None
-    start_time = time.time()
-    stream = sd.InputStream(samplerate=SAMPLE_RATE, channels=1)
+def record_audio(filename=None, on_chunk=None, stream_factory=None, resume=None):
+    """Record until the VAD detects end of speech; return mono float32 samples at SAMPLE_RATE.
+
+    The result is a view into the capture buffer, valid until the next call.
+    It starts PREROLL_SECONDS before voice onset so first syllables are kept.
+    Pass `filename` to also write the clip to disk (debug sink only).
+    `on_chunk(data)` receives new utterance audio as it is captured (streaming ASR).
+    `stream_factory(callback)` replaces the sounddevice input stream (tests).
+    `resume` is a barge_in.BargeInMonitor that heard the user start talking during
+    playback; recording continues on its running capture from the detected onset.
+    """
+    tracer = get_tracer()
+    started = tracer.clock()
+    if resume is not None:
+        print("🎙️ Listening... (reply interrupted)")
+        capture, vad = resume.capture, resume.vad
+    else:
+        print("🎙️ Recording... Speak now. Auto-stop when you finish speaking.")
+        if stream_factory is None:
+            capture = get_capture_engine()
+        else:
+            capture = CaptureEngine(SAMPLE_RATE, MAX_RECORD_TIME, PREROLL_SECONDS, stream_factory)
+        vad = VoiceActivityDetector(SAMPLE_RATE)
+        capture.start()
+    fed = 0   # Utterance samples already handed to on_chunk
 
-    stream.start()
     try:
         while True:
-            data, _ = stream.read(int(SAMPLE_RATE * 0.1))  # Read in 0.1s chunks
-            rms = np.sqrt(np.mean(np.square(data)))
+            block = capture.read(int(SAMPLE_RATE * CHUNK_SECONDS), timeout=CHUNK_SECONDS * 5)
+            if block.size:
+                vad.process(block)
 
-            frames.append(data.copy())
+            if vad.speech_started and not capture.anchored:
+                capture.anchor(vad.onset_sample)
+                tracer.mark("vad_onset")
 
-            if rms < THRESHOLD:
-                if silence_start is None:
-                    silence_start = time.time()
-                elif time.time() - silence_start >= MIN_SILENCE_TIME:
-                    break
-            else:
-                silence_start = None
+            if on_chunk and capture.anchored and (vad.in_speech or vad.endpoint):
+                audio = capture.utterance(vad.samples_seen)
+                if audio.size > fed:
+                    on_chunk(audio[fed:])
+                    fed = audio.size
 
-            if time.time() - start_time >= MAX_RECORD_TIME:
+            if vad.endpoint:
+                tracer.mark("vad_endpoint", pause=round(vad.endpoint_seconds, 2))
+                print(f"🔇 End of speech ({vad.endpoint_seconds:.2f}s pause)")
+                break
+            if not vad.speech_started and capture.total >= NO_SPEECH_TIMEOUT * SAMPLE_RATE:
+                break
+            if capture.full:
                 break
 
     finally:
-        stream.stop()
-        stream.close()
+        capture.stop()
+
+    if capture.overflows:
+        print(f"⚠️ Input overflowed {capture.overflows} time(s) during capture.")
 
-    audio = np.concatenate(frames, axis=0)
+    audio = capture.utterance(vad.endpoint_sample)
+    tracer.add_span("record", started, seconds=round(audio.size / SAMPLE_RATE, 2), resumed=resume is not None)
     if audio.size == 0:
         print("⚠️ No audio captured—try speaking louder.")
-    else:
+    elif filename:
         sf.write(filename, audio, SAMPLE_RATE)
         print(f"✅ Recording saved to: {filename}")
-
+    return audio
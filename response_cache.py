@@ -0,0 +1,224 @@
+# response_cache.py — On-disk cache of answers (and their synthesized audio) for repeated questions
+#
+# Entries are keyed by the normalized question, a fingerprint of the model file,
+# the prompt template and the sampling parameters, so a different model or
+# setting never serves a stale answer. Text lives in SQLite; audio is written as
+# a WAV file per (entry, voice) next to the database. The store is bounded in
+# bytes and evicts least recently used entries; an optional TTL expires old ones.
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+CACHE_DIR   = Path("cache/responses")
+MAX_MB      = 256
+TTL_SECONDS = None    # None = entries never expire
+
+_fingerprints = {}    # (path, size, mtime) → fingerprint
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace ("What's  up?" → "whats up")."""
+    text = text.lower().replace("'", "").replace("’", "")
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def model_fingerprint(model_path) -> str:
+    """SHA-256 of the model's size plus its first and last MB (header and tail), memoized.
+
+    Hashing a multi-GB GGUF completely would cost seconds; the header holds the
+    full metadata and tensor table, so this still changes whenever the model does.
+    """
+    stat = os.stat(model_path)
+    key = (os.path.abspath(model_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _fingerprints:
+        digest = hashlib.sha256(str(stat.st_size).encode())
+        with open(model_path, "rb") as f:
+            digest.update(f.read(1 << 20))
+            if stat.st_size > 2 << 20:
+                f.seek(-(1 << 20), os.SEEK_END)
+                digest.update(f.read())
+        _fingerprints[key] = digest.hexdigest()
+    return _fingerprints[key]
+
+
+def make_key(query, model_path, template, params) -> str:
+    material = json.dumps(
+        [normalize_query(query), model_fingerprint(model_path), template, params],
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    __slots__ = ("key", "text", "audio_path")
+
+    def __init__(self, key, text, audio_path=None):
+        self.key = key
+        self.text = text
+        self.audio_path = audio_path
+
+
+class ResponseCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_mb=MAX_MB, ttl_seconds=TTL_SECONDS, clock=time.time):
+        self.cache_dir = Path(cache_dir)
+        self.audio_dir = self.cache_dir / "audio"
+        self.audio_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.audio_hits = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.cache_dir / "responses.db"), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                query TEXT,
+                response TEXT,
+                created REAL,
+                last_used REAL,
+                bytes INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS audio (
+                key TEXT,
+                voice TEXT,
+                path TEXT,
+                bytes INTEGER,
+                PRIMARY KEY (key, voice)
+            );
+            CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_used);
+        """)
+        self._db.commit()
+
+    # --- Lookup -----------------------------------------------------------
+
+    def get(self, key, voice=None):
+        """Cached answer for `key` (with audio for `voice` if stored), or None."""
+        with self._lock:
+            row = self._db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            now = self.clock()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._delete(key)
+                self._db.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+
+            audio_path = None
+            if voice is not None:
+                audio = self._db.execute(
+                    "SELECT path FROM audio WHERE key = ? AND voice = ?", (key, voice)
+                ).fetchone()
+                if audio is not None and os.path.exists(audio[0]):
+                    audio_path = audio[0]
+                    self.audio_hits += 1
+            return CachedResponse(key, row[0], audio_path)
+
+    # --- Store ------------------------------------------------------------
+
+    def put(self, key, query, response):
+        with self._lock:
+            now = self.clock()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, query, response, created, last_used, bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, query, response, now, now, len(response.encode("utf-8")) + len(query.encode("utf-8"))),
+            )
+            self._evict(keep=key)
+            self._db.commit()
+
+    def put_audio(self, key, voice, samples, sample_rate):
+        """Store synthesized audio for an existing entry; returns the WAV path."""
+        import soundfile as sf
+        voice_id = hashlib.sha256(voice.encode("utf-8")).hexdigest()[:12]
+        path = self.audio_dir / f"{key[:32]}-{voice_id}.wav"
+        tmp_path = path.with_suffix(".tmp.wav")
+        sf.write(str(tmp_path), samples, sample_rate)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone() is None:
+                path.unlink(missing_ok=True)   # Entry was evicted in the meantime
+                return None
+            self._db.execute(
+                "INSERT OR REPLACE INTO audio (key, voice, path, bytes) VALUES (?, ?, ?, ?)",
+                (key, voice, str(path), path.stat().st_size),
+            )
+            self._evict(keep=key)
+            self._db.commit()
+        return str(path)
+
+    # --- Eviction ---------------------------------------------------------
+
+    def total_bytes(self):
+        text = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM responses").fetchone()[0]
+        audio = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM audio").fetchone()[0]
+        return text + audio
+
+    def _delete(self, key):
+        for (path,) in self._db.execute("SELECT path FROM audio WHERE key = ?", (key,)).fetchall():
+            Path(path).unlink(missing_ok=True)
+        self._db.execute("DELETE FROM audio WHERE key = ?", (key,))
+        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _evict(self, keep=None):
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT r.key, r.bytes + COALESCE((SELECT SUM(a.bytes) FROM audio a WHERE a.key = r.key), 0) "
+            "FROM responses r ORDER BY r.last_used"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._delete(key)
+            self.evictions += 1
+            total -= size
+
+    # --- Reporting --------------------------------------------------------
+
+    def stats(self):
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            total = self.total_bytes()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": total,
+            "hits": self.hits,
+            "misses": self.misses,
+            "audio_hits": self.audio_hits,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_cache = None
+
+
+def get_response_cache():
+    global _cache
+    if _cache is None:
+        ttl = os.environ.get("ARC_RESPONSE_CACHE_TTL")
+        _cache = ResponseCache(ttl_seconds=float(ttl) if ttl else TTL_SECONDS)
+    return _cache
@@ -1,13 +1,11 @@
 import sounddevice as sd
 import soundfile as sf
 import numpy as np
-from TTS.api import TTS
 import tempfile
 import os
+from state import get_xtts_model
 
-# Initialize XTTS
-tts = TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2", progress_bar=False)
-tts.to("cuda")
+# XTTS is shared through the model registry and loaded on first use
 
 # List of speakers
 available_speakers = [
@@ -25,6 +23,7 @@ available_speakers = [
 ]
 
 def speak(text, speaker_name="Gracie Wise"):
+    tts = get_xtts_model()
     with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
         tts.tts_to_file(
             text=text,
@@ -0,0 +1,228 @@
+# server.py — Headless LAN server: transcribe, chat (streamed tokens) and speak (streamed audio)
+#
+# Endpoints (`session` names a client's conversation; default "default"):
+#   POST /transcribe?session=…   body: WAV bytes        → {"text": "..."}
+#   POST /chat                   {"text", "session"}    → NDJSON lines {"token": "..."}, then
+#                                                         {"done": true, "text": "<whole reply>"}
+#   POST /speak                  {"text", "session"}    → 16-bit mono PCM, one chunk per sentence
+#                                                         (rate in the X-Sample-Rate header)
+#   GET  /ws?session=…           WebSocket: send {"op": "chat" | "speak", "text": "..."}; tokens come
+#                                back as {"token"} frames, audio as binary frames, then {"done": true}
+#   GET  /session?session=…      the session's voice, model and latency budget
+#   POST /session                {"session", "speaker"?, "model"?, "latency_budget"?} changes them
+#                                (replies on different models queue, and the LLM worker swaps between batches)
+#   GET  /status                 pools, sessions and VRAM residency
+#
+# Each engine has its own bounded worker pool (service.py), so one device's
+# transcription runs while another's reply is synthesized; when a pool's
+# wait queue is full the request is refused with 503 and Retry-After rather
+# than queued without bound. Replies are written while they are being
+# produced, and a slow client only holds back its own stream. Speech is
+# synthesized a sentence at a time, so concurrent replies take turns on XTTS.
+# Every session (session.py) has its own voice, conversation memory and
+# latency budget, and answers one request at a time; a request that cannot
+# get an engine within its session's budget is refused too. Sessions on
+# different models share the LLM worker: its replies are grouped by model
+# (worker_pool.ModelSwap), so it reloads once per batch, not once per turn.
+#
+# Needs aiohttp (pip install aiohttp).
+# Usage: python server.py [--host 0.0.0.0] [--port 8765]
+
+import argparse
+import asyncio
+import io
+import json
+import os
+
+import numpy as np
+from aiohttp import WSMsgType, web
+
+from model_registry import registry
+from model_selector import find_model
+from service import AssistantService, read_wav
+from worker_pool import QUEUE_LIMIT, PoolBusy
+
+# ARC_SERVER_HOST / ARC_SERVER_PORT set where the server listens (the LAN by default)
+HOST = os.environ.get("ARC_SERVER_HOST", "0.0.0.0")
+PORT = int(os.environ.get("ARC_SERVER_PORT", "8765"))
+
+RETRY_AFTER = 1   # Seconds a refused client should wait
+
+
+def to_pcm16(audio):
+    return (np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+class AssistantServer(AssistantService):
+    """The assistant service behind HTTP and WebSocket handlers."""
+
+    def session(self, session_id):
+        try:
+            return super().session(session_id)
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=str(e))
+
+    # --- HTTP -------------------------------------------------------------
+
+    @web.middleware
+    async def refuse_when_busy(self, request, handler):
+        try:
+            return await handler(request)
+        except PoolBusy as e:
+            return web.json_response({"error": str(e)}, status=503, headers={"Retry-After": str(RETRY_AFTER)})
+
+    @staticmethod
+    async def read_json(request):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="body must be JSON")
+        if not isinstance(body, dict) or not str(body.get("text", "")).strip():
+            raise web.HTTPBadRequest(text='body needs a non-empty "text"')
+        return body
+
+    async def handle_transcribe(self, request):
+        session = self.session(request.query.get("session", "default"))
+        try:
+            audio = read_wav(io.BytesIO(await request.read()))
+        except (RuntimeError, ValueError) as e:
+            raise web.HTTPBadRequest(text=f"body must be a WAV file: {e}")
+        return web.json_response({"text": await self.transcribe_audio(session, audio)})
+
+    async def handle_chat(self, request):
+        body = await self.read_json(request)
+        session = self.session(body.get("session", "default"))
+        async with session.lock:
+            response = None
+            pieces = []
+            async for piece in self.chat(session, body["text"]):
+                if response is None:   # Headers go out once a slot is held: a busy pool can still 503
+                    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+                    await response.prepare(request)
+                pieces.append(piece)
+                await response.write((json.dumps({"token": piece}) + "\n").encode())
+            if response is None:
+                response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+                await response.prepare(request)
+            await response.write((json.dumps({"done": True, "text": "".join(pieces).strip()}) + "\n").encode())
+            await response.write_eof()
+        return response
+
+    async def handle_speak(self, request):
+        body = await self.read_json(request)
+        session = self.session(body.get("session", "default"))
+        response = None
+        async for sample_rate, audio in self.speak(session, body["text"]):
+            if response is None:
+                response = web.StreamResponse(headers={"Content-Type": "application/octet-stream",
+                                                       "X-Sample-Rate": str(sample_rate),
+                                                       "X-Sample-Format": "s16le"})
+                await response.prepare(request)
+            await response.write(to_pcm16(audio))   # Waits while the client is behind
+        if response is None:
+            return web.Response(status=204)
+        await response.write_eof()
+        return response
+
+    async def handle_ws(self, request):
+        session = self.session(request.query.get("session", "default"))
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            try:
+                command = json.loads(message.data)
+                op, text = command.get("op"), str(command.get("text", "")).strip()
+            except (ValueError, AttributeError):
+                await ws.send_json({"error": "messages must be JSON objects"})
+                continue
+            try:
+                async with session.lock:
+                    if op == "chat" and text:
+                        pieces = []
+                        async for piece in self.chat(session, text):
+                            pieces.append(piece)
+                            await ws.send_json({"token": piece})
+                        await ws.send_json({"done": True, "text": "".join(pieces).strip()})
+                    elif op == "speak" and text:
+                        async for sample_rate, audio in self.speak(session, text):
+                            await ws.send_json({"audio": len(audio), "sample_rate": sample_rate})
+                            await ws.send_bytes(to_pcm16(audio))
+                        await ws.send_json({"done": True})
+                    else:
+                        await ws.send_json({"error": 'expected {"op": "chat" | "speak", "text": "..."}'})
+            except PoolBusy as e:
+                await ws.send_json({"error": str(e), "retry_after": RETRY_AFTER})
+        return ws
+
+    async def handle_get_session(self, request):
+        return web.json_response(self.session(request.query.get("session", "default")).describe())
+
+    async def handle_set_session(self, request):
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="body must be JSON")
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text="body must be a JSON object")
+        session = self.session(body.get("session", "default"))
+        if "speaker" in body:
+            session.speaker = str(body["speaker"])
+        if "model" in body:
+            model_path = find_model(str(body["model"]))
+            if model_path is None:
+                raise web.HTTPBadRequest(text=f"no model named {body['model']} in ./models")
+            session.model_path = model_path
+        if "latency_budget" in body:
+            try:
+                budget = float(body["latency_budget"])
+            except (TypeError, ValueError):
+                budget = 0
+            if budget <= 0:
+                raise web.HTTPBadRequest(text="latency_budget must be a positive number of seconds")
+            session.latency_budget = budget
+        return web.json_response(session.describe())
+
+    async def handle_status(self, request):
+        return web.json_response(self.status())
+
+    def app(self):
+        app = web.Application(middlewares=[self.refuse_when_busy], client_max_size=32 * 1024 * 1024)
+        app.add_routes([
+            web.post("/transcribe", self.handle_transcribe),
+            web.post("/chat", self.handle_chat),
+            web.post("/speak", self.handle_speak),
+            web.get("/ws", self.handle_ws),
+            web.get("/session", self.handle_get_session),
+            web.post("/session", self.handle_set_session),
+            web.get("/status", self.handle_status),
+        ])
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the assistant to devices on the local network")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--queue-limit", type=int, default=QUEUE_LIMIT, help="Requests allowed to wait per engine")
+    args = parser.parse_args()
+
+    from llm_engine import get_engine
+    from vram_manager import get_residency_manager
+
+    server = AssistantServer(residency=get_residency_manager(), queue_limit=args.queue_limit)
+    app = server.app()
+
+    async def on_cleanup(app):
+        server.close()
+        await asyncio.to_thread(get_engine().shutdown)
+
+    app.on_cleanup.append(on_cleanup)
+    registry.warm(["xtts", "whisper"])   # Loaded in the background; the first request waits if needed
+    print(f"🌐 [Server] Listening on http://{args.host}:{args.port}")
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# service.py — The assistant's engines behind bounded pools, shared by the network front ends
+#
+# AssistantService holds one worker pool per engine (Whisper, the LLM worker,
+# XTTS) and the table of sessions. It knows nothing about transports:
+# server.py serves it over HTTP/WebSocket and daemon.py over a Unix socket.
+# Every session shares the one LLM worker. Sessions may pick different
+# models: replies queue by model (worker_pool.ModelSwap) so the worker swaps
+# once per batch of replies rather than on every alternating turn.
+
+import asyncio
+from contextlib import ExitStack
+
+import numpy as np
+import soundfile as sf
+
+from conversation import get_token_counter
+from llm_engine import get_engine
+from llm_handler import stream_response
+from session import SessionTable
+from transcriber import transcribe
+from tts_handler import make_synthesizer
+from tts_pipeline import split_sentences
+from worker_pool import QUEUE_LIMIT, ModelSwap, WorkerPool
+
+ASR_SAMPLE_RATE = 16000
+
+
+def serving_model():
+    """Path of the model the LLM worker has loaded, or None while no worker runs."""
+    config = get_engine().config
+    return config[0] if config else None
+
+
+def hold(stack, residency, name):
+    """Keep the shared model `name` resident until `stack` closes (on the CPU if the GPU is full)."""
+    if residency is not None:
+        stack.enter_context(residency.use(name))
+
+
+def held(residency, name, fn, *args):
+    with ExitStack() as stack:
+        hold(stack, residency, name)
+        return fn(*args)
+
+
+def held_stream(residency, name, iterable):
+    with ExitStack() as stack:
+        hold(stack, residency, name)
+        yield from iterable
+
+
+def read_wav(source):
+    """Decode a WAV file (path or file object) to mono float32 at the Whisper sample rate."""
+    audio, sample_rate = sf.read(source, dtype="float32")
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if sample_rate != ASR_SAMPLE_RATE and audio.size:
+        positions = np.arange(int(audio.size * ASR_SAMPLE_RATE / sample_rate)) * sample_rate / ASR_SAMPLE_RATE
+        audio = np.interp(positions, np.arange(audio.size), audio).astype(np.float32)
+    return audio
+
+
+class AssistantService:
+    """Engines, worker pools and sessions.
+
+    The engine callables default to the assistant's own (Whisper, the LLM
+    worker, XTTS) and `serving` reports the LLM worker's model; tests pass
+    stand-ins.
+    """
+
+    def __init__(self, transcribe=transcribe, reply_stream=stream_response, synthesizer=make_synthesizer,
+                 serving=serving_model, residency=None, sessions=None, queue_limit=QUEUE_LIMIT, memory=True):
+        self.transcribe = transcribe
+        self.reply_stream = reply_stream
+        self.synthesizer = synthesizer
+        self.serving = serving
+        self.residency = residency
+        self.sessions = sessions if sessions is not None else SessionTable()
+        self.memory = memory
+        self.pools = {name: WorkerPool(name, queue_limit=queue_limit) for name in ("asr", "llm", "tts")}
+        self.swap = ModelSwap("llm", queue_limit=queue_limit)
+
+    def session(self, session_id):
+        """The session called `session_id`, created on first use; ValueError for a malformed id."""
+        return self.sessions.get(session_id)
+
+    def model_for(self, session):
+        """The model a session's replies use: its own choice, else whatever the worker serves."""
+        return session.model_path or self.swap.model or self.serving() or session.selected_model()
+
+    async def transcribe_audio(self, session, audio):
+        return await self.pools["asr"].run(held, self.residency, "whisper", self.transcribe, audio,
+                                           timeout=session.latency_budget)
+
+    async def chat(self, session, text):
+        """Yield reply text increments in the session's model; the exchange goes into its memory."""
+        conversation = session.conversation if self.memory else None
+        model_path = self.model_for(session)
+        pieces = []
+        async with self.swap.borrow(model_path, session.latency_budget):   # Waits while the worker serves another model
+            async with self.pools["llm"].slot(session.latency_budget):
+                stream = held_stream(self.residency, "llm", self.reply_stream(text, conversation, model_path))
+                async for piece in self.pools["llm"].stream(stream):
+                    pieces.append(piece)
+                    yield piece
+        reply = "".join(pieces).strip()
+        if conversation is not None and reply and "❌" not in reply:
+            counter = await asyncio.to_thread(get_token_counter, model_path)
+            conversation.add_exchange(text, reply, counter)
+
+    async def speak(self, session, text):
+        """Yield (sample_rate, samples) per sentence in the session's voice, taking a TTS slot for each.
+
+        Only the first slot can be refused (PoolBusy): after that the reply
+        is admitted, and its later sentences wait for their turn on XTTS.
+        """
+        pool = self.pools["tts"]
+        synthesize, sample_rate = await pool.run(held, self.residency, "xtts", self.synthesizer, session,
+                                                 timeout=session.latency_budget)
+        for sentence in split_sentences(text):
+            async with pool.slot(admitted=True):
+                audio = await pool.call(held, self.residency, "xtts", synthesize, sentence)
+            yield sample_rate, audio
+
+    def status(self):
+        status = {"pools": {name: pool.stats() for name, pool in self.pools.items()}, "llm": self.swap.stats(),
+                  "sessions": len(self.sessions)}
+        if self.residency is not None:
+            status["vram"] = self.residency.metrics()
+        return status
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.shutdown()
+        self.sessions.close()
@@ -0,0 +1,139 @@
+# session.py — Per-user assistant state: voice, model, conversation and latency budget
+#
+# A Session is a handful of slotted attributes with no I/O at creation (its
+# conversation log is opened on first use), so a server can keep hundreds of
+# idle ones. The heavy models are not part of it: Whisper, XTTS and the LLM
+# worker are shared by every session (the residency manager keeps a model in
+# place while a session's stage uses it). The console assistant runs as the
+# default session kept by state.py.
+
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from conversation import Conversation
+
+DEFAULT_SPEAKER = "Damien Black"
+LATENCY_BUDGET  = 3.0                      # Seconds a request may wait for a busy engine
+SESSION_DIR     = Path("cache/sessions")   # One conversation log per session
+MAX_SESSIONS    = 256                      # Least recently used sessions are dropped beyond this
+SESSION_IDLE    = 1800                     # Seconds before an unused session is dropped
+SESSION_ID      = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class Session:
+    __slots__ = ("id", "speaker", "use_clone", "ref_wav", "model_path", "latency_budget",
+                 "log_file", "lock", "last_used", "_conversation", "_clock")
+
+    def __init__(self, session_id="default", speaker=DEFAULT_SPEAKER, model_path=None,
+                 latency_budget=LATENCY_BUDGET, log_file=None, clock=time.monotonic):
+        self.id = session_id
+        self.speaker = speaker
+        self.use_clone = False
+        self.ref_wav = None
+        self.model_path = model_path        # None follows the shared selection (.selected_model)
+        self.latency_budget = latency_budget
+        self.log_file = log_file            # None keeps the conversation in memory only
+        self.lock = asyncio.Lock()          # One reply at a time per session (server)
+        self._conversation = None
+        self._clock = clock
+        self.last_used = clock()
+
+    def touch(self):
+        self.last_used = self._clock()
+
+    @property
+    def conversation(self):
+        if self._conversation is None:
+            self._conversation = Conversation(self.log_file)
+        return self._conversation
+
+    def close(self):
+        if self._conversation is not None:
+            self._conversation.close()   # The log stays on disk; memory comes back with the session
+
+    # --- Voice ------------------------------------------------------------
+
+    def cloning(self):
+        """True when replies are spoken in the cloned reference voice."""
+        return bool(self.use_clone and self.ref_wav and os.path.exists(self.ref_wav))
+
+    def voice_id(self):
+        """Identifies the voice replies are spoken in (for caching synthesized audio)."""
+        if self.cloning():
+            from voice_cache import file_hash
+            return f"clone:{file_hash(self.ref_wav)}"
+        return f"speaker:{self.speaker}"
+
+    def set_ref_wav(self, path):
+        self.ref_wav = path
+        # Warm the voice cache now so the first cloned reply skips the encoder
+        from model_registry import registry
+        if path and registry.is_loaded("xtts") and os.path.exists(path):
+            self.ref_latents()
+
+    def ref_latents(self):
+        """Cached (gpt_cond_latent, speaker_embedding) for the reference WAV, or None."""
+        if not self.ref_wav or not os.path.exists(self.ref_wav):
+            return None
+        from state import get_xtts_model
+        from voice_cache import get_voice_latents
+        return get_voice_latents(get_xtts_model(), self.ref_wav)
+
+    # --- Model ------------------------------------------------------------
+
+    def selected_model(self):
+        from model_selector import get_selected_model
+        return get_selected_model(self)
+
+    def describe(self):
+        return {"session": self.id, "speaker": self.speaker, "clone": self.cloning(),
+                "model": Path(self.selected_model()).name, "latency_budget": self.latency_budget}
+
+
+class SessionTable:
+    """Sessions by id, created on first use; idle and least recently used ones are dropped."""
+
+    def __init__(self, log_dir=SESSION_DIR, max_sessions=MAX_SESSIONS, idle_seconds=SESSION_IDLE,
+                 clock=time.monotonic):
+        self.log_dir = Path(log_dir) if log_dir else None
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id):
+        if not isinstance(session_id, str) or not SESSION_ID.match(session_id):
+            raise ValueError("session must be 1-64 letters, digits, '-' or '_'")
+        self._expire()
+        session = self._sessions.get(session_id)
+        if session is None:
+            log_file = self.log_dir / f"{session_id}.jsonl" if self.log_dir else None
+            session = Session(session_id, log_file=log_file, clock=self.clock)
+            self._sessions[session_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._drop(next(iter(self._sessions)))
+        self._sessions.move_to_end(session_id)
+        session.touch()
+        return session
+
+    def _expire(self):
+        cutoff = self.clock() - self.idle_seconds
+        for session_id, session in list(self._sessions.items()):
+            if session.last_used >= cutoff:
+                break   # Kept in least recently used order
+            if not session.lock.locked():
+                self._drop(session_id)
+
+    def _drop(self, session_id):
+        self._sessions.pop(session_id).close()
+
+    def close(self):
+        for session_id in list(self._sessions):
+            self._drop(session_id)
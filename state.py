@@ -1,47 +1,55 @@
-# state.py
+# state.py — The console assistant's session, behind the accessors the menus and handlers use
+#
+# Voice and model settings live on session.Session objects. The console
+# assistant is the default session; the functions below read and change it.
+# A server keeps its own sessions and passes them along explicitly.
 
-import torch
-from TTS.api import TTS
-from TTS.tts.configs.xtts_config import XttsConfig
-from TTS.tts.models.xtts import XttsAudioConfig
-from TTS.config.shared_configs import BaseDatasetConfig
-from TTS.tts.models.xtts import XttsArgs
+from conversation import LOG_FILE
+from model_registry import registry
+from session import Session
 
-# Global state
-_xtts_model = None
-_use_xtts_clone = False
-_current_speaker = "Damien Black"
-_xtts_ref_wav = None
+_session = Session("default", log_file=LOG_FILE)
+
+def load_xtts(device="cuda"):
+    # TTS pulls in torch and the whole Coqui stack — import only when XTTS is actually needed
+    from TTS.api import TTS
+    where = "GPU" if device == "cuda" else "CPU"
+    print(f"🚀 Loading XTTS model on {where}...")
+    model = TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2").to(device)
+    print(f"✅ XTTS model initialized on {where}.")
+    return model
+
+registry.register("xtts", load_xtts)
+
+def get_session():
+    """The default session (the console assistant's)."""
+    return _session
 
 def init_xtts_model():
-    global _xtts_model
-    if _xtts_model is None:
-        print("🚀 Loading XTTS model on GPU...")
-        _xtts_model = TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2").to("cuda")
-        print("✅ XTTS model initialized on GPU.")
+    registry.get("xtts")
 
-        
 def get_xtts_model():
-    return _xtts_model
+    """Return the shared XTTS model, loading it on first use."""
+    return registry.get("xtts")
 
 def set_use_xtts(value: bool):
-    global _use_xtts_clone
-    _use_xtts_clone = value
+    _session.use_clone = value
 
 def get_use_xtts():
-    return _use_xtts_clone
+    return _session.use_clone
 
 def set_current_speaker(speaker: str):
-    global _current_speaker
-    _current_speaker = speaker
+    _session.speaker = speaker
 
 def get_current_speaker():
-    return _current_speaker
+    return _session.speaker
 
 def set_xtts_ref_wav(path: str):
-    global _xtts_ref_wav
-    _xtts_ref_wav = path
+    _session.set_ref_wav(path)
 
 def get_xtts_ref_wav():
-    return _xtts_ref_wav
+    return _session.ref_wav
 
+def get_xtts_ref_latents():
+    """Cached (gpt_cond_latent, speaker_embedding) for the current reference WAV."""
+    return _session.ref_latents()
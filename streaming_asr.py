@@ -0,0 +1,158 @@
+# streaming_asr.py — Incremental Whisper transcription while the user is still speaking
+#
+# Audio is fed in as it is captured. A background thread re-decodes the
+# uncommitted tail every STEP_SECONDS and commits words once two consecutive
+# hypotheses agree on them (local agreement). Committed audio is trimmed from
+# the buffer, so the final pass at end-of-speech only decodes the last few
+# seconds.
+
+import threading
+
+import numpy as np
+
+from tracing import get_tracer
+
+SAMPLE_RATE    = 16000
+STEP_SECONDS   = 1.0    # Decode the tail after this much new audio
+MAX_WINDOW     = 15.0   # Force-commit if the uncommitted tail grows past this
+PARTIAL_BEAM   = 1      # Greedy decoding for interim hypotheses
+FINAL_BEAM     = 5      # Same beam as the batch transcriber for the last pass
+
+
+class StreamingTranscriber:
+    """Keeps committed and partial hypotheses for one utterance."""
+
+    def __init__(self, model, sample_rate=SAMPLE_RATE, step_seconds=STEP_SECONDS,
+                 max_window=MAX_WINDOW, on_update=None):
+        self.model = model
+        self.sample_rate = sample_rate
+        self.step_samples = int(step_seconds * sample_rate)
+        self.max_window = max_window
+        self.on_update = on_update
+
+        self._chunks = []           # Uncommitted audio
+        self._buffered = 0          # Samples in _chunks
+        self._offset = 0.0          # Utterance time (s) where _chunks begins
+        self._pending = 0           # Samples fed since the last decode
+        self._committed = []        # Committed words
+        self._committed_end = 0.0   # Utterance time (s) of the last committed word
+        self._hypothesis = []       # Latest uncommitted words: (start, end, text)
+
+        self._cond = threading.Condition()
+        self._decode_lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # --- Public API -------------------------------------------------------
+
+    @property
+    def committed(self):
+        with self._cond:
+            return " ".join(self._committed)
+
+    @property
+    def partial(self):
+        with self._cond:
+            return " ".join(w[2] for w in self._hypothesis)
+
+    def feed(self, chunk):
+        """Add captured samples (any shape, float32) to the utterance."""
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        if chunk.size == 0:
+            return
+        with self._cond:
+            self._chunks.append(chunk)
+            self._buffered += chunk.size
+            self._pending += chunk.size
+            if self._pending >= self.step_samples:
+                self._cond.notify()
+
+    def finalize(self):
+        """Stop streaming, decode the uncommitted tail with full beam and return the text."""
+        self.close()
+        self._decode(beam_size=FINAL_BEAM, final=True)
+        return self.committed
+
+    def close(self):
+        """Stop the background decoder without a final pass (safe to call more than once)."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join()
+
+    # --- Decoding ---------------------------------------------------------
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped and self._pending < self.step_samples:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+            self._decode(beam_size=PARTIAL_BEAM)
+
+    def _snapshot(self):
+        with self._cond:
+            self._pending = 0
+            if not self._chunks:
+                return None, self._offset, " ".join(self._committed[-30:])
+            if len(self._chunks) > 1:
+                self._chunks = [np.concatenate(self._chunks)]
+            return self._chunks[0], self._offset, " ".join(self._committed[-30:])
+
+    def _transcribe_words(self, audio, offset, prompt, beam_size):
+        segments, _ = self.model.transcribe(
+            audio,
+            beam_size=beam_size,
+            word_timestamps=True,
+            condition_on_previous_text=False,
+            initial_prompt=prompt or None,
+        )
+        words = []
+        for segment in segments:
+            for word in segment.words or []:
+                text = word.word.strip()
+                if text:
+                    words.append((word.start + offset, word.end + offset, text))
+        return words
+
+    def _decode(self, beam_size, final=False):
+        with self._decode_lock:
+            audio, offset, prompt = self._snapshot()
+            if audio is None:
+                return
+            # Interim passes overlap the recording; only the final one delays the reply
+            with get_tracer().span("asr" if final else "asr_partial", seconds=round(audio.size / self.sample_rate, 2)):
+                words = self._transcribe_words(audio, offset, prompt, beam_size)
+
+            with self._cond:
+                words = [w for w in words if w[1] > self._committed_end]
+                if final or offset + audio.size / self.sample_rate - self._offset > self.max_window:
+                    agreed = len(words)
+                else:
+                    agreed = 0
+                    for new, old in zip(words, self._hypothesis):
+                        if new[2].lower() != old[2].lower():
+                            break
+                        agreed += 1
+
+                if agreed:
+                    self._committed.extend(w[2] for w in words[:agreed])
+                    self._committed_end = words[agreed - 1][1]
+                    self._trim(self._committed_end)
+                self._hypothesis = words[agreed:]
+
+            if self.on_update:
+                self.on_update(self.committed, self.partial)
+
+    def _trim(self, until):
+        """Drop buffered audio before utterance time `until` (caller holds the lock)."""
+        cut = int((until - self._offset) * self.sample_rate)
+        if cut <= 0 or not self._chunks:
+            return
+        audio = np.concatenate(self._chunks) if len(self._chunks) > 1 else self._chunks[0]
+        cut = min(cut, audio.size)
+        self._chunks = [audio[cut:]] if cut < audio.size else []
+        self._buffered = audio.size - cut
+        self._offset += cut / self.sample_rate
@@ -0,0 +1,120 @@
+# test_barge_in.py — Barge-in against a fake microphone that plays a scripted input in real time
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from barge_in import BargeInMonitor
+from capture import CaptureEngine
+from pipeline import TurnPipeline
+from recorder import PREROLL_SECONDS, SAMPLE_RATE, record_audio
+from test_pipeline import FakeOutput, fake_llm
+from test_vad import voice
+
+BLOCK = 320   # 20 ms, like the real input stream
+
+
+class FakeMicrophone:
+    """Input stream stand-in: delivers `script` to the callback at real-time pace."""
+
+    def __init__(self, script, callback):
+        self.script = script
+        self.callback = callback
+        self.voice_started_at = None   # When the scripted speech reached the "mic"
+        self.speech_start = None       # Sample index of the scripted speech
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        for start in range(0, self.script.size, BLOCK):
+            if self._stop.is_set():
+                return
+            if self.speech_start is not None and self.voice_started_at is None and start >= self.speech_start:
+                self.voice_started_at = time.monotonic()
+            self.callback(self.script[start:start + BLOCK].reshape(-1, 1), BLOCK, None, None)
+            time.sleep(BLOCK / SAMPLE_RATE)
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        pass
+
+
+def scripted_mic(silence, speech, tail):
+    script = np.concatenate([
+        np.full(int(silence * SAMPLE_RATE), 1e-4, np.float32),
+        voice(speech),
+        np.full(int(tail * SAMPLE_RATE), 1e-4, np.float32),
+    ])
+    mics = []
+
+    def factory(callback):
+        mics.append(FakeMicrophone(script, callback))
+        mics[-1].speech_start = int(silence * SAMPLE_RATE)
+        return mics[-1]
+    return factory, mics
+
+
+def test_speech_during_playback_stops_the_reply_and_is_recorded_from_onset():
+    factory, mics = scripted_mic(silence=0.5, speech=1.0, tail=1.0)
+    capture = CaptureEngine(SAMPLE_RATE, 15, PREROLL_SECONDS, factory)
+    outputs, produced, closed = [], [], threading.Event()
+
+    def output(sample_rate):
+        outputs.append(FakeOutput(sample_rate))
+        return outputs[-1]
+
+    sentences = (f"Sentence number {i} goes on and on." for i in range(10_000))
+    synthesized = []
+
+    def synthesize(sentence):
+        synthesized.append(sentence)
+        return [0.0] * 8
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        pipeline = TurnPipeline(synthesize, 8, output_factory=output)
+        turn = asyncio.ensure_future(pipeline.speak(fake_llm(sentences, produced, closed)))
+        monitor = BargeInMonitor(capture, lambda: loop.call_soon_threadsafe(turn.cancel)).start()
+        try:
+            await turn
+        except asyncio.CancelledError:
+            pass
+        stopped_at = time.monotonic()
+        monitor.stop()
+        return monitor, stopped_at
+
+    monitor, stopped_at = asyncio.run(main())
+    mic = mics[0]
+    assert monitor.triggered
+    assert outputs[0].events[-2:] == ["abort", "close"]
+    assert stopped_at - mic.voice_started_at < 0.3        # VAD onset + one block + abort
+    assert stopped_at - monitor.detected_at < 0.15        # Cut off promptly once detected
+    assert closed.wait(1.0)                               # LLM stream closed
+    synthesized_at_stop = len(synthesized)
+    time.sleep(0.1)
+    assert len(synthesized) == synthesized_at_stop        # Queued TTS work dropped
+
+    # The interrupting utterance is captured from its onset, pre-roll included
+    audio = record_audio(resume=monitor)
+    start = capture.utterance_start
+    assert mic.speech_start - PREROLL_SECONDS * SAMPLE_RATE - BLOCK <= start <= mic.speech_start
+    assert 0.9 * SAMPLE_RATE < audio.size < 2.5 * SAMPLE_RATE
+
+
+def test_silence_never_triggers_and_releases_the_mic():
+    factory, mics = scripted_mic(silence=0.6, speech=0.0, tail=0.0)
+    capture = CaptureEngine(SAMPLE_RATE, 15, PREROLL_SECONDS, factory)
+    heard = threading.Event()
+    monitor = BargeInMonitor(capture, heard.set).start()
+    time.sleep(0.4)
+    monitor.stop()
+    assert not heard.is_set() and not monitor.triggered
+    assert capture._stream is None
@@ -0,0 +1,47 @@
+# test_benchmark.py — One fast turn through the benchmark harness and the baseline comparison
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from benchmark import COMPARED, compare
+
+FAST = ["--turns", "2", "--warmup", "0", "--token-rate", "400", "--tokens", "12", "--load-seconds", "0.05",
+        "--rtf", "0.01", "--asr-rtf", "0.01", "--speech-seconds", "1.0", "--speed", "20"]
+
+
+def test_real_turn_code_runs_against_the_stand_ins(tmp_path):
+    # In its own process: the stand-ins replace models, devices and settings process-wide
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark.py")
+    saved = tmp_path / "result.json"
+    run = subprocess.run([sys.executable, script, *FAST, "--save", str(saved)], cwd=tmp_path,
+                         capture_output=True, text=True, timeout=300)
+    assert run.returncode == 0, run.stderr
+    assert run.stderr.count("⏱️ turn") == 2
+    result = json.loads(saved.read_text())
+    for name in COMPARED:
+        stats = result["latency"][name]
+        assert 0 < stats["p50"] <= stats["p90"] <= stats["p99"]
+    latency = result["latency"]
+    assert latency["first_token"]["p50"] < latency["ttfa"]["p50"] < latency["turn"]["p50"]
+    assert result["cpu_seconds"] > 0 and result["max_rss_mb"] > 0
+    assert sorted(os.listdir(tmp_path)) == ["result.json"]   # Caches and logs went to a scratch dir
+
+
+def test_comparison_flags_only_slowdowns_past_tolerance():
+    def result(ttfa, cpu=10.0):
+        latency = {name: {"p50": 1.0, "p90": 2.0} for name in COMPARED}
+        latency["ttfa"] = {"p50": ttfa, "p90": 2 * ttfa}
+        return {"latency": latency, "cpu_percent": cpu}
+
+    _, regressed = compare(result(1.1), result(1.0), tolerance=0.2)
+    assert not regressed
+    lines, regressed = compare(result(1.5), result(1.0), tolerance=0.2)
+    assert regressed and lines[0].startswith("❌ ttfa p50")
+    assert not compare(result(0.5), result(1.0), tolerance=0.2)[1]   # Faster is fine
+    assert compare(result(1.0, cpu=20.0), result(1.0), tolerance=0.2)[1]
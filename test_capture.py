@@ -0,0 +1,50 @@
+# test_capture.py — Ring-buffer capture: pre-roll, bounded memory and zero-copy views
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from capture import CaptureEngine
+
+SR = 1000
+
+
+def make_engine(max_seconds=2, preroll_seconds=0.2):
+    return CaptureEngine(SR, max_seconds=max_seconds, preroll_seconds=preroll_seconds,
+                         stream_factory=lambda callback: None)
+
+
+def test_anchor_keeps_preroll_before_onset():
+    engine = make_engine()
+    engine.feed(np.arange(1500, dtype=np.float32))   # Wraps the 2.2s ring before onset
+    engine.anchor(onset=1400)
+    engine.feed(np.arange(1500, 1600, dtype=np.float32))
+    audio = engine.utterance()
+    assert audio[0] == 1200 and audio[-1] == 1599
+    assert np.array_equal(audio, np.arange(1200, 1600, dtype=np.float32))
+
+
+def test_utterance_is_a_view_into_the_preallocated_buffer():
+    engine = make_engine()
+    engine.feed(np.ones(300, dtype=np.float32))
+    engine.anchor(onset=250)
+    assert np.shares_memory(engine.utterance(), engine._buf)
+    assert engine._buf.nbytes == (2 + 0.2) * SR * 4
+
+
+def test_linear_capture_stops_at_capacity():
+    engine = make_engine(max_seconds=1, preroll_seconds=0.1)
+    engine.feed(np.zeros(100, dtype=np.float32))
+    engine.anchor(onset=100)
+    engine.feed(np.ones(5000, dtype=np.float32))
+    assert engine.full
+    assert engine.utterance().size == engine.capacity
+
+
+def test_read_returns_new_audio_across_ring_wrap():
+    engine = make_engine(max_seconds=1, preroll_seconds=0)
+    engine._stream = object()   # Pretend a stream is running
+    engine.feed(np.arange(800, dtype=np.float32))
+    assert engine.read(timeout=0).size == 800
+    engine.feed(np.arange(800, 1300, dtype=np.float32))
+    assert np.array_equal(engine.read(timeout=0), np.arange(800, 1300, dtype=np.float32))
@@ -0,0 +1,79 @@
+# test_chat_templates.py — Prompt rendering for every model in model_switcher.MODEL_REGISTRY
+
+import pytest
+
+from chat_templates import TEMPLATES, detect_builtin, get_template, template_for_info
+from model_catalog import read_model_info
+from model_switcher import MODEL_REGISTRY
+from gguf_fixtures import write_model
+
+SYSTEM = "You are IGOR."
+MESSAGES = [{"role": "system", "content": SYSTEM}, {"role": "user", "content": "How do I start compost?"}]
+
+CHATML = ("<|im_start|>system\nYou are IGOR.<|im_end|>\n"
+          "<|im_start|>user\nHow do I start compost?<|im_end|>\n"
+          "<|im_start|>assistant\n")
+
+# Expected prompt per registry entry (models without an embedded chat template)
+CORPUS = {
+    "mythomax": "You are IGOR.\n\n### Instruction:\nHow do I start compost?\n\n### Response:\n",
+    "dolphin": CHATML,
+    "zeahermes": CHATML,
+    "airoboros": "You are IGOR.\n### Human:\nHow do I start compost?\n### Assistant:",
+    "openhermes": CHATML,
+    "default": "<|system|>\nYou are IGOR.</s>\n<|user|>\nHow do I start compost?</s>\n<|assistant|>\n",
+}
+
+ZEPHYR_JINJA = (
+    "{% for message in messages %}"
+    "{% if message['role'] == 'user' %}{{ '<|user|>\n' + message['content'] + eos_token }}\n"
+    "{% elif message['role'] == 'system' %}{{ '<|system|>\n' + message['content'] + eos_token }}\n"
+    "{% elif message['role'] == 'assistant' %}{{ '<|assistant|>\n' + message['content'] + eos_token }}\n"
+    "{% endif %}"
+    "{% if loop.last and add_generation_prompt %}{{ '<|assistant|>' }}\n{% endif %}"
+    "{% endfor %}"
+)
+
+
+def test_corpus_covers_registry():
+    assert set(CORPUS) == set(MODEL_REGISTRY)
+
+
+@pytest.mark.parametrize("name", sorted(MODEL_REGISTRY))
+def test_registry_model_renders(tmp_path, name):
+    filename = MODEL_REGISTRY[name]
+    info = read_model_info(write_model(tmp_path / filename, name=filename.split(".")[0], template=None))
+    template = template_for_info(info)
+    prompt = template.render(MESSAGES)
+    assert prompt == CORPUS[name]
+    # The cached system prefix must be exactly where every prompt starts
+    prefix = template.prefix(SYSTEM)
+    assert prefix and prompt.startswith(prefix) and "compost" not in prefix
+
+
+def test_history_and_mistral_system_folding():
+    history = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello."}]
+    messages = MESSAGES[:1] + history + MESSAGES[1:]
+    assert TEMPLATES["chatml"].render(messages).count("<|im_start|>assistant\n") == 2
+    mistral = TEMPLATES["mistral"].render(messages)
+    assert mistral == "[INST] You are IGOR.\n\nHi [/INST]Hello.</s>[INST] How do I start compost? [/INST]"
+    assert TEMPLATES["mistral"].prefix(SYSTEM) == "[INST] You are IGOR.\n\n"
+
+
+def test_embedded_template_detection_without_jinja():
+    assert detect_builtin("{{ '<|im_start|>' + message['role'] }}") == "chatml"
+    assert detect_builtin(ZEPHYR_JINJA) == "zephyr"
+    assert detect_builtin(None, ("some-unknown-model",)) == "raw"
+
+
+def test_embedded_jinja_template_is_compiled_once(tmp_path, monkeypatch):
+    pytest.importorskip("jinja2")
+    monkeypatch.chdir(tmp_path)   # Catalog index goes under tmp_path/cache
+    path = write_model(tmp_path / "mystery.gguf", name="mystery", template=ZEPHYR_JINJA)
+    template = get_template(path)
+    assert template.name == "jinja"
+    assert get_template(path) is template
+    assert template.render(MESSAGES) == (
+        "<|system|>\nYou are IGOR.</s>\n<|user|>\nHow do I start compost?</s>\n<|assistant|>\n"
+    )
+    assert template.prefix(SYSTEM) == "<|system|>\nYou are IGOR.</s>\n<|user|>\n"
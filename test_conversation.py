@@ -0,0 +1,64 @@
+# test_conversation.py — Vocabulary token counting, context-window fitting and the append-only log
+
+from conversation import Conversation, EstimateCounter, TokenCounter, get_token_counter
+from gguf_fixtures import write_gguf
+
+VOCAB = ["<s>", "</s>", "<0x0A>", "▁", "▁the", "▁compost", "▁heap", "▁water", "▁how", "▁do", "▁I",
+         "▁start", "?", "."] + [chr(c) for c in range(ord("a"), ord("z") + 1)]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+def test_counter_uses_longest_vocabulary_match(tmp_path):
+    counter = TokenCounter(VOCAB)
+    assert counter.count("the compost heap") == 3
+    assert counter.count("how do I start compost?") == 6
+    assert counter.count("the qx") == 4          # "▁the", "▁", "q", "x"
+    assert counter.count("the é") == 4           # é is missing: one byte token per UTF-8 byte
+    assert counter.count("") == 0
+
+    path = write_gguf(tmp_path / "m.gguf", {"general.architecture": "llama", "tokenizer.ggml.tokens": VOCAB}, [])
+    assert get_token_counter(path).count("the compost heap") == 3
+    assert isinstance(get_token_counter(tmp_path / "missing.gguf"), EstimateCounter)
+
+
+def test_window_keeps_newest_exchanges_and_summarizes_the_rest(tmp_path):
+    counter = EstimateCounter()
+    conversation = Conversation(tmp_path / "log.jsonl", clock=Clock())
+    for i in range(6):
+        conversation.add_exchange(f"Question number {i} about water?", "A" * 60, counter)
+
+    everything = conversation.window(10_000, counter, overhead=0)
+    assert len(everything) == 12 and everything[0]["content"].startswith("Question number 0")
+
+    messages = conversation.window(100, counter, overhead=4)
+    assert [m["role"] for m in messages] == ["user", "assistant"] * (len(messages) // 2)
+    assert 0 < len(messages) < 12
+    assert messages[-2]["content"] == "Question number 5 about water?"
+    assert messages[0]["content"].startswith("Earlier we talked about: ")
+    assert conversation.window(5, counter) == []
+
+
+def test_log_is_appended_and_replayed(tmp_path):
+    log = tmp_path / "log.jsonl"
+    first = Conversation(log, clock=Clock())
+    first.add_exchange("Hi", "Hello.")
+    first.clear()
+    first.add_exchange("How do I start compost?", "Layer greens and browns.")
+    first.close()
+    with open(log, "a") as f:
+        f.write('{"role": "user", "cont')   # Torn write from a crash
+
+    lines = log.read_text().splitlines()
+    assert len(lines) == 6    # Nothing was rewritten, only appended
+
+    second = Conversation(log)
+    assert [t["content"] for t in second.turns] == ["How do I start compost?", "Layer greens and browns."]
+    assert second.last_query() == "How do I start compost?"
@@ -0,0 +1,112 @@
+# test_daemon.py — Resident daemon and thin client over a Unix socket, with stand-in engines
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+sf = pytest.importorskip("soundfile")
+
+from arc_client import DaemonUnavailable, call, connect, request
+from daemon import AssistantDaemon, serve
+from session import SessionTable
+
+
+def fake_reply(text, conversation, model_path=None):
+    turns = len(conversation.turns) // 2 if conversation is not None else 0
+    for word in f"Reply {turns} to: {text}".split():
+        yield word + " "
+
+
+def fake_synthesizer(session):
+    level = 0.25 if session.cloning() else 0.5
+    return (lambda sentence: np.full(len(sentence), level, np.float32)), 8000
+
+
+def start(tmp_path):
+    """Run a daemon on its own loop thread; returns (socket path, thread)."""
+    path = tmp_path / "d.sock"
+    daemon = AssistantDaemon(transcribe=lambda audio: f"{audio.size} samples", reply_stream=fake_reply,
+                             synthesizer=fake_synthesizer, serving=lambda: None,
+                             sessions=SessionTable(tmp_path / "sessions"))
+    thread = threading.Thread(target=asyncio.run, args=(serve(daemon, path),), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            connect(path).close()
+            return path, thread
+        except DaemonUnavailable:
+            assert time.monotonic() < deadline, "daemon did not start"
+            time.sleep(0.02)
+
+
+def test_ask_speak_and_transcribe_through_the_client(tmp_path):
+    path, thread = start(tmp_path)
+    try:
+        replies = list(request({"op": "ask", "text": "hello"}, path))
+        assert [r["token"] for r in replies[:-1]] == ["Reply ", "0 ", "to: ", "hello "]
+        assert replies[-1] == {"done": True, "text": "Reply 0 to: hello"}
+        # The "cli" session keeps its memory between client runs
+        assert call({"op": "ask", "text": "again"}, path)["text"] == "Reply 1 to: again"
+
+        out = tmp_path / "out" / "speech.wav"
+        reply = call({"op": "speak", "text": "First sentence is here. Second one follows!", "out": str(out)}, path)
+        audio, sample_rate = sf.read(out, dtype="float32")
+        assert reply["path"] == str(out) and reply["sample_rate"] == sample_rate == 8000
+        assert audio.size == len("First sentence is here.") + len("Second one follows!")
+        assert reply["seconds"] == round(audio.size / 8000, 2)
+
+        reply = call({"op": "ask", "text": "read it", "session": "porch", "out": str(out)}, path)
+        assert reply["text"] == "Reply 0 to: read it"
+        assert sf.info(out).frames == len("Reply 0 to: read it")
+
+        wav = tmp_path / "question.wav"
+        sf.write(wav, np.zeros(8000, np.float32), 8000)
+        # A reference clip switches that session to the cloned voice
+        clone = tmp_path / "clone.wav"
+        call({"op": "speak", "text": "Cloned voice speaking.", "out": str(clone), "ref_wav": str(wav),
+              "session": "mike"}, path)
+        assert np.allclose(sf.read(clone, dtype="float32")[0], 0.25, atol=1e-3)
+        with pytest.raises(RuntimeError, match="no reference WAV"):
+            call({"op": "speak", "text": "Hi there.", "out": str(clone), "ref_wav": str(tmp_path / "nope.wav")}, path)
+        assert call({"op": "transcribe", "path": str(wav)}, path)["text"] == "16000 samples"   # Resampled
+        assert call({"op": "status"}, path)["sessions"] == 3
+
+        with pytest.raises(RuntimeError, match="session must be"):
+            call({"op": "ask", "text": "hi", "session": "../etc"}, path)
+        with pytest.raises(RuntimeError, match="expected"):
+            call({"op": "dance"}, path)
+        with pytest.raises(RuntimeError):
+            call({"op": "transcribe", "path": str(tmp_path / "missing.wav")}, path)
+        assert call({"op": "ping"}, path) == {"done": True}   # Still serving after errors
+    finally:
+        call({"op": "shutdown"}, path)
+        thread.join(5)
+    assert not thread.is_alive()
+    assert not path.exists()
+    with pytest.raises(DaemonUnavailable):
+        call({"op": "ping"}, path)
+
+
+def test_stale_socket_is_replaced_and_live_one_refused(tmp_path):
+    import socket
+    from daemon import claim_socket
+
+    stale = tmp_path / "stale.sock"
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(str(stale))
+    listener.close()   # Leaves the file behind with nobody listening
+    claim_socket(stale)
+    assert not stale.exists()
+
+    path, thread = start(tmp_path)
+    try:
+        with pytest.raises(SystemExit, match="already listening"):
+            claim_socket(path)
+        assert call({"op": "ping"}, path) == {"done": True}
+    finally:
+        call({"op": "shutdown"}, path)
+        thread.join(5)
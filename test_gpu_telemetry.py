@@ -0,0 +1,54 @@
+# test_gpu_telemetry.py — Cached GPU telemetry with the fake backend
+
+import time
+
+from gpu_telemetry import FakeBackend, GPUTelemetry, NullBackend
+
+
+def test_reads_are_served_from_cache():
+    backend = FakeBackend(total_mb=8192, used_mb=2000)
+    telemetry = GPUTelemetry(backend, max_age=60)
+    assert telemetry.free_mb() == 6192
+    reads = backend.reads
+
+    backend.used_mb = 5000
+    for _ in range(100):
+        assert telemetry.free_mb() == 6192   # Cached value, no backend call
+    assert backend.reads == reads
+    assert telemetry.free_mb(fresh=True) == 3192
+    assert backend.reads == reads + 1
+
+
+def test_background_sampler_fills_bounded_history():
+    backend = FakeBackend(total_mb=8192, used_mb=1000)
+    telemetry = GPUTelemetry(backend, interval=0.005, history=5)
+    telemetry.start()
+    try:
+        deadline = time.monotonic() + 2
+        while backend.reads < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        backend.used_mb = 3000
+        time.sleep(0.05)
+    finally:
+        telemetry.stop()
+    assert backend.reads >= 10
+    assert len(telemetry.history()) == 5
+    assert telemetry.latest().used_mb == 3000
+    assert "MB free" in telemetry.summary()
+
+
+def test_stale_sample_is_refreshed():
+    backend = FakeBackend(total_mb=4096)
+    telemetry = GPUTelemetry(backend, max_age=0)
+    telemetry.free_mb()
+    backend.used_mb = 1024
+    assert telemetry.free_mb() == 3072
+
+
+def test_null_backend_reports_no_gpu():
+    telemetry = GPUTelemetry(NullBackend())
+    telemetry.start()   # No thread for an unavailable backend
+    assert telemetry._thread is None
+    assert not telemetry.available
+    assert telemetry.free_mb() == 0
+    assert telemetry.summary() == "no GPU telemetry"
@@ -0,0 +1,113 @@
+# test_layer_planner.py — GGUF header parsing and ngl/context planning on synthetic headers
+
+import struct
+
+import pytest
+
+import gguf_reader
+from gguf_reader import GGUFError, read_array_items, read_header, read_vocab
+from gguf_fixtures import F32, Q4_K, gguf_string, write_gguf
+from layer_planner import ModelLayout, plan_for_model, plan_layers
+
+
+def synthetic_model(path, n_layer=32, n_embd=4096, n_head=32, n_head_kv=8, n_vocab=32000):
+    metadata = {
+        "general.architecture": "llama",
+        "general.file_type": 15,
+        "llama.block_count": n_layer,
+        "llama.embedding_length": n_embd,
+        "llama.attention.head_count": n_head,
+        "llama.attention.head_count_kv": n_head_kv,
+        "llama.context_length": 4096,
+        "tokenizer.ggml.tokens": ["<s>", "</s>", "hello"],
+    }
+    tensors = [("token_embd.weight", (n_embd, n_vocab), Q4_K)]
+    for i in range(n_layer):
+        tensors += [
+            (f"blk.{i}.attn_norm.weight", (n_embd,), F32),
+            (f"blk.{i}.attn_q.weight", (n_embd, n_embd), Q4_K),
+            (f"blk.{i}.ffn_up.weight", (n_embd, 14336), Q4_K),
+        ]
+    tensors += [("output_norm.weight", (n_embd,), F32), ("output.weight", (n_embd, n_vocab), Q4_K)]
+    return write_gguf(path, metadata, tensors)
+
+
+def test_reader_parses_metadata_and_tensor_sizes(tmp_path):
+    path = synthetic_model(tmp_path / "model.gguf", n_layer=2)
+    header = read_header(path)
+    assert header.version == 3
+    assert header.architecture == "llama"
+    assert header.arch_get("block_count") == 2
+    assert header.get("tokenizer.ggml.tokens") == ["<s>", "</s>", "hello"]
+    q = next(t for t in header.tensors if t.name == "blk.0.attn_q.weight")
+    assert q.n_bytes == 4096 * 4096 // 256 * 144
+
+    light = read_header(path, skip_arrays=True)
+    assert "tokenizer.ggml.tokens" not in light.metadata
+    assert len(light.tensors) == len(header.tensors)
+    offset = light.array_offsets["tokenizer.ggml.tokens"]
+    assert read_array_items(path, offset, [2, 0, None, 7]) == {0: "<s>", 2: "hello"}
+
+    assert read_vocab(path) == (["<s>", "</s>", "hello"], "llama")
+    assert read_vocab(path) is read_vocab(path)   # Parsed once
+
+
+def test_reader_rejects_non_gguf(tmp_path):
+    bad = tmp_path / "bad.gguf"
+    bad.write_bytes(b"GGML" + b"\0" * 32)
+    with pytest.raises(GGUFError):
+        read_header(bad)
+    truncated = tmp_path / "short.gguf"
+    truncated.write_bytes(synthetic_model(tmp_path / "m.gguf", n_layer=1).read_bytes()[:40])
+    with pytest.raises(GGUFError):
+        read_header(truncated)
+
+
+
+def test_truncated_array_is_a_header_error(tmp_path):
+    # A scores array that claims 1000 floats but the file ends after two
+    body = struct.pack("<I", gguf_reader.ARRAY) + struct.pack("<IQ", gguf_reader.FLOAT32, 1000) + struct.pack("<2f", 0, 0)
+    short = tmp_path / "short.gguf"
+    short.write_bytes(b"GGUF" + struct.pack("<IQQ", 3, 0, 1) + gguf_string("tokenizer.ggml.scores") + body)
+    with pytest.raises(GGUFError, match="Truncated"):
+        read_header(short)
+    with pytest.raises(GGUFError, match="Truncated"):
+        read_header(short, skip_arrays=True)
+
+    fallback = plan_for_model(short, free_mb=6000, contexts=(2048, 1024))
+    assert fallback.ngl == 24 and fallback.reason == "header unreadable, using defaults"
+
+
+def test_layout_accounts_layers_kv_and_output(tmp_path):
+    layout = ModelLayout.from_header(read_header(synthetic_model(tmp_path / "m.gguf")))
+    assert layout.n_layer == 32
+    assert layout.quant == "Q4_K_M"
+    assert layout.n_embd_k == 1024   # GQA: 8 KV heads of 128
+    assert layout.n_vocab == 32000
+    # More layers and longer context always cost more
+    assert layout.vram_mb(16, 2048) < layout.vram_mb(24, 2048) < layout.vram_mb(24, 4096)
+    assert layout.vram_mb(33, 2048) > layout.vram_mb(32, 2048) + layout.output_bytes / 2**20
+
+
+def test_plan_is_largest_fit(tmp_path):
+    layout = ModelLayout.from_header(read_header(synthetic_model(tmp_path / "m.gguf")))
+
+    full = plan_layers(layout, free_mb=12000)
+    assert full.ngl == 33 and full.context_size == 4096
+
+    for free in (1500, 2500, 4000):
+        plan = plan_layers(layout, free_mb=free)
+        assert plan.vram_mb <= free - 256
+        if plan.ngl < 33:
+            assert layout.vram_mb(plan.ngl + 1, plan.context_size) > free - 256
+
+    assert plan_layers(layout, free_mb=200).ngl == 0
+
+
+def test_plan_respects_trained_context_and_unreadable_files(tmp_path):
+    layout = ModelLayout.from_header(read_header(synthetic_model(tmp_path / "m.gguf")))
+    layout.n_ctx_train = 2048
+    assert plan_layers(layout, free_mb=12000).context_size == 2048
+
+    fallback = plan_for_model(tmp_path / "missing.gguf", free_mb=6000, contexts=(2048, 1024))
+    assert fallback.ngl == 24 and fallback.context_size == 2048
@@ -0,0 +1,138 @@
+# test_llm_engine.py — Persistent LLM worker tests using a stand-in worker script
+
+import sys
+import textwrap
+
+import pytest
+
+from llm_engine import LLMEngine, LLMWorkerError
+
+FAKE_WORKER = textwrap.dedent('''
+    import argparse, json, os, queue, sys, threading, time
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model")
+    parser.add_argument("--context-size")
+    parser.add_argument("--ngl")
+    args = parser.parse_args()
+
+    def emit(obj):
+        sys.stdout.write(json.dumps(obj) + "\\n")
+        sys.stdout.flush()
+
+    print("loading model (stderr noise)", file=sys.stderr)
+    emit({"ready": True})
+    requests, cancel = queue.Queue(), threading.Event()
+
+    def read():
+        for line in sys.stdin:
+            message = json.loads(line)
+            if message.get("cancel"):
+                cancel.set()
+            else:
+                requests.put(message)
+        requests.put(None)
+
+    threading.Thread(target=read, daemon=True).start()
+    for request in iter(requests.get, None):
+        cancel.clear()
+        prompt = request["prompt"]
+        if prompt == "crash":
+            sys.exit(3)
+        if prompt == "fail":
+            emit({"error": "boom", "done": True})
+            continue
+        words = [os.path.basename(args.model), str(os.getpid())] + prompt.split()
+        if prompt == "forever":
+            words = ("word%d" % i for i in range(10**6))
+        for word in words:
+            if cancel.is_set():
+                break
+            emit({"token": word + " "})
+            if prompt == "forever":
+                time.sleep(0.01)
+        emit({"done": True, "cancelled": True} if cancel.is_set() else {"done": True})
+''')
+
+
+@pytest.fixture
+def engine(tmp_path):
+    script = tmp_path / "fake_worker.py"
+    script.write_text(FAKE_WORKER)
+    eng = LLMEngine(worker_cmd=[sys.executable, str(script)], ready_timeout=10, token_timeout=10)
+    yield eng
+    eng.shutdown()
+
+
+def test_worker_is_reused_between_prompts(engine):
+    first = engine.generate("hello there", "a.gguf").split()
+    second = engine.generate("again", "a.gguf").split()
+    assert first[0] == "a.gguf" and first[2:] == ["hello", "there"]
+    assert first[1] == second[1]  # Same worker pid
+    assert engine.starts == 1
+
+
+def test_worker_restarts_when_model_changes(engine):
+    first = engine.generate("hi", "a.gguf").split()
+    second = engine.generate("hi", "b.gguf").split()
+    assert second[0] == "b.gguf"
+    assert first[1] != second[1]
+    assert engine.starts == 2
+
+
+def test_worker_restarts_after_crash(engine):
+    engine.generate("hi", "a.gguf")
+    with pytest.raises(LLMWorkerError):
+        engine.generate("crash", "a.gguf")
+    assert engine.generate("back", "a.gguf").split()[2:] == ["back"]
+    assert engine.starts == 2
+
+
+def test_worker_error_keeps_worker_alive(engine):
+    with pytest.raises(LLMWorkerError, match="boom"):
+        engine.generate("fail", "a.gguf")
+    assert engine.is_alive()
+    assert engine.generate("ok", "a.gguf").split()[2:] == ["ok"]
+    assert engine.starts == 1
+
+
+def test_abandoned_stream_does_not_leak_into_next_prompt(engine):
+    stream = engine.stream("one two three four", "a.gguf")
+    next(stream)
+    stream.close()
+    assert engine.generate("five", "a.gguf").split()[2:] == ["five"]
+
+
+def test_cancel_stops_a_running_response(engine):
+    import threading
+
+    assert not engine.cancel()   # Nothing in flight
+    pieces = []
+    stream = engine.stream("forever", "a.gguf")
+    for piece in stream:
+        pieces.append(piece)
+        if len(pieces) == 5:
+            threading.Thread(target=engine.cancel).start()
+    assert 5 <= len(pieces) < 100
+    assert engine.cancels == 1
+    assert engine.generate("after", "a.gguf").split()[2:] == ["after"]
+    assert engine.starts == 1
+
+
+def test_output_filter_matches_batch_cleaning_for_split_lines():
+    from llm_handler import LlamaOutputFilter, clean_llama_output
+
+    raw = "llama_model_load: loading\n\x1b[32mHello there\x1b[0m\nwarning: low vram\n[INFO] x\n\nSecond answer line\n"
+    output_filter = LlamaOutputFilter()
+    streamed = "".join(output_filter.feed(raw[i:i + 3]) for i in range(0, len(raw), 3))
+    streamed += output_filter.flush()
+    assert streamed == clean_llama_output(raw) == "Hello there\nSecond answer line"
+
+
+def test_output_filter_streams_after_first_sentence():
+    from llm_handler import LlamaOutputFilter
+
+    output_filter = LlamaOutputFilter()
+    assert output_filter.feed("Compost needs air") == ""
+    assert output_filter.feed(". Turn it ") == "Compost needs air. Turn it "
+    assert output_filter.feed("weekly") == "weekly"
+    assert output_filter.flush() == ""
@@ -0,0 +1,45 @@
+# test_model_catalog.py — Header-only model metadata and the size/mtime-invalidated index
+
+import os
+
+from gguf_fixtures import TEMPLATE, write_model
+from model_catalog import ModelCatalog, read_model_info
+
+
+def test_reads_header_metadata(tmp_path):
+    info = read_model_info(write_model(tmp_path / "zephyr.Q4_K_M.gguf"))
+    assert info.error is None
+    assert (info.architecture, info.title, info.quant) == ("llama", "zephyr", "Q4_K_M")
+    assert (info.context_length, info.block_count) == (4096, 32)
+    assert info.chat_template == TEMPLATE
+    assert (info.bos_token, info.eos_token) == ("<s>", "</s>")   # Picked out without decoding the vocab
+    assert "Q4_K_M" in info.summary() and "32 layers" in info.summary()
+
+
+def test_index_serves_unchanged_files_and_reparses_changed(tmp_path):
+    models = tmp_path / "models"
+    models.mkdir()
+    write_model(models / "a.gguf", name="a")
+    write_model(models / "b.gguf", name="b", template=None)
+    (models / "broken.gguf").write_bytes(b"nope")
+    index = tmp_path / "index.json"
+
+    first = ModelCatalog(models, index)
+    infos = first.scan()
+    assert [i.name for i in infos] == ["a.gguf", "b.gguf", "broken.gguf"]
+    assert infos[2].error and infos[1].chat_template is None
+    assert first.parsed == 3
+
+    second = ModelCatalog(models, index)   # Fresh process: everything from the index
+    assert [i.title for i in second.scan()] == ["a", "b", None]
+    assert second.parsed == 0
+
+    write_model(models / "a.gguf", name="a2", layers=40)
+    stat = os.stat(models / "a.gguf")
+    os.utime(models / "a.gguf", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    (models / "b.gguf").unlink()
+    third = ModelCatalog(models, index)
+    infos = third.scan()
+    assert third.parsed == 1
+    assert [(i.name, i.block_count) for i in infos] == [("a.gguf", 40), ("broken.gguf", None)]
+    assert len(ModelCatalog(models, index)._load_index()) == 2
@@ -0,0 +1,49 @@
+# test_model_registry.py — Lazy loading, single load under concurrency and background warm-up
+
+import threading
+import time
+
+from model_registry import ModelRegistry
+
+
+def test_model_is_not_loaded_until_first_use():
+    calls = []
+    registry = ModelRegistry()
+    registry.register("whisper", lambda: calls.append(1) or "model")
+    assert calls == [] and not registry.is_loaded("whisper")
+    assert registry.get("whisper") == "model"
+    assert registry.get("whisper") == "model"
+    assert calls == [1]
+    assert "whisper" in registry.load_times
+
+
+def test_concurrent_callers_share_one_load():
+    calls = []
+    registry = ModelRegistry()
+
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return object()
+
+    registry.register("xtts", slow_loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("xtts"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+    assert len({id(r) for r in results}) == 1
+
+
+def test_warm_loads_models_in_parallel():
+    registry = ModelRegistry()
+    registry.register("a", lambda: time.sleep(0.2) or "A")
+    registry.register("b", lambda: time.sleep(0.2) or "B")
+    start = time.time()
+    for thread in registry.warm():
+        thread.join()
+    assert time.time() - start < 0.35
+    assert registry.is_loaded("a") and registry.is_loaded("b")
+    assert registry.load_times["a"] >= 0.2
@@ -0,0 +1,131 @@
+# test_pipeline.py — Asyncio turn pipeline with a fake LLM stream, synthesizer and output device
+
+import asyncio
+import threading
+import time
+
+from pipeline import Console, TurnPipeline
+
+
+class FakeOutput:
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.written = []
+        self.events = []
+
+    def start(self):
+        self.events.append("start")
+
+    def write(self, audio):
+        time.sleep(0.05)   # Playback takes time
+        self.written.append(audio[0])
+
+    def stop(self):
+        self.events.append("stop")
+
+    def abort(self):
+        self.events.append("abort")
+
+    def close(self):
+        self.events.append("close")
+
+
+def fake_llm(sentences, produced, closed):
+    try:
+        for sentence in sentences:
+            for word in sentence.split(" "):
+                produced.append(word)
+                yield word + " "
+    finally:
+        closed.set()
+
+
+def test_stages_overlap_and_play_in_order():
+    outputs = []
+    synthesized_while_playing = []
+
+    def factory(sample_rate):
+        outputs.append(FakeOutput(sample_rate))
+        return outputs[-1]
+
+    def synthesize(sentence):
+        synthesized_while_playing.append(bool(outputs and "start" in outputs[0].events))
+        time.sleep(0.02)
+        return [float(len(synthesized_while_playing))] * 8
+
+    sentences = [f"Sentence number {i} is long enough." for i in range(1, 5)]
+    echoed = []
+    pipeline = TurnPipeline(synthesize, 8, output_factory=factory)
+    stats = asyncio.run(pipeline.speak(fake_llm(sentences, [], threading.Event()), keep_audio=True,
+                                       on_text=echoed.append))
+
+    assert outputs[0].written == [1.0, 2.0, 3.0, 4.0]
+    assert outputs[0].events == ["start", "stop", "close"]
+    assert stats["sentences"] == 4 and stats["audio"].size == 32
+    assert "".join(echoed).split() == " ".join(sentences).split()
+    assert any(synthesized_while_playing)   # Later sentences were made while earlier ones played
+
+
+def test_cancel_stops_every_stage():
+    produced, closed = [], threading.Event()
+    outputs = []
+
+    def factory(sample_rate):
+        outputs.append(FakeOutput(sample_rate))
+        return outputs[-1]
+
+    endless = (f"Sentence number {i} keeps going." for i in range(10_000))
+
+    async def main():
+        pipeline = TurnPipeline(lambda s: [0.0] * 8, 8, output_factory=factory, text_queue_size=4)
+        turn = asyncio.ensure_future(pipeline.speak(fake_llm(endless, produced, closed)))
+        await asyncio.sleep(0.3)
+        turn.cancel()
+        try:
+            await turn
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(main())
+    assert closed.wait(1.0)                  # The LLM stream was closed
+    assert len(produced) < 200               # Bounded queues held the LLM back
+    assert outputs[0].events == ["start", "abort", "close"]
+
+
+def test_reply_text_streams_while_the_voice_is_still_loading():
+    voice_ready = threading.Event()
+    echoed_before_voice = []
+
+    def load_voice():
+        time.sleep(0.3)   # XTTS still loading in the background
+        voice_ready.set()
+        return (lambda sentence: [1.0] * 8), 16
+
+    sentences = [f"Sentence number {i} is long enough." for i in range(1, 9)]
+    pipeline = TurnPipeline(None, None, output_factory=FakeOutput, sentence_queue_size=1, load_voice=load_voice)
+    stats = asyncio.run(pipeline.speak(fake_llm(sentences, [], threading.Event()),
+                                       on_text=lambda piece: echoed_before_voice.append(not voice_ready.is_set())))
+
+    assert all(echoed_before_voice)   # The whole reply was shown before the voice was ready
+    assert stats["sentences"] == 8 and stats["sample_rate"] == 16
+    assert stats["audio_seconds"] == 4.0
+
+
+def test_console_line_read_during_a_turn_answers_the_next_prompt():
+    lines = iter(["", "q"])
+    prompts = []
+
+    def read(prompt):
+        prompts.append(prompt)
+        return next(lines)
+
+    async def main():
+        console = Console(read)
+        pending = console.request()          # Listening for a stop key during a turn
+        await asyncio.sleep(0.05)
+        assert pending.done()
+        assert await console.readline("🟢 Your turn: ") == ""   # Reused, no second read
+        assert await console.readline("🟢 Your turn: ") == "q"
+
+    asyncio.run(main())
+    assert prompts == ["", "🟢 Your turn: "]
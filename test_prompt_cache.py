@@ -0,0 +1,75 @@
+# test_prompt_cache.py — Prefix KV-state reuse and disk-budget eviction with a fake llama
+
+import os
+
+from prompt_cache import PromptCache, prefix_key, prime
+
+
+class FakeLlama:
+    """Character-level 'tokenizer'; counts how many tokens were evaluated."""
+
+    def __init__(self, n_ctx=64):
+        self.input_ids = [0] * n_ctx
+        self.n_tokens = 0
+        self.evaluated = 0
+
+    def tokenize(self, text, add_bos=True, special=False):
+        return ([1] if add_bos else []) + list(text)
+
+    def reset(self):
+        self.n_tokens = 0
+
+    def eval(self, tokens):
+        self.input_ids[self.n_tokens:self.n_tokens + len(tokens)] = tokens
+        self.n_tokens += len(tokens)
+        self.evaluated += len(tokens)
+
+    def save_state(self):
+        return {"ids": self.input_ids[:self.n_tokens]}
+
+    def load_state(self, state):
+        self.reset()
+        self.input_ids[:len(state["ids"])] = state["ids"]
+        self.n_tokens = len(state["ids"])
+
+
+def test_prefix_state_survives_worker_restart(tmp_path):
+    model = tmp_path / "model.gguf"
+    model.write_bytes(b"GGUF")
+    cache = PromptCache(tmp_path / "prompts")
+
+    llm = FakeLlama()
+    assert prime(llm, cache, model, 2048, "You are helpful.") == "computed"
+    assert prime(llm, cache, model, 2048, "You are helpful.") == "memory"
+    assert llm.evaluated == 17
+
+    restarted = FakeLlama()
+    assert prime(restarted, cache, model, 2048, "You are helpful.") == "disk"
+    assert restarted.evaluated == 0
+    assert restarted.n_tokens == 17
+    assert cache.hits == 1
+
+
+def test_key_changes_with_model_context_and_prefix(tmp_path):
+    model = tmp_path / "model.gguf"
+    model.write_bytes(b"GGUF")
+    base = prefix_key(model, 2048, "sys")
+    assert base == prefix_key(model, 2048, "sys")
+    assert base != prefix_key(model, 4096, "sys")
+    assert base != prefix_key(model, 2048, "sys2")
+    model.write_bytes(b"GGUF v2")
+    assert base != prefix_key(model, 2048, "sys")
+
+
+def test_eviction_keeps_directory_under_budget(tmp_path):
+    cache = PromptCache(tmp_path, budget_mb=0.001)   # ~1 KB
+    for i in range(5):
+        cache.store(f"k{i}", b"x" * 400)
+        os.utime(cache.path_for(f"k{i}"), (i, i))      # Deterministic LRU order
+    remaining = sorted(p.stem for p in tmp_path.glob("*.state"))
+    assert remaining == ["k3", "k4"]
+
+    cache.load("k3")                                  # Hit refreshes k3
+    cache.store("k5", b"x" * 400)
+    assert sorted(p.stem for p in tmp_path.glob("*.state")) == ["k3", "k5"]
+    assert cache.load("k0") is None and cache.misses == 1
@@ -0,0 +1,71 @@
+# test_response_cache.py — Keyed answer cache: normalization, TTL, LRU bound and cached audio
+
+import pytest
+
+from response_cache import ResponseCache, make_key, normalize_query
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def model(tmp_path):
+    path = tmp_path / "model.gguf"
+    path.write_bytes(b"GGUF" + b"\0" * 64)
+    return path
+
+
+def test_key_normalizes_query_but_not_settings(model):
+    params = {"temperature": 0.7, "max_tokens": 300}
+    key = make_key("How do I purify water?", model, "<|user|>{query}", params)
+    assert normalize_query("  how do i PURIFY water ") == "how do i purify water"
+    assert key == make_key("how do I purify   water", model, "<|user|>{query}", params)
+    assert key != make_key("How do I purify water?", model, "### Human:\n{query}", params)
+    assert key != make_key("How do I purify water?", model, "<|user|>{query}", dict(params, temperature=0.2))
+    model.write_bytes(b"GGUF" + b"\1" * 64)
+    assert key != make_key("How do I purify water?", model, "<|user|>{query}", params)
+
+
+def test_hits_misses_and_ttl(tmp_path):
+    clock = Clock()
+    cache = ResponseCache(tmp_path, ttl_seconds=60, clock=clock)
+    assert cache.get("k") is None
+    cache.put("k", "compost?", "Layer greens and browns.")
+    assert cache.get("k").text == "Layer greens and browns."
+    clock.now += 61
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 0)
+
+
+def test_lru_eviction_by_size(tmp_path):
+    clock = Clock()
+    cache = ResponseCache(tmp_path, max_mb=300 / 2**20, clock=clock)   # 300 bytes
+    for name in ("a", "b", "c"):
+        clock.now += 1
+        cache.put(name, name, "x" * 120)
+    assert cache.get("a") is None            # Oldest went first
+    clock.now += 1
+    cache.get("b")                           # b is now more recent than c
+    clock.now += 1
+    cache.put("d", "d", "x" * 120)
+    assert cache.get("c") is None
+    assert cache.get("b") is not None and cache.get("d") is not None
+    assert cache.stats()["evictions"] == 2
+
+
+def test_audio_is_cached_per_voice(tmp_path):
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("soundfile")
+    cache = ResponseCache(tmp_path)
+    cache.put("k", "q", "Answer.")
+    path = cache.put_audio("k", "speaker:Ana Florence", np.zeros(2400, dtype=np.float32), 24000)
+    assert cache.get("k", voice="speaker:Ana Florence").audio_path == path
+    assert cache.get("k", voice="speaker:Sofia Hellen").audio_path is None
+    assert cache.stats()["audio_hits"] == 1
+    assert cache.put_audio("missing", "v", np.zeros(10, dtype=np.float32), 24000) is None
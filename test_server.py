@@ -0,0 +1,278 @@
+# test_server.py — LAN server endpoints, sessions and backpressure with stand-in engines
+
+import asyncio
+import io
+import json
+import os
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("aiohttp")
+sf = pytest.importorskip("soundfile")
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from server import AssistantServer
+from session import SessionTable
+from tts_pipeline import split_sentences
+from worker_pool import ModelSwap, PoolBusy, WorkerPool
+
+SAMPLE_RATES = {"Damien Black": 8000, "Ana Florence": 16000}   # Tells the voices apart
+
+
+def fake_reply(text, conversation, model_path=None):
+    turns = len(conversation.turns) // 2 if conversation is not None else 0
+    for word in f"Reply {turns} to: {text}".split():
+        yield word + " "
+
+
+def fake_synthesizer(session):
+    return (lambda sentence: np.full(len(sentence), 0.5, np.float32)), SAMPLE_RATES[session.speaker]
+
+
+def make_server(tmp_path, **kwargs):
+    kwargs.setdefault("reply_stream", fake_reply)
+    kwargs.setdefault("synthesizer", fake_synthesizer)
+    kwargs.setdefault("serving", lambda: None)
+    return AssistantServer(transcribe=lambda audio: f"{audio.size} samples",
+                           sessions=SessionTable(tmp_path / "sessions"), **kwargs)
+
+
+def serve(server, check):
+    async def run():
+        client = TestClient(TestServer(server.app()))
+        await client.start_server()
+        try:
+            await check(client)
+        finally:
+            await client.close()
+            server.close()
+    asyncio.run(run())
+
+
+def test_chat_speak_and_transcribe_over_http_and_websocket(tmp_path):
+    server = make_server(tmp_path)
+
+    async def check(client):
+        response = await client.post("/chat", json={"text": "hello", "session": "kitchen"})
+        lines = [json.loads(line) for line in (await response.text()).splitlines()]
+        assert response.headers["Content-Type"] == "application/x-ndjson"
+        assert [l["token"] for l in lines[:-1]] == ["Reply ", "0 ", "to: ", "hello "]
+        assert lines[-1] == {"done": True, "text": "Reply 0 to: hello"}
+
+        # Memory is per session: the kitchen remembers, the porch starts fresh
+        response = await client.post("/chat", json={"text": "again", "session": "kitchen"})
+        assert json.loads((await response.text()).splitlines()[-1])["text"] == "Reply 1 to: again"
+        response = await client.post("/chat", json={"text": "hi", "session": "porch"})
+        assert json.loads((await response.text()).splitlines()[-1])["text"] == "Reply 0 to: hi"
+        assert (tmp_path / "sessions" / "kitchen.jsonl").exists()
+
+        response = await client.post("/speak", json={"text": "First sentence is here. Second one follows!"})
+        pcm = np.frombuffer(await response.read(), "<i2")
+        assert response.headers["X-Sample-Rate"] == "8000"
+        assert pcm.size == len("First sentence is here.") + len("Second one follows!")
+        assert pcm[0] == 16383
+
+        wav = io.BytesIO()
+        sf.write(wav, np.zeros(8000, np.float32), 8000, format="WAV")
+        response = await client.post("/transcribe", data=wav.getvalue())
+        assert await response.json() == {"text": "16000 samples"}   # Resampled to 16 kHz
+
+        async with client.ws_connect("/ws?session=porch") as ws:
+            await ws.send_json({"op": "chat", "text": "there"})
+            frames = [await ws.receive_json() for _ in range(5)]
+            assert frames[-1] == {"done": True, "text": "Reply 1 to: there"}
+            await ws.send_json({"op": "speak", "text": "Just one sentence, spoken aloud."})
+            header = await ws.receive_json()
+            audio = await ws.receive_bytes()
+            assert header["sample_rate"] == 8000 and len(audio) == 2 * header["audio"]
+            assert await ws.receive_json() == {"done": True}
+
+        # Voices are per session
+        response = await client.post("/session", json={"session": "porch", "speaker": "Ana Florence"})
+        assert (await response.json())["speaker"] == "Ana Florence"
+        response = await client.post("/speak", json={"text": "Porch voice here.", "session": "porch"})
+        assert response.headers["X-Sample-Rate"] == "16000"
+        response = await client.post("/speak", json={"text": "Kitchen voice here.", "session": "kitchen"})
+        assert response.headers["X-Sample-Rate"] == "8000"
+
+        assert (await client.post("/chat", json={"text": ""})).status == 400
+        assert (await client.post("/chat", json={"text": "x", "session": "../etc"})).status == 400
+        assert (await client.post("/session", json={"model": "missing.gguf"})).status == 400
+
+    serve(server, check)
+
+
+def test_sessions_on_different_models_take_turns_by_model(tmp_path, monkeypatch):
+    import model_selector
+    monkeypatch.setattr(model_selector, "MODEL_DIR", tmp_path)
+    for name in ("a.gguf", "b.gguf"):
+        (tmp_path / name).write_bytes(b"GGUF")
+    release = threading.Event()
+    asked = []
+
+    def reply(text, conversation, model_path=None):
+        asked.append(os.path.basename(model_path))
+        if text == "first":
+            release.wait(5)
+        yield "ok"
+
+    server = make_server(tmp_path, reply_stream=reply)
+
+    async def check(client):
+        for session, model in (("porch", "a.gguf"), ("kitchen", "b.gguf"), ("garage", "a.gguf")):
+            response = await client.post("/session", json={"session": session, "model": model})
+            assert response.status == 200 and (await response.json())["model"] == model
+
+        first = asyncio.ensure_future(client.post("/chat", json={"text": "first", "session": "porch"}))
+        while not asked:
+            await asyncio.sleep(0.01)
+        swap = asyncio.ensure_future(client.post("/chat", json={"text": "hi", "session": "kitchen"}))
+        while not server.swap.stats()["waiting"]:
+            await asyncio.sleep(0.01)
+        same = asyncio.ensure_future(client.post("/chat", json={"text": "hi", "session": "garage"}))
+        while server.swap.refs < 2:
+            await asyncio.sleep(0.01)
+        release.set()
+        for request in (first, swap, same):
+            response = await request
+            assert response.status == 200
+            assert json.loads((await response.text()).splitlines()[-1])["text"] == "ok"
+
+        # The reply on the served model went ahead of the swap: one reload, not two
+        assert asked == ["a.gguf", "a.gguf", "b.gguf"]
+        status = await (await client.get("/status")).json()
+        assert status["llm"]["swaps"] == 1 and status["llm"]["model"] == "b.gguf"
+        # A session without a choice of its own follows the worker
+        await (await client.post("/chat", json={"text": "hi", "session": "hall"})).text()
+        assert asked[-1] == "b.gguf"
+        assert (await client.post("/chat", json={"text": "hi", "session": 5})).status == 400
+
+    serve(server, check)
+
+
+def test_full_pool_refuses_with_503_and_other_engines_keep_serving(tmp_path):
+    release = threading.Event()
+
+    def slow_reply(text, conversation, model_path=None):
+        release.wait(5)
+        yield "done"
+
+    server = make_server(tmp_path, reply_stream=slow_reply, queue_limit=1)
+
+    async def check(client):
+        running = asyncio.ensure_future(client.post("/chat", json={"text": "a", "session": "one"}))
+        waiting = asyncio.ensure_future(client.post("/chat", json={"text": "b", "session": "two"}))
+        while server.pools["llm"].waiting < 1:
+            await asyncio.sleep(0.01)
+
+        refused = await client.post("/chat", json={"text": "c", "session": "three"})
+        assert refused.status == 503 and refused.headers["Retry-After"] == "1"
+        # The LLM is saturated, but speech is served by its own pool
+        spoken = await client.post("/speak", json={"text": "Still talking over here."})
+        assert spoken.status == 200 and len(await spoken.read()) > 0
+        # A session with a tight latency budget gives up on the queue instead of waiting
+        await client.post("/session", json={"session": "hurry", "latency_budget": 0.05})
+        server.pools["llm"].queue_limit = 2
+        refused = await client.post("/chat", json={"text": "d", "session": "hurry"})
+        assert refused.status == 503 and "not free within" in (await refused.json())["error"]
+
+        release.set()
+        for request in (running, waiting):
+            response = await request
+            assert json.loads((await response.text()).splitlines()[-1])["text"] == "done"
+        status = await (await client.get("/status")).json()
+        assert status["pools"]["llm"]["rejected"] == 2 and status["sessions"] == 5
+
+    serve(server, check)
+
+
+def test_admitted_speech_is_never_refused_halfway(tmp_path):
+    def slow_synthesizer(session):
+        def synthesize(sentence):
+            threading.Event().wait(0.02)
+            return np.full(len(sentence), 0.5, np.float32)
+        return synthesize, 8000
+
+    server = make_server(tmp_path, synthesizer=slow_synthesizer, queue_limit=1)
+    text = "First sentence is here. Second one follows! Third comes last."
+    expected = sum(len(sentence) for sentence in split_sentences(text)) * 2   # 16-bit samples
+
+    async def check(client):
+        async def speak(delay):
+            await asyncio.sleep(delay)
+            response = await client.post("/speak", json={"text": text})
+            return response.status, len(await response.read())
+
+        results = await asyncio.gather(*(speak(i * 0.015) for i in range(5)))
+        assert any(status == 503 for status, _ in results)   # Refused up front only
+        for status, size in results:
+            assert (status, size) in ((200, expected), (503, size))
+
+    serve(server, check)
+
+
+def test_stream_applies_backpressure_and_closes_on_early_exit():
+    produced, closed = [], threading.Event()
+
+    def numbers():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                yield i
+        finally:
+            closed.set()
+
+    async def run():
+        pool = WorkerPool("test", queue_limit=0)
+        async with pool.slot():
+            with pytest.raises(PoolBusy):
+                async with pool.slot():
+                    pass
+            admitted = asyncio.ensure_future(pool.slot(timeout=0.01, admitted=True).__aenter__())
+            await asyncio.sleep(0.05)
+            assert not admitted.done()                 # Waits past the timeout and the full queue
+            admitted.cancel()
+            seen = []
+            stream = pool.stream(numbers(), queue_size=4)
+            async for i in stream:
+                seen.append(i)
+                if i == 2:
+                    await asyncio.sleep(0.1)
+                    assert len(produced) <= 8          # Producer waits on the full queue
+                    break
+            await stream.aclose()
+        assert await asyncio.to_thread(closed.wait, 1.0)
+        pool.shutdown()
+        return seen
+
+    assert asyncio.run(run()) == [0, 1, 2]
+
+
+def test_model_swap_gives_up_within_the_budget_and_is_not_starved():
+    async def run():
+        swap = ModelSwap("test", queue_limit=2, batch=1)
+        async with swap.borrow("/m/a.gguf"):
+            with pytest.raises(PoolBusy, match="did not swap"):
+                async with swap.borrow("/m/b.gguf", timeout=0.01):
+                    pass
+            assert swap.stats()["waiting"] == 0 and swap.refs == 1   # The timed-out waiter left no trace
+
+            waiting = asyncio.ensure_future(swap.borrow("/m/b.gguf").__aenter__())
+            await asyncio.sleep(0.01)
+            async with swap.borrow("/m/a.gguf"):   # One reply on the served model may go ahead...
+                ahead = asyncio.ensure_future(swap.borrow("/m/a.gguf").__aenter__())
+                await asyncio.sleep(0.01)
+                assert not ahead.done()            # ...but no more than the batch
+                with pytest.raises(PoolBusy, match="waiting to swap"):   # The swap queue is bounded too
+                    async with swap.borrow("/m/c.gguf"):
+                        pass
+        await waiting
+        assert swap.stats() == {"model": "b.gguf", "borrowers": 1, "waiting": 1, "swaps": 1, "rejected": 2}
+        ahead.cancel()
+        await asyncio.gather(ahead, return_exceptions=True)
+        assert swap.stats()["waiting"] == 0
+
+    asyncio.run(run())
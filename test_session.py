@@ -0,0 +1,70 @@
+# test_session.py — Cheap per-user sessions over the shared models
+
+import time
+
+import pytest
+
+import model_selector
+import state
+from session import Session, SessionTable
+
+
+def test_sessions_are_cheap_and_independent(tmp_path):
+    start = time.perf_counter()
+    sessions = [Session(f"s{i}") for i in range(1000)]
+    assert (time.perf_counter() - start) / len(sessions) < 0.001
+    assert not hasattr(sessions[0], "__dict__")
+    assert sessions[0]._conversation is None            # No I/O until memory is used
+
+    sessions[0].speaker = "Ana Florence"
+    assert sessions[1].speaker == state.get_current_speaker() == "Damien Black"
+    assert sessions[0].voice_id() == "speaker:Ana Florence"
+
+    ref_wav = tmp_path / "me.wav"
+    ref_wav.write_bytes(b"RIFF")
+    sessions[1].use_clone, sessions[1].ref_wav = True, str(ref_wav)
+    assert sessions[1].voice_id().startswith("clone:") and not state.get_use_xtts()
+
+
+def test_state_accessors_drive_the_default_session():
+    default = state.get_session()
+    saved = default.speaker
+    try:
+        state.set_current_speaker("Claribel Dervla")
+        assert default.speaker == "Claribel Dervla" == state.get_current_speaker()
+    finally:
+        state.set_current_speaker(saved)
+
+
+def test_model_choice_is_per_session(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_selector, "MODEL_DIR", tmp_path)
+    monkeypatch.setattr(model_selector, "SELECTION_FILE", tmp_path / ".selected_model")
+    for name in ("a.gguf", "b.gguf"):
+        (tmp_path / name).write_bytes(b"GGUF")
+    (tmp_path / ".selected_model").write_text(str(tmp_path / "a.gguf"))
+
+    session = Session("porch")
+    monkeypatch.setattr("builtins.input", lambda prompt: "2")
+    model_selector.choose_model(session)
+    assert session.selected_model() == str((tmp_path / "b.gguf").resolve())
+    assert model_selector.get_selected_model() == str(tmp_path / "a.gguf")   # Shared choice untouched
+    assert Session("kitchen").selected_model() == str(tmp_path / "a.gguf")
+
+
+def test_table_drops_idle_and_least_recently_used_sessions(tmp_path):
+    now = [0.0]
+    table = SessionTable(tmp_path, max_sessions=2, idle_seconds=60, clock=lambda: now[0])
+    kitchen = table.get("kitchen")
+    kitchen.conversation.add_exchange("hi", "hello")
+    table.get("porch")
+    table.get("garage")
+    assert len(table) == 2 and table.get("kitchen") is not kitchen
+    assert len(table.get("kitchen").conversation.turns) == 2   # Memory reloads from its log
+
+    now[0] = 120
+    table.get("attic")
+    assert len(table) == 1
+    with pytest.raises(ValueError):
+        table.get("../etc")
+    with pytest.raises(ValueError):
+        table.get(5)
@@ -0,0 +1,123 @@
+# test_streaming_asr.py — Streaming transcription fed from prerecorded arrays through a fake input stream
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from streaming_asr import StreamingTranscriber
+
+SR = 16000
+WORD_SECONDS = 0.5
+
+
+class FakeWhisper:
+    """Decodes each run of tone at RMS level k/100 (at least 0.25s long) as the word 'wK'."""
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, beam_size=5, **kwargs):
+        self.calls.append((audio.size, beam_size))
+        frame = 160
+        n = audio.size // frame
+        rms = np.sqrt(np.mean(np.square(audio[:n * frame].reshape(n, frame)), axis=1))
+        levels = np.round(rms * 100).astype(int)
+        words = []
+        start = 0
+        for i in range(1, n + 1):
+            if i == n or levels[i] != levels[start]:
+                if levels[start] > 0 and (i - start) * frame >= SR // 4:
+                    words.append(SimpleNamespace(start=start * frame / SR, end=i * frame / SR,
+                                                 word=f" w{levels[start]}"))
+                start = i
+        return [SimpleNamespace(words=words)], None
+
+
+class FakeInputStream:
+    """Plays a prerecorded array through the sounddevice callback interface, then silence."""
+
+    def __init__(self, audio, callback, block=320):
+        self.audio = audio.astype(np.float32)
+        self.callback = callback
+        self.block = block
+        self.closed = False
+        self._running = False
+
+    def _play(self):
+        pos = 0
+        while self._running:
+            chunk = self.audio[pos:pos + self.block]
+            if chunk.size < self.block:
+                chunk = np.concatenate([chunk, np.zeros(self.block - chunk.size, np.float32)])
+            self.callback(chunk.reshape(-1, 1), self.block, None, None)
+            pos += self.block
+            time.sleep(0.0005)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._play, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._thread.join()
+
+    def close(self):
+        self.closed = True
+
+
+def utterance(levels):
+    """One 0.5s 1 kHz tone per word, with RMS level/100."""
+    t = np.arange(int(WORD_SECONDS * SR)) / SR
+    tone = np.sqrt(2) * np.sin(2 * np.pi * 1000 * t)
+    return np.concatenate([(tone * level / 100).astype(np.float32) for level in levels])
+
+
+def test_feeding_chunks_commits_agreed_words_and_finalizes():
+    model = FakeWhisper()
+    decoded = threading.Event()
+    asr = StreamingTranscriber(model, step_seconds=0.1, on_update=lambda committed, partial: decoded.set())
+    audio = utterance([1, 2, 3, 4, 5, 6])
+    for i in range(0, audio.size, 1600):
+        decoded.clear()
+        asr.feed(audio[i:i + 1600])   # One step of audio: the decoder runs once
+        assert decoded.wait(5)
+    assert asr.committed.startswith("w1 w2")
+    assert asr.finalize() == "w1 w2 w3 w4 w5 w6"
+    # The final full-beam pass only sees the uncommitted tail
+    final_size, final_beam = model.calls[-1]
+    assert final_beam == 5 and final_size < audio.size
+
+
+def test_record_audio_streams_voiced_chunks_to_transcriber():
+    pytest.importorskip("soundfile")
+    from recorder import record_audio
+
+    asr = StreamingTranscriber(FakeWhisper())
+    speech = utterance([7, 8, 9])
+    streams = []
+
+    def factory(callback):
+        streams.append(FakeInputStream(np.concatenate([np.zeros(SR // 2, np.float32), speech]), callback))
+        return streams[0]
+
+    audio = record_audio(on_chunk=asr.feed, stream_factory=factory)
+
+    assert streams[0].closed
+    assert audio.dtype == np.float32 and audio.ndim == 1
+    assert asr.finalize() == "w7 w8 w9"
+
+
+def test_close_stops_the_decoder_when_recording_fails():
+    model = FakeWhisper()
+    before = threading.active_count()
+    asr = StreamingTranscriber(model)
+    assert threading.active_count() == before + 1
+    asr.feed(utterance([3]))
+    asr.close()
+    asr.close()
+    assert threading.active_count() == before
@@ -0,0 +1,69 @@
+# test_tracing.py — Span buffer, per-turn summary and Chrome trace export
+
+import json
+import threading
+
+from tracing import Tracer
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def record_turn(tracer, clock):
+    tracer.begin_turn()
+    start = clock.now
+    clock.now += 3.0
+    tracer.mark("vad_endpoint")
+    tracer.add_span("record", start)
+    with tracer.span("asr", seconds=3.0):
+        clock.now += 0.4
+    clock.now += 0.3
+    tracer.mark("llm_first_token")
+    with tracer.span("tts"):
+        clock.now += 0.5
+    tracer.mark("tts_first_chunk")
+    tracer.mark("playback_start")
+    clock.now += 2.0
+    tracer.mark("llm_last_token")
+    clock.now += 1.0
+    tracer.mark("playback_end", cancelled=False)
+
+
+def test_summary_places_each_stage_relative_to_the_turn():
+    clock = Clock()
+    tracer = Tracer(clock=clock)
+    record_turn(tracer, clock)
+    line = tracer.summary()
+    assert line.startswith("turn 1: record 3.00s | endpoint @3.00s | asr 0.40s")
+    assert "llm first token @3.70s" in line and "last @6.20s" in line
+    assert "tts first chunk @4.20s (0.50s synth)" in line
+    assert "playback @4.20s–7.20s" in line
+    assert "response latency 1.20s" in line
+
+
+def test_chrome_export_and_bounded_buffer(tmp_path):
+    clock = Clock()
+    tracer = Tracer(capacity=50, clock=clock)
+    record_turn(tracer, clock)
+    worker = threading.Thread(target=tracer.mark, args=("tts_first_chunk",), name="tts-worker")
+    worker.start()
+    worker.join()
+
+    trace = json.loads(tracer.export_chrome(tmp_path / "trace.json").read_text())
+    events = trace["traceEvents"]
+    asr = next(e for e in events if e["name"] == "asr")
+    assert asr["ph"] == "X" and asr["dur"] == 400000.0 and asr["args"] == {"seconds": 3.0, "turn": 1}
+    names = {e["args"]["name"] for e in events if e["ph"] == "M"}
+    assert names == {threading.current_thread().name, "tts-worker"}
+
+    for _ in range(100):
+        tracer.begin_turn()
+        tracer.mark("vad_endpoint")
+    assert len(tracer.events()) == 50
+    assert tracer.events(1) == []            # Oldest turns dropped first
+    assert tracer.summary(1) == "turn 1: no events"
@@ -0,0 +1,115 @@
+# test_tts_pipeline.py — Sentence pipeline tests with a fake synthesizer and output stream
+
+import threading
+import time
+
+import pytest
+
+from tts_pipeline import PipelinedSpeaker, SentenceChunker, split_sentences
+
+
+class FakeOutput:
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.written = []
+        self.events = []
+
+    def start(self):
+        self.events.append("start")
+
+    def write(self, audio):
+        self.written.append(list(audio))
+
+    def stop(self):
+        self.events.append("stop")
+
+    def close(self):
+        self.events.append("close")
+
+
+def test_split_sentences_merges_short_fragments():
+    text = "Yes. Compost needs air and water. Turn the pile every week! Done"
+    assert split_sentences(text) == [
+        "Yes. Compost needs air and water.",
+        "Turn the pile every week!",
+        "Done",
+    ]
+
+
+def test_chunker_emits_sentences_as_text_streams_in():
+    chunker = SentenceChunker()
+    assert chunker.feed("Plant garlic in the") == []
+    assert chunker.feed(" fall before frost. Mulch") == ["Plant garlic in the fall before frost."]
+    assert chunker.flush() == "Mulch"
+
+
+def test_speaker_plays_all_sentences_in_order_on_one_stream():
+    outputs = []
+
+    def factory(sample_rate):
+        outputs.append(FakeOutput(sample_rate))
+        return outputs[-1]
+
+    synthesized = []
+
+    def synthesize(sentence):
+        synthesized.append(sentence)
+        return [float(len(synthesized))] * 10
+
+    speaker = PipelinedSpeaker(synthesize, 10, output_factory=factory)
+    stats = speaker.speak(["Plant garlic in the fall before frost. ", "Mulch it well with straw."])
+
+    assert len(outputs) == 1
+    assert outputs[0].events == ["start", "stop", "close"]
+    assert [chunk[0] for chunk in outputs[0].written] == [1.0, 2.0]
+    assert stats["sentences"] == 2
+    assert stats["audio_seconds"] == 2.0
+    assert stats["time_to_first_audio"] is not None
+
+
+def test_next_sentence_is_synthesized_while_previous_plays():
+    played_first = threading.Event()
+    overlap = []
+
+    class SlowOutput(FakeOutput):
+        def write(self, audio):
+            super().write(audio)
+            if audio[0] == 1.0:
+                time.sleep(0.2)   # Sentence 1 "plays" for a while
+                played_first.set()
+
+    count = []
+
+    def synthesize(sentence):
+        count.append(sentence)
+        if len(count) == 2:
+            overlap.append(not played_first.is_set())
+        return [float(len(count))] * 4
+
+    PipelinedSpeaker(synthesize, 4, output_factory=SlowOutput).speak(
+        "The first sentence is here. The second sentence follows."
+    )
+    assert overlap == [True]
+
+
+def test_playback_error_stops_the_stream_mid_sentence():
+    closed = threading.Event()
+
+    def llm_stream():
+        try:
+            yield "The first sentence is here. "
+            while True:   # A long sentence still being generated
+                time.sleep(0.01)
+                yield "word "
+        finally:
+            closed.set()
+
+    class BrokenOutput(FakeOutput):
+        def write(self, audio):
+            raise OSError("device unplugged")
+
+    started = time.monotonic()
+    with pytest.raises(OSError):
+        PipelinedSpeaker(lambda s: [0.0] * 4, 4, output_factory=BrokenOutput).speak(llm_stream())
+    assert time.monotonic() - started < 1.0
+    assert closed.wait(1.0)
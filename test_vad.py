@@ -0,0 +1,86 @@
+# test_vad.py — VAD checks on synthetic speech-like bursts and off-grid background noise
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from vad import VoiceActivityDetector
+
+SR = 16000
+rng = np.random.default_rng(0)
+
+
+def voice(seconds, level=0.1):
+    """Harmonic, syllable-modulated signal with most power in the speech band."""
+    t = np.arange(int(seconds * SR)) / SR
+    tone = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate([450, 900, 1350, 1800], 1))
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    return (level * tone * envelope).astype(np.float32)
+
+
+def generator_hum(seconds, level=0.05):
+    t = np.arange(int(seconds * SR)) / SR
+    return (level * (np.sin(2 * np.pi * 60 * t) + 0.5 * np.sin(2 * np.pi * 120 * t))).astype(np.float32)
+
+
+def hiss(seconds, level=0.02):
+    return (level * rng.standard_normal(int(seconds * SR))).astype(np.float32)
+
+
+def run(audio, chunk=0.1):
+    vad = VoiceActivityDetector(SR)
+    step = int(chunk * SR)
+    for start in range(0, audio.size, step):
+        vad.process(audio[start:start + step])
+        if vad.endpoint:
+            return vad, min(start + step, audio.size) / SR
+    return vad, None
+
+
+def test_endpoint_fires_well_under_old_two_second_wait():
+    audio = np.concatenate([hiss(0.5, 0.002), voice(1.5), hiss(2.0, 0.002)])
+    vad, endpoint = run(audio)
+    assert vad.speech_started
+    assert vad.onset_sample / SR == pytest.approx(0.5, abs=0.1)
+    assert 2.0 < endpoint < 2.0 + 0.8
+
+
+def test_generator_hum_and_fan_hiss_do_not_trigger_speech():
+    noise = generator_hum(3.0) + hiss(3.0)
+    vad, endpoint = run(noise)
+    assert not vad.speech_started and endpoint is None
+
+
+def test_speech_over_background_noise_is_detected():
+    background = generator_hum(3.5) + hiss(3.5, 0.005)
+    speech = np.concatenate([np.zeros(int(0.5 * SR), np.float32), voice(1.5), np.zeros(int(1.5 * SR), np.float32)])
+    vad, endpoint = run(background + speech)
+    assert vad.speech_started and endpoint is not None and endpoint > 2.0
+
+
+def test_short_pause_inside_an_utterance_is_not_a_cut():
+    gap = hiss(0.3, 0.002)
+    audio = np.concatenate([hiss(0.3, 0.002), voice(0.8), gap, voice(0.8), hiss(2.0, 0.002)])
+    vad, endpoint = run(audio)
+    assert endpoint > 0.3 + 0.8 + 0.3 + 0.8
+
+
+def test_capture_starting_mid_speech_still_hears_it():
+    audio = np.concatenate([voice(1.5), hiss(2.0, 0.002)])
+    vad, endpoint = run(audio)
+    assert vad.speech_started and vad.onset_sample / SR < 0.5
+    assert 1.5 < endpoint < 1.5 + 0.8
+
+
+def test_evaluation_harness_reports_latency_and_false_cuts():
+    from vad_eval import evaluate_clip, summarize
+
+    clip = np.concatenate([hiss(0.3, 0.002), voice(1.0), hiss(1.5, 0.002)])
+    good = evaluate_clip(clip, SR, speech_end=1.3)
+    early = evaluate_clip(clip, SR, speech_end=3.0)   # Label says the speaker kept going
+    assert not good["false_cut"] and 0 < good["latency"] < 0.8
+    assert early["false_cut"]
+
+    summary = summarize([good, early])
+    assert summary["false_cut_rate"] == 0.5
+    assert summary["latency_mean"] == pytest.approx(good["latency"])
@@ -0,0 +1,66 @@
+# test_voice_cache.py — Speaker latents are computed once per reference WAV, then served from memory or disk
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import voice_cache
+
+
+class FakeXtts:
+    """Stands in for the XTTS module: counts encoder runs."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_conditioning_latents(self, audio_path):
+        self.calls += 1
+        return np.full((1, 4), float(self.calls), np.float32), np.full((1, 2), float(self.calls), np.float32)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(voice_cache, "CACHE_DIR", tmp_path / "voices")
+    monkeypatch.setattr(voice_cache, "_latents", {})
+    monkeypatch.setattr(voice_cache, "_tensors", {})
+    monkeypatch.setattr(voice_cache, "_file_hashes", {})
+    return tmp_path / "voices"
+
+
+def test_latents_are_computed_once_then_reused(cache, tmp_path):
+    ref = tmp_path / "mike.wav"
+    ref.write_bytes(b"RIFF first take")
+    xtts = FakeXtts()
+
+    gpt_cond_latent, speaker_embedding = voice_cache.load_latents(xtts, str(ref))
+    assert xtts.calls == 1
+    assert gpt_cond_latent[0, 0] == 1.0
+    key = voice_cache.file_hash(str(ref))
+    assert (cache / f"{key}.npz").exists()
+
+    voice_cache.load_latents(xtts, str(ref))   # From memory
+    assert xtts.calls == 1
+
+    voice_cache.clear_memory_cache()
+    gpt_cond_latent, speaker_embedding = voice_cache.load_latents(xtts, str(ref))   # From disk
+    assert xtts.calls == 1
+    assert gpt_cond_latent[0, 0] == 1.0 and speaker_embedding.shape == (1, 2)
+
+    ref.write_bytes(b"RIFF second, longer take")   # A new recording gets new latents
+    assert voice_cache.file_hash(str(ref)) != key
+    gpt_cond_latent, _ = voice_cache.load_latents(xtts, str(ref))
+    assert xtts.calls == 2
+    assert gpt_cond_latent[0, 0] == 2.0
+
+
+def test_xtts_gets_the_cached_latents_as_tensors(cache, tmp_path):
+    torch = pytest.importorskip("torch")
+    ref = tmp_path / "mike.wav"
+    ref.write_bytes(b"RIFF take")
+    xtts = FakeXtts()
+
+    gpt_cond_latent, speaker_embedding = voice_cache.get_voice_latents(xtts, str(ref))
+    assert torch.is_tensor(gpt_cond_latent) and gpt_cond_latent.device.type == "cpu"
+    assert speaker_embedding.shape == (1, 2)
+    again, _ = voice_cache.get_voice_latents(xtts, str(ref))
+    assert again is gpt_cond_latent and xtts.calls == 1   # Converted once, then reused
@@ -0,0 +1,87 @@
+# test_vram_gate.py — Admission gate against a simulated GPU allocator
+
+import threading
+import time
+
+from vram_gate import VRAMGate
+
+
+class SimulatedAllocator:
+    def __init__(self, total_mb):
+        self.total_mb = total_mb
+        self.allocated = {}
+
+    def free_mb(self):
+        return self.total_mb - sum(self.allocated.values())
+
+    def alloc(self, name, mb):
+        assert mb <= self.free_mb(), "allocator overcommitted"
+        self.allocated[name] = mb
+
+    def free(self, name):
+        self.allocated.pop(name, None)
+
+
+def test_grant_is_immediate_when_memory_fits():
+    gpu = SimulatedAllocator(8000)
+    gate = VRAMGate(probe_free_mb=gpu.free_mb, poll_interval=10)
+    with gate.reserve(3000, timeout=1, name="llm") as reservation:
+        assert gate.available_mb() == 5000   # Reserved but not yet allocated
+        gpu.alloc("llm", reservation.mb)
+    assert gate.available_mb() == 5000       # Settled: the probe sees it now
+    assert gate.waits == 0
+
+
+def test_waiter_is_woken_by_release_not_polling():
+    gpu = SimulatedAllocator(8000)
+    gpu.alloc("xtts", 6000)
+    gate = VRAMGate(probe_free_mb=gpu.free_mb, poll_interval=10)   # Polling alone would take 10s
+
+    def other_stage_finishes():
+        time.sleep(0.1)
+        gpu.free("xtts")
+        gate.release()
+
+    threading.Thread(target=other_stage_finishes).start()
+    start = time.monotonic()
+    reservation = gate.reserve(4000, timeout=5)
+    waited = time.monotonic() - start
+    assert reservation is not None
+    assert 0.05 < waited < 1.0
+    assert gate.waits == 1
+
+
+def test_deadline_returns_none_for_cpu_plan():
+    gpu = SimulatedAllocator(4000)
+    gpu.alloc("whisper", 3000)
+    gate = VRAMGate(probe_free_mb=gpu.free_mb, poll_interval=0.02)
+    start = time.monotonic()
+    assert gate.reserve(2000, timeout=0.15) is None
+    assert 0.1 < time.monotonic() - start < 1.0
+    assert gate.timeouts == 1
+
+
+def test_pending_reservations_prevent_overcommit():
+    gpu = SimulatedAllocator(5000)
+    gate = VRAMGate(probe_free_mb=gpu.free_mb, poll_interval=0.02)
+    first = gate.reserve(3000, timeout=0.1)
+    assert first is not None
+    # The first stage has not allocated yet; a second 3000 MB must not be admitted
+    assert gate.reserve(3000, timeout=0.1) is None
+    assert gate.grow(first, 6000) == 5000   # Capped at what is actually free
+    first.release()
+    assert gate.reserve(3000, timeout=0.1) is not None
+
+
+def test_capacity_mode_holds_until_release():
+    gate = VRAMGate(capacity_mb=4000, poll_interval=0.02)
+    a = gate.reserve(3000, timeout=0.1)
+    a.settle()
+    assert gate.available_mb() == 1000   # No probe: settled reservations still count
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(gate.reserve(2000, timeout=2)))
+    waiter.start()
+    time.sleep(0.05)
+    a.release()
+    waiter.join()
+    assert results[0] is not None
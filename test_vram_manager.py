@@ -0,0 +1,112 @@
+# test_vram_manager.py — Residency decisions against a simulated 8GB device on CPU-only machines
+
+import threading
+import time
+
+from vram_manager import DEFAULT_BUDGET_MB, FOOTPRINTS_MB, ResidencyManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1.0
+        return self.now
+
+
+def make_manager(budget_mb=7500):
+    moves = []
+    manager = ResidencyManager(budget_mb, clock=FakeClock())
+    for name, size, priority in [("whisper", 1600, 1), ("xtts", 2300, 2), ("llm", 3800, 2)]:
+        manager.register(
+            name, size,
+            to_gpu=lambda name=name: moves.append(("gpu", name)),
+            to_cpu=lambda name=name: moves.append(("cpu", name)),
+            priority=priority,
+        )
+    return manager, moves
+
+
+def test_models_load_until_budget_then_lowest_priority_is_evicted():
+    manager, moves = make_manager()
+    assert manager.acquire("whisper") == "cuda"
+    assert manager.acquire("xtts") == "cuda"
+    assert manager.acquire("llm") == "cuda"   # 1600 + 2300 + 3800 > 7500
+    assert ("cpu", "whisper") in moves
+    assert manager.resident() == ["llm", "xtts"]
+    assert manager.used_mb <= manager.budget_mb
+
+
+def test_repeated_acquire_is_a_hit_without_moves():
+    manager, moves = make_manager()
+    manager.acquire("xtts")
+    manager.acquire("xtts")
+    assert moves == [("gpu", "xtts")]
+    assert manager.metrics()["hits"] == 1
+
+
+def test_models_in_use_are_never_evicted():
+    manager, moves = make_manager(budget_mb=5000)
+    with manager.use("llm") as device:
+        assert device == "cuda"
+        assert manager.acquire("xtts") == "cpu"   # Would need to evict the running LLM
+    assert manager.acquire("xtts") == "cuda"
+    assert ("cpu", "llm") in moves
+    metrics = manager.metrics()
+    assert metrics["cpu_fallbacks"] == 1 and metrics["evictions"] == 1
+
+
+def test_probe_corrects_bookkeeping_after_external_load():
+    manager, moves = make_manager()
+    resident = {"xtts": True}
+    manager.register("xtts", 2300, lambda: moves.append(("gpu", "xtts")), lambda: None,
+                     priority=2, is_resident=lambda: resident["xtts"])
+    manager.acquire("whisper")
+    assert "xtts" in manager.resident()
+    assert ("gpu", "xtts") not in moves
+    assert [d["action"] for d in manager.decisions] == ["load"]
+
+
+def test_default_footprints_fit_so_turns_move_nothing():
+    assert sum(FOOTPRINTS_MB.values()) <= DEFAULT_BUDGET_MB
+    manager = ResidencyManager(DEFAULT_BUDGET_MB, clock=FakeClock())
+    for name, size in FOOTPRINTS_MB.items():
+        manager.register(name, size, lambda: None, lambda: None)
+    for turn in range(3):
+        for name in ("whisper", "llm", "xtts"):
+            with manager.use(name) as device:
+                assert device == "cuda"
+    assert manager.metrics()["evictions"] == 0 and manager.metrics()["loads"] == 3
+
+
+def test_cpu_fallback_makes_the_model_runnable_on_cpu():
+    manager, moves = make_manager(budget_mb=5000)
+    manager.register("whisper", 1600, lambda: moves.append(("gpu", "whisper")), lambda: None,
+                     run_on_cpu=lambda: moves.append(("run_on_cpu", "whisper")))
+    with manager.use("llm"):
+        with manager.use("whisper") as device:
+            assert device == "cpu"
+    assert moves == [("gpu", "llm"), ("run_on_cpu", "whisper")]
+
+
+def test_slow_load_does_not_block_a_resident_model():
+    manager, moves = make_manager()
+    manager.acquire("whisper")
+    uploading, finish = threading.Event(), threading.Event()
+
+    def slow_upload():
+        uploading.set()
+        finish.wait(5)
+
+    manager.register("xtts", 2300, slow_upload, lambda: None, priority=2)
+    loader = threading.Thread(target=manager.acquire, args=("xtts",))
+    loader.start()
+    assert uploading.wait(5)
+    started = time.monotonic()
+    with manager.use("whisper") as device:   # A hit while XTTS uploads
+        assert device == "cuda"
+    assert time.monotonic() - started < 0.5
+    finish.set()
+    loader.join(5)
+    assert manager.resident() == ["whisper", "xtts"]
@@ -1,21 +1,14 @@
-from TTS.api import TTS
-import os
+# test_xtts_mike.py — Speak a line in the cloned Mike Boudet voice through the resident daemon
+#
+# XTTS stays loaded in daemon.py, so this costs synthesis time only; the
+# daemon is started in the background when it is not running.
 
-# Make sure the output directory exists
-os.makedirs("output", exist_ok=True)
+from arc_client import speak
 
-# Load XTTS model (on CPU to avoid VRAM pressure)
-print("🔄 Loading XTTS model...")
-tts = TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2")
-tts.to("cpu")
+OUTPUT_WAV = "output/mike_test.wav"
 
-# Run synthesis using your reference clip
-print("🎙️ Synthesizing Mike Boudet voice...")
-tts.tts_to_file(
-    text="This is Mike Boudet, and you're listening to Sword and Scale. Episode 200 begins now.",
-    speaker_wav="samples/mike_boudet.wav",
-    language="en",
-    file_path="output/mike_test.wav"
-)
-
-print("✅ Done! File saved to output/mike_test.wav")
+if __name__ == "__main__":
+    print("🎙️ Synthesizing Mike Boudet voice...")
+    reply = speak("This is Mike Boudet, and you're listening to Sword and Scale. Episode 200 begins now.",
+                  OUTPUT_WAV, ref_wav="samples/mike_boudet.wav", session="mike")
+    print(f"✅ Done! {reply['seconds']:.1f}s saved to {reply['path']}")
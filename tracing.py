@@ -0,0 +1,140 @@
+# tracing.py — Per-turn latency spans in a bounded in-memory buffer, exportable as Chrome trace JSON
+#
+# Stages record spans (with a start and end) and marks (single instants) into
+# a deque. Appending a tuple is the only work on the hot path; nothing is
+# formatted or written until a summary or export is asked for. Every event
+# carries the number of the turn it belongs to, so one turn can be summarized
+# as a line or opened in chrome://tracing / Perfetto.
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+CAPACITY   = 20000   # Events kept; the oldest are dropped first
+TURNS_KEPT = 1000    # Turn start times kept for summaries
+
+SPAN, MARK = "X", "i"   # Chrome trace phases
+
+
+class Tracer:
+    def __init__(self, capacity=CAPACITY, clock=time.perf_counter):
+        self.clock = clock
+        self.epoch = clock()
+        self.turn = 0
+        self._turn_started = {}
+        self._events = deque(maxlen=capacity)   # (phase, turn, name, start, end, thread, args)
+
+    # --- Recording --------------------------------------------------------
+
+    def begin_turn(self):
+        """Start a new turn; later events belong to it. Returns the turn number."""
+        self.turn += 1
+        self._turn_started[self.turn] = self.clock()
+        self._turn_started.pop(self.turn - TURNS_KEPT, None)
+        return self.turn
+
+    def mark(self, name, **args):
+        now = self.clock()
+        self._events.append((MARK, self.turn, name, now, now, threading.current_thread().name, args))
+
+    def add_span(self, name, start, end=None, **args):
+        self._events.append((SPAN, self.turn, name, start, self.clock() if end is None else end,
+                             threading.current_thread().name, args))
+
+    @contextmanager
+    def span(self, name, **args):
+        """Record the duration of a block; `args` may be updated inside it."""
+        start = self.clock()
+        try:
+            yield args
+        finally:
+            self.add_span(name, start, **args)
+
+    # --- Reading ----------------------------------------------------------
+
+    def events(self, turn=None):
+        events = list(self._events)
+        return events if turn is None else [e for e in events if e[1] == turn]
+
+    def first(self, name, turn=None):
+        """Start time of the first event called `name` in a turn (None if absent)."""
+        turn = self.turn if turn is None else turn
+        return next((e[3] for e in self.events(turn) if e[2] == name), None)
+
+    def last(self, name, turn=None):
+        turn = self.turn if turn is None else turn
+        return next((e[4] for e in reversed(self.events(turn)) if e[2] == name), None)
+
+    def chrome_trace(self, turn=None):
+        """Events in the Chrome trace event format (timestamps in microseconds)."""
+        threads = {}
+        out = []
+        for phase, turn_no, name, start, end, thread, args in self.events(turn):
+            tid = threads.setdefault(thread, len(threads) + 1)
+            event = {"name": name, "ph": phase, "pid": 1, "tid": tid,
+                     "ts": round((start - self.epoch) * 1e6, 1), "args": dict(args, turn=turn_no)}
+            if phase == SPAN:
+                event["dur"] = round((end - start) * 1e6, 1)
+            else:
+                event["s"] = "t"
+            out.append(event)
+        out += [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": thread}}
+                for thread, tid in threads.items()]
+        return {"traceEvents": out, "displayTimeUnit": "ms"}
+
+    def export_chrome(self, path, turn=None):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(self.chrome_trace(turn)))
+        os.replace(tmp_path, path)
+        return path
+
+    def summary(self, turn=None):
+        """One line with where the turn's time went, relative to the turn start."""
+        turn = self.turn if turn is None else turn
+        events = self.events(turn)
+        if not events:
+            return f"turn {turn}: no events"
+        t0 = self._turn_started.get(turn, events[0][3])
+
+        def at(value):
+            return f"{value - t0:.2f}s"
+
+        def total(name):
+            return sum(e[4] - e[3] for e in events if e[2] == name and e[0] == SPAN)
+
+        parts = []
+        names = {e[2] for e in events}
+        if "record" in names:
+            parts.append(f"record {total('record'):.2f}s")
+        endpoint = self.first("vad_endpoint", turn)
+        if endpoint is not None:
+            parts.append(f"endpoint @{at(endpoint)}")
+        if "asr" in names:
+            parts.append(f"asr {total('asr'):.2f}s")
+        first_token, last_token = self.first("llm_first_token", turn), self.last("llm_last_token", turn)
+        if first_token is not None:
+            parts.append(f"llm first token @{at(first_token)}")
+        if last_token is not None:
+            parts.append(f"last @{at(last_token)}")
+        first_chunk = self.first("tts_first_chunk", turn)
+        if first_chunk is not None:
+            parts.append(f"tts first chunk @{at(first_chunk)} ({total('tts'):.2f}s synth)")
+        play_start, play_end = self.first("playback_start", turn), self.last("playback_end", turn)
+        if play_start is not None:
+            parts.append(f"playback @{at(play_start)}" + (f"–{at(play_end)}" if play_end else ""))
+        if endpoint is not None and play_start is not None:
+            parts.append(f"response latency {play_start - endpoint:.2f}s")
+        return f"turn {turn}: " + " | ".join(parts)
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
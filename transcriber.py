@@ -1,35 +1,57 @@
 # transcriber.py — Handles speech-to-text transcription using Whisper and dynamic GPU/CPU fallback
 
-from faster_whisper import WhisperModel
 from gpu_manager import auto_select_device, get_free_gpu_mem_mb
-import torch
+from model_registry import registry
+from streaming_asr import StreamingTranscriber
+from tracing import get_tracer
+import numpy as np
 import gc
+import sys
 
 MODEL_SIZE = "medium"
 AUDIO_PATH_DEFAULT = "input.wav"
 
-DEVICE = auto_select_device()
-print(f"[VRAM] Whisper init on {DEVICE} | Free: {get_free_gpu_mem_mb():.2f} MB")
+def load_whisper(device=None):
+    """Build the Whisper model on `device` ("cuda" or "cpu"; default: wherever it fits)."""
+    from faster_whisper import WhisperModel
 
-try:
-    compute_type = "float16" if DEVICE == "cuda" else "int8"
-    model = WhisperModel(MODEL_SIZE, device=DEVICE, compute_type=compute_type)
-except Exception as e:
-    print(f"[Transcriber] Falling back to CPU due to error: {e}")
-    model = WhisperModel(MODEL_SIZE, device="cpu", compute_type="int8")
+    device = device or auto_select_device()
+    print(f"[VRAM] Whisper init on {device} | Free: {get_free_gpu_mem_mb():.2f} MB")
+    try:
+        compute_type = "float16" if device == "cuda" else "int8"
+        return WhisperModel(MODEL_SIZE, device=device, compute_type=compute_type)
+    except Exception as e:
+        print(f"[Transcriber] Falling back to CPU due to error: {e}")
+        return WhisperModel(MODEL_SIZE, device="cpu", compute_type="int8")
+
+registry.register("whisper", load_whisper)
+
+def get_whisper_model():
+    """Return the shared Whisper model, loading it on first use."""
+    return registry.get("whisper")
 
 def clean_gpu_memory():
     gc.collect()
+    # Nothing to release until a model has pulled torch in
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return
     if torch.cuda.is_available():
         torch.cuda.empty_cache()
 
-def transcribe(audio_path=AUDIO_PATH_DEFAULT):
-    """Transcribe an audio file using WhisperModel."""
+def transcribe(audio=AUDIO_PATH_DEFAULT):
+    """Transcribe a WAV path, or a float32 numpy array of 16 kHz mono samples."""
     print("🎙️ Transcribing...")
     print(f"[VRAM] Before ASR: {get_free_gpu_mem_mb():.2f} MB free")
+    if isinstance(audio, np.ndarray):
+        # In-memory samples go straight to Whisper — no file write or decode
+        audio = audio.reshape(-1).astype(np.float32, copy=False)
+        if audio.size == 0:
+            return ""
     try:
-        segments, _ = model.transcribe(audio_path, beam_size=5)
-        transcription = " ".join(segment.text.strip() for segment in segments)
+        with get_tracer().span("asr"):
+            segments, _ = get_whisper_model().transcribe(audio, beam_size=5)
+            transcription = " ".join(segment.text.strip() for segment in segments)
         return transcription.strip()
     except Exception as e:
         print(f"❌ Whisper transcription failed: {e}")
@@ -38,3 +60,7 @@ def transcribe(audio_path=AUDIO_PATH_DEFAULT):
         clean_gpu_memory()
         print(f"[VRAM] After ASR: {get_free_gpu_mem_mb():.2f} MB free")
 
+def start_streaming(on_update=None):
+    """Begin a streaming transcription; feed() captured audio, then finalize()."""
+    print(f"[VRAM] Before streaming ASR: {get_free_gpu_mem_mb():.2f} MB free")
+    return StreamingTranscriber(get_whisper_model(), on_update=on_update)
@@ -1,56 +1,95 @@
-import sounddevice as sd
 import soundfile as sf
-import tempfile
+import numpy as np
 import os
-import torch
 import gc
-from state import get_current_speaker, get_xtts_model, get_use_xtts, get_xtts_ref_wav
+import sys
+from state import get_current_speaker, get_xtts_model, get_use_xtts, get_xtts_ref_wav, get_xtts_ref_latents, get_session
+from voice_cache import get_voice_latents, synthesize_with_latents
+from tts_pipeline import PipelinedSpeaker, open_output
+
+XTTS_SAMPLE_RATE = 24000
 
 def clean_gpu_memory_tts():
     gc.collect()
+    # Nothing to release until a model has pulled torch in
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return
     if torch.cuda.is_available():
         torch.cuda.empty_cache()
 
-def speak_xtts(text: str):
+def current_voice_id(session=None):
+    """Identifies the voice replies are spoken in (for caching synthesized audio)."""
+    return (session or get_session()).voice_id()
+
+def speak_xtts(text, keep_audio=False):
+    """Speak a string or an iterable of streamed text increments; returns playback stats."""
     model = get_xtts_model()
     use_clone = get_use_xtts()
     speaker = get_current_speaker()
     ref_wav = get_xtts_ref_wav()
 
     try:
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        model.to(device)
-
+        # Device placement is owned by vram_manager; the model is used where it is
         if use_clone and ref_wav and os.path.exists(ref_wav):
-            speak_xtts_clone(text, model, ref_wav)
-        else:
-            speak_xtts_multispeaker(text, speaker, model)
+            return speak_xtts_clone(text, model, ref_wav, latents=get_xtts_ref_latents(), keep_audio=keep_audio)
+        return speak_xtts_multispeaker(text, speaker, model, keep_audio=keep_audio)
     except Exception as e:
         print(f"❌ [TTS] Error during speech: {e}")
+        return None
     finally:
         clean_gpu_memory_tts()
 
-def speak_xtts_multispeaker(text: str, speaker_name: str, model):
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-        model.tts_to_file(
-            text=text,
-            speaker=speaker_name,
-            language="en",
-            file_path=f.name
-        )
-        play_audio(f.name)
-
-def speak_xtts_clone(text: str, model, ref_wav_path: str):
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-        model.tts_to_file(
-            text=text,
-            speaker_wav=ref_wav_path,
-            language="en",
-            file_path=f.name
-        )
-        play_audio(f.name)
+def _sample_rate(model):
+    try:
+        return model.synthesizer.output_sample_rate
+    except AttributeError:
+        return XTTS_SAMPLE_RATE
+
+def _multispeaker_synthesizer(model, speaker_name):
+    def synthesize(sentence):
+        wav = model.tts(text=sentence, speaker=speaker_name, language="en")
+        return np.asarray(wav, dtype=np.float32)
+    return synthesize
+
+def _clone_synthesizer(model, ref_wav_path, latents=None):
+    # Conditioning latents come from the voice cache, so the reference WAV is encoded once
+    if latents is None:
+        latents = get_voice_latents(model, ref_wav_path)
+
+    def synthesize(sentence):
+        return synthesize_with_latents(model, sentence, latents)
+    return synthesize
+
+def make_synthesizer(session=None):
+    """(synthesize(sentence) → float32 samples, sample rate) for a session's voice (default: the console's)."""
+    session = session or get_session()
+    model = get_xtts_model()
+    if session.cloning():
+        return _clone_synthesizer(model, session.ref_wav, session.ref_latents()), _sample_rate(model)
+    return _multispeaker_synthesizer(model, session.speaker), _sample_rate(model)
+
+def speak_xtts_multispeaker(text, speaker_name: str, model, keep_audio=False):
+    synthesize = _multispeaker_synthesizer(model, speaker_name)
+    return PipelinedSpeaker(synthesize, _sample_rate(model)).speak(text, keep_audio=keep_audio)
+
+def speak_xtts_clone(text, model, ref_wav_path: str, latents=None, keep_audio=False):
+    synthesize = _clone_synthesizer(model, ref_wav_path, latents)
+    return PipelinedSpeaker(synthesize, _sample_rate(model)).speak(text, keep_audio=keep_audio)
+
+def play_wav(path):
+    """Play a WAV file through one output stream (e.g. a cached reply)."""
+    audio, sr = sf.read(path, dtype="float32")
+    stream = open_output(sr)
+    stream.start()
+    try:
+        stream.write(audio)
+    finally:
+        stream.stop()
+        stream.close()
 
 def play_audio(path):
+    import sounddevice as sd
     audio, sr = sf.read(path, dtype="float32")
     print(f"🔊 Playing audio: {path}")
     print(f"   ├─ Sample rate: {sr}")
@@ -0,0 +1,167 @@
+# tts_pipeline.py — Sentence-pipelined speech: synthesize sentence N+1 while sentence N plays
+
+import queue
+import re
+import threading
+import time
+
+import numpy as np
+
+SENTENCE_BREAK = re.compile(r'(?<=[.!?;:])["\')\]]*\s+|\n+')
+MIN_SENTENCE_CHARS = 20   # Very short fragments are merged with the next sentence
+QUEUE_SIZE = 3            # Synthesized sentences waiting for playback
+
+_output_factory = None    # Process-wide replacement for the sounddevice output (benchmarks, headless)
+
+
+def set_output_factory(factory):
+    """Make `factory(sample_rate)` the default output stream for every speaker (None restores sounddevice)."""
+    global _output_factory
+    _output_factory = factory
+
+
+def open_output(sample_rate):
+    if _output_factory is not None:
+        return _output_factory(sample_rate)
+    return PipelinedSpeaker._sounddevice_output(sample_rate)
+
+
+def split_sentences(text: str):
+    """Split text into sentences, merging fragments shorter than MIN_SENTENCE_CHARS."""
+    chunker = SentenceChunker()
+    sentences = chunker.feed(text)
+    tail = chunker.flush()
+    return sentences + ([tail] if tail else [])
+
+
+class SentenceChunker:
+    """Collects streamed text and hands out complete sentences."""
+
+    def __init__(self, min_chars=MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str):
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_BREAK.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self):
+        tail, self._buffer = self._buffer.strip(), ""
+        return tail
+
+
+class PipelinedSpeaker:
+    """Synthesizes sentences on a worker thread and plays them back-to-back.
+
+    `synthesize(sentence)` returns mono float32 samples at `sample_rate`.
+    `output_factory(sample_rate)` returns an object with start/write/stop/close
+    (a sounddevice.OutputStream by default), so one stream is kept open for the
+    whole reply and chunks play without gaps.
+    """
+
+    def __init__(self, synthesize, sample_rate, output_factory=None, queue_size=QUEUE_SIZE):
+        self.synthesize = synthesize
+        self.sample_rate = sample_rate
+        self.output_factory = output_factory or open_output
+        self.queue_size = queue_size
+
+    @staticmethod
+    def _sounddevice_output(sample_rate):
+        import sounddevice as sd
+        return sd.OutputStream(samplerate=sample_rate, channels=1, dtype="float32")
+
+    def _produce(self, text, chunks, stop):
+        sentences = None
+        try:
+            if isinstance(text, str):
+                sentences = split_sentences(text)
+            else:
+                sentences = self._sentences_from_stream(text, stop)
+            for sentence in sentences:
+                if stop.is_set():
+                    break
+                chunks.put((sentence, self.synthesize(sentence)))
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            if hasattr(sentences, "close"):
+                sentences.close()   # Closes the source stream too
+            chunks.put(None)
+
+    @staticmethod
+    def _sentences_from_stream(pieces, stop=None):
+        """Sentences from streamed text; gives up at the next piece once `stop` is set.
+
+        The source is closed when the sentences end early, so an LLM stream
+        stops generating instead of running on to the end of the reply.
+        """
+        chunker = SentenceChunker()
+        pieces = iter(pieces)
+        try:
+            for piece in pieces:
+                if stop is not None and stop.is_set():
+                    return
+                yield from chunker.feed(piece)
+        finally:
+            if hasattr(pieces, "close"):
+                pieces.close()
+        tail = chunker.flush()
+        if tail:
+            yield tail
+
+    def speak(self, text, keep_audio=False):
+        """Speak a string, or an iterable of text increments such as an LLM stream.
+
+        Returns playback stats: time_to_first_audio, sentences and audio_seconds,
+        plus the whole reply's samples under "audio" when keep_audio is set.
+        """
+        start_time = time.time()
+        chunks = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(text, chunks, stop), daemon=True)
+        producer.start()
+
+        stats = {"time_to_first_audio": None, "sentences": 0, "audio_seconds": 0.0,
+                 "sample_rate": self.sample_rate}
+        kept = []
+        stream = None
+        try:
+            while True:
+                item = chunks.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                sentence, audio = item
+                if stream is None:
+                    stream = self.output_factory(self.sample_rate)
+                    stream.start()
+                    stats["time_to_first_audio"] = time.time() - start_time
+                    print(f"⏱️ [TTS] Time to first audio: {stats['time_to_first_audio']:.2f}s")
+                stream.write(audio)
+                if keep_audio:
+                    kept.append(audio)
+                stats["sentences"] += 1
+                stats["audio_seconds"] += len(audio) / self.sample_rate
+        finally:
+            stop.set()
+            # Unblock the producer if it is waiting on a full queue
+            while producer.is_alive():
+                try:
+                    chunks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            if stream is not None:
+                stream.stop()   # Returns once queued audio has played
+                stream.close()
+        if keep_audio:
+            stats["audio"] = np.concatenate(kept) if kept else np.zeros(0, dtype=np.float32)
+        return stats
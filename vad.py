@@ -0,0 +1,152 @@
+# vad.py — Adaptive voice-activity detector with noise-floor tracking and adaptive endpointing
+#
+# Each chunk is split into 20ms frames and three features are computed for all
+# frames at once with numpy:
+#   - speech-band (300–3400 Hz) energy relative to a tracked noise floor (SNR),
+#     so out-of-band generator hum and fan rumble do not mask quiet speech
+#   - share of spectral power in the speech band, which rejects hum-only frames
+#   - zero-crossing rate, which rejects broadband hiss
+# A small per-frame state machine adds onset confirmation, hangover and an
+# endpoint whose silence length adapts to the speaker's own pauses.
+
+import numpy as np
+
+SAMPLE_RATE       = 16000
+FRAME_SECONDS     = 0.02
+SPEECH_BAND       = (300.0, 3400.0)
+SNR_DB            = 9.0     # Speech-band energy above noise floor needed to count as voiced
+MIN_BAND_RATIO    = 0.45    # Fraction of power inside SPEECH_BAND
+MAX_ZCR           = 0.30    # Zero crossings per sample; hiss sits well above this
+MIN_RMS           = 0.002   # Absolute floor so a muted mic never triggers
+ONSET_SECONDS     = 0.06    # Voiced run needed to declare speech
+HANGOVER_SECONDS  = 0.2     # Unvoiced gap still treated as speech
+MIN_ENDPOINT      = 0.45    # Endpoint silence bounds (seconds)
+MAX_ENDPOINT      = 1.2
+NOISE_RISE        = 0.01    # Noise floor adaptation rates (per frame)
+NOISE_FALL        = 0.2
+CALIBRATION_SECONDS = 0.5   # The floor starts at the quietest frame of this opening stretch
+
+
+def frame_features(samples, sample_rate=SAMPLE_RATE, frame_seconds=FRAME_SECONDS):
+    """Return (energy, band_ratio, zcr) arrays, one value per full frame."""
+    samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+    frame_len = int(sample_rate * frame_seconds)
+    n = samples.size // frame_len
+    if n == 0:
+        empty = np.zeros(0, dtype=np.float32)
+        return empty, empty, empty
+    frames = samples[:n * frame_len].reshape(n, frame_len)
+
+    energy = np.mean(np.square(frames), axis=1)
+
+    spectrum = np.square(np.abs(np.fft.rfft(frames * np.hanning(frame_len), axis=1)))
+    freqs = np.fft.rfftfreq(frame_len, 1.0 / sample_rate)
+    band = (freqs >= SPEECH_BAND[0]) & (freqs <= SPEECH_BAND[1])
+    band_ratio = spectrum[:, band].sum(axis=1) / (spectrum.sum(axis=1) + 1e-12)
+
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+
+    return energy, band_ratio, zcr
+
+
+class VoiceActivityDetector:
+    """Streaming VAD; feed chunks with process() and watch the speech/endpoint flags."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_seconds=FRAME_SECONDS,
+                 min_endpoint=MIN_ENDPOINT, max_endpoint=MAX_ENDPOINT, onset_seconds=ONSET_SECONDS):
+        self.sample_rate = sample_rate
+        self.frame_seconds = frame_seconds
+        self.frame_len = int(sample_rate * frame_seconds)
+        self.onset_frames = max(1, round(onset_seconds / frame_seconds))
+        self.hangover_frames = round(HANGOVER_SECONDS / frame_seconds)
+        self.min_endpoint = min_endpoint
+        self.max_endpoint = max_endpoint
+        self.snr = 10 ** (SNR_DB / 10)
+        self.calibration_frames = round(CALIBRATION_SECONDS / frame_seconds)
+        self.reset()
+
+    def reset(self):
+        self.noise_floor = None
+        self.speech_started = False   # Onset confirmed at least once
+        self.in_speech = False        # Currently inside speech (incl. hangover)
+        self.endpoint = False         # Utterance finished
+        self.onset_sample = None      # Sample index of the confirmed onset
+        self.endpoint_sample = None
+        self.samples_seen = 0
+        self._calibrating = self.calibration_frames
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._pause_estimate = 0.0    # Smoothed length of the speaker's inner pauses (s)
+
+    @property
+    def endpoint_seconds(self):
+        """Silence needed to end the utterance, adapted to the speaker's pauses."""
+        return float(np.clip(self.min_endpoint + 1.5 * self._pause_estimate,
+                             self.min_endpoint, self.max_endpoint))
+
+    def process(self, chunk):
+        """Consume samples; returns per-frame voiced flags for the full frames processed."""
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        if self._remainder.size:
+            chunk = np.concatenate([self._remainder, chunk])
+        n = chunk.size // self.frame_len
+        self._remainder = chunk[n * self.frame_len:].copy()
+
+        energy, band_ratio, zcr = frame_features(chunk[:n * self.frame_len], self.sample_rate, self.frame_seconds)
+        if energy.size == 0:
+            return np.zeros(0, dtype=bool)
+        band_energy = energy * band_ratio
+        if self.noise_floor is None:
+            self.noise_floor = float(max(band_energy[0], 1e-10))
+
+        shaped = (band_ratio >= MIN_BAND_RATIO) & (zcr <= MAX_ZCR) & (energy >= MIN_RMS ** 2)
+        voiced = np.zeros(energy.size, dtype=bool)
+        for i in range(energy.size):
+            voiced[i] = shaped[i] and band_energy[i] > self.noise_floor * self.snr
+            self._track_noise(band_energy[i], voiced[i])
+            self._step(voiced[i])
+        return voiced
+
+    def _track_noise(self, energy, voiced):
+        if self._calibrating:
+            # Capture may begin mid-sentence: the gaps between syllables still pull the floor down
+            self._calibrating -= 1
+            self.noise_floor = max(min(self.noise_floor, energy), 1e-10)
+            return
+        if voiced:
+            return
+        rate = NOISE_FALL if energy < self.noise_floor else NOISE_RISE
+        self.noise_floor += rate * (energy - self.noise_floor)
+        self.noise_floor = max(self.noise_floor, 1e-10)
+
+    def _step(self, voiced):
+        frame_start = self.samples_seen
+        self.samples_seen += self.frame_len
+        if self.endpoint:
+            return
+
+        if voiced:
+            self._voiced_run += 1
+            if self.speech_started and self._silent_run > self.hangover_frames:
+                # Speaker resumed after a pause — learn how long their pauses are
+                pause = self._silent_run * self.frame_seconds
+                self._pause_estimate += 0.3 * (pause - self._pause_estimate)
+            self._silent_run = 0
+            if self._voiced_run >= self.onset_frames and not self.speech_started:
+                self.speech_started = True
+                self.onset_sample = frame_start - (self.onset_frames - 1) * self.frame_len
+            if self.speech_started:
+                self.in_speech = True
+            return
+
+        self._voiced_run = 0
+        if not self.speech_started:
+            return
+        self._silent_run += 1
+        if self._silent_run > self.hangover_frames:
+            self.in_speech = False
+        if self._silent_run * self.frame_seconds >= self.endpoint_seconds:
+            self.endpoint = True
+            self.endpoint_sample = self.samples_seen
@@ -0,0 +1,110 @@
+# vad_eval.py — Offline VAD endpoint evaluation over labeled WAV files
+#
+# Each WAV needs a sidecar label file with the same stem:
+#   clip.wav + clip.json  →  {"speech_end": 3.42}
+#                         or {"segments": [[0.5, 1.9], [2.3, 3.42]]}
+# The clip is streamed through the VAD in recorder-sized chunks. For each clip
+# we report when the endpoint fired relative to the true end of speech:
+#   latency   = endpoint time − labeled speech end
+#   false cut = endpoint fired before the speaker had finished
+#
+# Usage: python vad_eval.py samples/vad_labels [--chunk 0.1] [--tolerance 0.05]
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from vad import VoiceActivityDetector
+
+
+def load_label(wav_path: Path):
+    label = json.loads(wav_path.with_suffix(".json").read_text())
+    if "speech_end" in label:
+        return float(label["speech_end"])
+    return max(end for _, end in label["segments"])
+
+
+def evaluate_clip(audio, sample_rate, speech_end, chunk_seconds=0.1, tolerance=0.05):
+    """Run the VAD over one clip; returns a result dict for the report."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    vad = VoiceActivityDetector(sample_rate)
+    chunk = int(sample_rate * chunk_seconds)
+    endpoint = None
+    for start in range(0, audio.size, chunk):
+        vad.process(audio[start:start + chunk])
+        if vad.endpoint:
+            # The recorder only notices at the end of the chunk it is reading
+            endpoint = min(start + chunk, audio.size) / sample_rate
+            break
+
+    result = {"speech_end": speech_end, "endpoint": endpoint, "latency": None, "false_cut": False}
+    if endpoint is not None:
+        result["latency"] = endpoint - speech_end
+        result["false_cut"] = endpoint < speech_end - tolerance
+    return result
+
+
+def summarize(results):
+    latencies = np.array([r["latency"] for r in results if r["latency"] is not None and not r["false_cut"]])
+    total = len(results)
+    false_cuts = sum(r["false_cut"] for r in results)
+    missed = sum(r["endpoint"] is None for r in results)
+    summary = {
+        "clips": total,
+        "false_cut_rate": false_cuts / total if total else 0.0,
+        "missed_rate": missed / total if total else 0.0,
+    }
+    if latencies.size:
+        summary.update(
+            latency_mean=float(latencies.mean()),
+            latency_p50=float(np.percentile(latencies, 50)),
+            latency_p90=float(np.percentile(latencies, 90)),
+        )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate VAD endpointing on labeled WAVs")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--chunk", type=float, default=0.1, help="Capture chunk size in seconds")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Early endpoint allowed before a false cut")
+    args = parser.parse_args()
+
+    results = []
+    for wav_path in sorted(args.directory.glob("*.wav")):
+        if not wav_path.with_suffix(".json").exists():
+            print(f"⚠️ No label for {wav_path.name} — skipping.")
+            continue
+        audio, sample_rate = sf.read(wav_path, dtype="float32")
+        result = evaluate_clip(audio, sample_rate, load_label(wav_path), args.chunk, args.tolerance)
+        results.append(result)
+
+        if result["endpoint"] is None:
+            status = "❌ no endpoint"
+        elif result["false_cut"]:
+            status = f"✂️ false cut at {result['endpoint']:.2f}s"
+        else:
+            status = f"✅ +{result['latency'] * 1000:.0f} ms"
+        print(f"{wav_path.name:40s} end={result['speech_end']:.2f}s  {status}")
+
+    if not results:
+        print("❌ No labeled WAV files found.")
+        return
+
+    summary = summarize(results)
+    print("\n📊 VAD endpoint summary")
+    print(f"   ├─ Clips: {summary['clips']}")
+    if "latency_mean" in summary:
+        print(f"   ├─ Latency mean/p50/p90: {summary['latency_mean'] * 1000:.0f} / "
+              f"{summary['latency_p50'] * 1000:.0f} / {summary['latency_p90'] * 1000:.0f} ms")
+    print(f"   ├─ Missed endpoints: {summary['missed_rate']:.1%}")
+    print(f"   └─ False cut rate: {summary['false_cut_rate']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
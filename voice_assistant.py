@@ -7,10 +7,10 @@ import subprocess
 import sounddevice as sd
 import torchaudio
 import torch
-from TTS.api import TTS
-from faster_whisper import WhisperModel
 import re
 import random
+from model_registry import registry
+from llm_engine import get_engine, LLMWorkerError
 
 # === CONFIGURATION ===
 TTS_MODEL = "tts_models/multilingual/multi-dataset/xtts_v2"
@@ -33,7 +33,6 @@ def check_dependencies():
     missing = []
     if shutil.which("ffmpeg") is None: missing.append("ffmpeg")
     if shutil.which("ffplay") is None: missing.append("ffplay")
-    if not os.path.isfile(LLAMA_RUN): missing.append("llama-run binary")
     if not os.path.isfile(MODEL_PATH): missing.append("model file")
     if missing:
         print("\n🚫 Missing dependencies:", ", ".join(missing))
@@ -41,9 +40,21 @@ def check_dependencies():
 
 # === TTS SETUP ===
 os.environ["CUDA_VISIBLE_DEVICES"] = "0"
-tts = TTS(model_name=TTS_MODEL, progress_bar=False)
-tts.to("cuda")
-tts_config = tts.config
+
+def _load_tts():
+    from TTS.api import TTS
+    tts = TTS(model_name=TTS_MODEL, progress_bar=False)
+    tts.to("cuda")
+    return tts
+
+def _load_whisper_tiny():
+    from faster_whisper import WhisperModel
+    return WhisperModel(model_size, device="cuda", compute_type="int8_float16")
+
+# Models are built on first use (or warmed in the background from main())
+registry.register("voice_assistant.tts", _load_tts)
+registry.register("voice_assistant.whisper", _load_whisper_tiny)
+
 available_speakers = [
     'Claribel Dervla', 'Daisy Studious', 'Gracie Wise', 'Tammie Ema', 'Alison Dietlinde', 'Ana Florence',
     'Annmarie Nele', 'Asya Anara', 'Brenda Stern', 'Gitta Nikolina', 'Henriette Usha', 'Sofia Hellen',
@@ -64,6 +75,7 @@ def speak(text):
         text = re.sub(r'([.!?])', r'\1 <break time=300ms/>', text)
         text = re.sub(r'([,;])', r'\1 <break time=150ms/>', text)
         speaker = random.choice(available_speakers)
+        tts = registry.get("voice_assistant.tts")
         tts.tts_to_file(
             text=text.strip(),
             file_path=AUDIO_PATH,
@@ -76,13 +88,11 @@ def speak(text):
     except Exception as e:
         print(f"TTS error: {e}")
 
-# === WHISPER ===
-whisper_model = WhisperModel(model_size, device="cuda", compute_type="int8_float16")
-
 # === MAIN LOGIC ===
 def main():
     check_dependencies()
-    print("✅ Voice Assistant Ready. XTTS expressive model active.")
+    registry.warm(["voice_assistant.tts", "voice_assistant.whisper"])
+    print("✅ Voice Assistant Ready. XTTS expressive model loading in the background.")
 
     while True:
         try:
@@ -94,29 +104,23 @@ def main():
             sd.wait()
             with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_audio:
                 torchaudio.save(temp_audio.name, torch.tensor(recording).T, 16000)
-                segments, _ = whisper_model.transcribe(temp_audio.name)
+                segments, _ = registry.get("voice_assistant.whisper").transcribe(temp_audio.name)
             user_text = " ".join([seg.text for seg in segments])
             print(f"📝 You said: {user_text}")
 
             prompt = SYSTEM_PROMPT + f"\n\nUser: {user_text}\nAssistant:"
-            llama_proc = subprocess.run(
-                [LLAMA_RUN,
-                 "--model", MODEL_PATH,
-                 "--n-predict", "300",
-                 "--temp", "0.7",
-                 "--repeat_penalty", "1.1",
-                 "--top_k", "100",
-                 "--top_p", "0.95",
-                 "--ngl", N_GPU_LAYERS,
-                 prompt],
-                text=True,
-                capture_output=True
-            )
-
-            raw_output = llama_proc.stdout.strip()
-            if llama_proc.returncode != 0 or not raw_output:
+            # Persistent worker; the system prompt's KV state is cached and reused every turn
+            try:
+                raw_output = get_engine().generate(
+                    prompt, MODEL_PATH, ngl=int(N_GPU_LAYERS),
+                    prefix=SYSTEM_PROMPT, max_tokens=300, temperature=0.7,
+                    repeat_penalty=1.1, top_k=100, top_p=0.95,
+                ).strip()
+            except LLMWorkerError as e:
+                raw_output = ""
+                print(f"🔍 Worker error: {e}")
+            if not raw_output:
                 print("❌ LLM error.")
-                print(f"🔍 STDERR: {llama_proc.stderr.strip()}")
                 speak("Sorry, the assistant encountered an error. Check logs for details.")
                 continue
 
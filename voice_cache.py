@@ -0,0 +1,101 @@
+# voice_cache.py — Caches XTTS speaker conditioning latents per reference WAV (memory + disk)
+
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+
+CACHE_DIR = Path("cache/voices")
+
+_latents = {}       # content hash → (gpt_cond_latent, speaker_embedding) as numpy arrays
+_tensors = {}       # content hash → (those arrays, the same latents as tensors on the model's device)
+_file_hashes = {}   # (path, size, mtime) → content hash
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of the file contents, memoized on path, size and mtime."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        _file_hashes[key] = digest.hexdigest()
+    return _file_hashes[key]
+
+
+def _xtts(model):
+    """Return the underlying Xtts module from a TTS api object (or the module itself)."""
+    synthesizer = getattr(model, "synthesizer", None)
+    return synthesizer.tts_model if synthesizer is not None else model
+
+
+def _device(xtts):
+    import torch
+    try:
+        return next(xtts.parameters()).device
+    except (AttributeError, StopIteration):
+        return torch.device("cpu")
+
+
+def _to_numpy(value):
+    if hasattr(value, "detach"):   # A torch tensor, possibly on the GPU
+        value = value.detach().cpu().numpy()
+    return np.asarray(value)
+
+
+def load_latents(model, ref_wav_path: str):
+    """(gpt_cond_latent, speaker_embedding) as numpy arrays for a reference sample.
+
+    Latents are looked up in memory, then on disk, and only computed with the
+    XTTS encoder when the reference file's content has never been seen.
+    """
+    key = file_hash(ref_wav_path)
+    if key not in _latents:
+        cache_file = CACHE_DIR / f"{key}.npz"
+        if cache_file.exists():
+            with np.load(cache_file) as data:
+                _latents[key] = (data["gpt_cond_latent"], data["speaker_embedding"])
+            print(f"🗂️ [Voice cache] Loaded latents for {ref_wav_path}")
+        else:
+            print(f"🎛️ [Voice cache] Computing latents for {ref_wav_path}...")
+            gpt_cond_latent, speaker_embedding = _xtts(model).get_conditioning_latents(audio_path=[ref_wav_path])
+            _latents[key] = (_to_numpy(gpt_cond_latent), _to_numpy(speaker_embedding))
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix(".tmp.npz")
+            np.savez(tmp_file, gpt_cond_latent=_latents[key][0], speaker_embedding=_latents[key][1])
+            os.replace(tmp_file, cache_file)
+    return _latents[key]
+
+
+def get_voice_latents(model, ref_wav_path: str):
+    """(gpt_cond_latent, speaker_embedding) as tensors on the XTTS model's device."""
+    import torch
+    xtts = _xtts(model)
+    device = _device(xtts)
+    key = file_hash(ref_wav_path)
+    arrays = load_latents(model, ref_wav_path)
+    placed = _tensors.get(key)
+    if placed is None or placed[0] is not arrays or placed[1].device != device:
+        placed = (arrays, *(torch.from_numpy(a).to(device) for a in arrays))
+        _tensors[key] = placed
+    return placed[1], placed[2]
+
+
+def synthesize_with_latents(model, text: str, latents, language="en"):
+    """Run XTTS inference from cached latents; returns mono float32 samples."""
+    import torch
+    gpt_cond_latent, speaker_embedding = latents
+    with torch.inference_mode():
+        out = _xtts(model).inference(text, language, gpt_cond_latent, speaker_embedding)
+    wav = out["wav"]
+    if torch.is_tensor(wav):
+        wav = wav.cpu().numpy()
+    return np.asarray(wav, dtype=np.float32).reshape(-1)
+
+
+def clear_memory_cache():
+    _latents.clear()
+    _tensors.clear()
@@ -1,11 +1,9 @@
 # voice_selector.py — Lets user pick voice or clone, validate samples
 
 import os
-import torch
-import sounddevice as sd
-import soundfile as sf
-from state import set_current_speaker, set_xtts_ref_wav, set_use_xtts, get_xtts_model, get_current_speaker, get_use_xtts, get_xtts_ref_wav
+from state import set_current_speaker, set_xtts_ref_wav, set_use_xtts, get_xtts_model, get_current_speaker, get_use_xtts, get_xtts_ref_wav, get_xtts_ref_latents
 from tts_handler import speak_xtts_clone, speak_xtts_multispeaker
+from voice_cache import get_voice_latents
 
 custom_voice_wavs = {
     'Mike Boudet (clone)': 'samples/mike_boudet.wav',
@@ -28,6 +26,13 @@ available_speakers = [
     'Mike Boudet (clone)', 'Optimus Prime (clone)'
 ]
 
+def custom_voice_latents(speaker):
+    """Cached conditioning latents for a cloned speaker, or None if it has no sample."""
+    ref_path = custom_voice_wavs.get(speaker)
+    if not ref_path or not os.path.exists(ref_path):
+        return None
+    return get_voice_latents(get_xtts_model(), ref_path)
+
 def play_sample(text, speaker):
     model = get_xtts_model()
     if speaker in custom_voice_wavs:
@@ -35,7 +40,7 @@ def play_sample(text, speaker):
         if not os.path.exists(ref_path):
             print(f"❌ Missing reference sample: {ref_path}")
             return
-        speak_xtts_clone(text, model, ref_path)
+        speak_xtts_clone(text, model, ref_path, latents=custom_voice_latents(speaker))
     else:
         speak_xtts_multispeaker(text, speaker, model)
 
@@ -89,7 +94,7 @@ def test_voice():
         if not ref_wav or not os.path.exists(ref_wav):
             print(f"❌ Cloned reference sample missing: {ref_wav}")
             return
-        speak_xtts_clone("This is how I sound using a cloned voice.", model, ref_wav)
+        speak_xtts_clone("This is how I sound using a cloned voice.", model, ref_wav, latents=get_xtts_ref_latents())
     else:
         speak_xtts_multispeaker("This is how I sound using a multispeaker voice.", speaker, model)
 
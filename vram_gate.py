@@ -0,0 +1,134 @@
+# vram_gate.py — Admission gate for VRAM: block until a reservation fits, woken by releases
+#
+# A stage that is about to allocate GPU memory (e.g. starting the LLM worker)
+# reserves the amount first. If it does not fit, the stage sleeps on a
+# condition variable until another stage releases memory or the deadline
+# passes, instead of sleeping and re-polling on a fixed schedule. On timeout
+# the caller gets None and runs its CPU plan.
+#
+# Free memory comes from a probe (real telemetry, or a simulated allocator in
+# tests). Reservations that have been granted but not yet allocated are
+# subtracted from it so two stages cannot be admitted into the same space;
+# once the stage has allocated, settle() hands the accounting back to the probe.
+# Without a probe the gate accounts against a fixed capacity.
+
+import threading
+import time
+
+POLL_INTERVAL = 0.5   # Re-probe at this rate for memory freed by other processes
+
+
+class Reservation:
+    __slots__ = ("gate", "name", "mb", "settled", "released")
+
+    def __init__(self, gate, name, mb):
+        self.gate = gate
+        self.name = name
+        self.mb = mb
+        self.settled = False
+        self.released = False
+
+    def settle(self):
+        self.gate.settle(self)
+
+    def release(self):
+        self.gate.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Leaving the block means the stage has allocated (or failed to)
+        self.gate.settle(self)
+
+
+class VRAMGate:
+    def __init__(self, probe_free_mb=None, capacity_mb=None, poll_interval=POLL_INTERVAL,
+                 clock=time.monotonic):
+        if probe_free_mb is None and capacity_mb is None:
+            raise ValueError("VRAMGate needs a free-memory probe or a fixed capacity")
+        self.probe_free_mb = probe_free_mb
+        self.capacity_mb = capacity_mb
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._reservations = []
+        self.waits = 0
+        self.timeouts = 0
+
+    def _held_mb(self):
+        if self.probe_free_mb is not None:
+            return sum(r.mb for r in self._reservations if not r.settled)
+        return sum(r.mb for r in self._reservations)
+
+    def available_mb(self):
+        with self._cond:
+            return self._available()
+
+    def _available(self):
+        if self.probe_free_mb is not None:
+            free = self.probe_free_mb()
+            if self.capacity_mb is not None:
+                free = min(free, self.capacity_mb)
+        else:
+            free = self.capacity_mb
+        return free - self._held_mb()
+
+    def reserve(self, mb, deadline=None, timeout=None, name=None):
+        """Block until `mb` can be reserved; None if `deadline` (or `timeout` seconds) passes first."""
+        if deadline is None and timeout is not None:
+            deadline = self.clock() + timeout
+        with self._cond:
+            waited = False
+            while self._available() < mb:
+                remaining = None if deadline is None else deadline - self.clock()
+                if remaining is not None and remaining <= 0:
+                    self.timeouts += 1
+                    return None
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                wait = self.poll_interval if remaining is None else min(remaining, self.poll_interval)
+                self._cond.wait(wait)
+            reservation = Reservation(self, name, mb)
+            self._reservations.append(reservation)
+            return reservation
+
+    def grow(self, reservation, mb):
+        """Enlarge a reservation to at most `mb` without waiting; returns the new size."""
+        with self._cond:
+            extra = min(mb - reservation.mb, self._available())
+            if extra > 0 and not reservation.released:
+                reservation.mb += extra
+            return reservation.mb
+
+    def settle(self, reservation):
+        """The stage has allocated; from now on the probe sees the memory itself."""
+        with self._cond:
+            reservation.settled = True
+            if self.probe_free_mb is not None:
+                self._drop(reservation)
+
+    def release(self, reservation=None):
+        """Give a reservation back, or just signal that memory was freed elsewhere."""
+        with self._cond:
+            if reservation is not None:
+                reservation.released = True
+                self._drop(reservation)
+            self._cond.notify_all()
+
+    def _drop(self, reservation):
+        if reservation in self._reservations:
+            self._reservations.remove(reservation)
+            self._cond.notify_all()
+
+
+_gate = None
+
+
+def get_vram_gate():
+    global _gate
+    if _gate is None:
+        from gpu_manager import get_fresh_free_gpu_mem_mb
+        _gate = VRAMGate(probe_free_mb=get_fresh_free_gpu_mem_mb)
+    return _gate
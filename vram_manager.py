@@ -0,0 +1,312 @@
+# vram_manager.py — Decides which models live on the GPU before each pipeline stage
+#
+# Whisper, XTTS and the LLM worker share one 8GB card. Each model is registered
+# with its VRAM footprint and two movers (to GPU / to CPU). Before a stage runs,
+# acquire() makes its model resident, evicting the least recently used,
+# lowest-priority models that are not in use until it fits the budget. If it
+# cannot fit, the model's CPU mover makes it runnable on the CPU and the stage
+# is told it runs there. Moves happen outside the bookkeeping lock, so a long
+# upload never holds back a stage whose model is already resident. Every
+# decision is counted and logged so it can be inspected afterwards.
+
+import collections
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUDGET_MB = 8192 - 700   # 3050 8GB minus CUDA context / desktop overhead
+
+# Rough resident sizes on the 3050; refined by measurement when a probe is given.
+# They fit the budget together, so a normal turn loads and evicts nothing.
+FOOTPRINTS_MB = {
+    "whisper": 1600,   # faster-whisper medium, float16
+    "xtts": 2300,      # XTTS v2 weights + inference workspace
+    "llm": 3300,       # The layer planner offloads what Whisper and XTTS leave free
+}
+PRIORITIES = {"whisper": 1, "xtts": 2, "llm": 2}   # Higher stays resident longer
+
+
+class ResidentModel:
+    __slots__ = ("name", "footprint_mb", "priority", "to_gpu", "to_cpu", "run_on_cpu", "is_resident",
+                 "on_gpu", "last_used", "in_use")
+
+    def __init__(self, name, footprint_mb, to_gpu, to_cpu, priority=0, is_resident=None, run_on_cpu=None):
+        self.name = name
+        self.footprint_mb = footprint_mb
+        self.priority = priority
+        self.to_gpu = to_gpu
+        self.to_cpu = to_cpu
+        self.run_on_cpu = run_on_cpu     # Optional: makes the model usable on the CPU when it cannot fit
+        self.is_resident = is_resident   # Optional probe for moves made outside the manager
+        self.on_gpu = False
+        self.last_used = 0.0
+        self.in_use = 0
+
+
+class ResidencyManager:
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB, probe_free_mb=None, clock=time.monotonic, history=200,
+                 on_release=None):
+        self.budget_mb = budget_mb
+        self.probe_free_mb = probe_free_mb   # Optional: measures real footprints on load
+        self.on_release = on_release         # Optional: called after a model leaves the GPU
+        self.clock = clock
+        self._models = {}
+        self._lock = threading.RLock()     # Bookkeeping only; never held across a move
+        self._moving = threading.Lock()    # One load or eviction at a time
+        self.decisions = collections.deque(maxlen=history)
+        self.counters = collections.Counter()
+
+    def register(self, name, footprint_mb, to_gpu, to_cpu, priority=0, is_resident=None, on_gpu=False,
+                 run_on_cpu=None):
+        with self._lock:
+            model = ResidentModel(name, footprint_mb, to_gpu, to_cpu, priority, is_resident, run_on_cpu)
+            model.on_gpu = on_gpu
+            self._models[name] = model
+
+    def _refresh(self):
+        # Background warm-up loads models straight onto the GPU and the LLM worker
+        # can exit on its own, so trust the probes over our own bookkeeping
+        for model in self._models.values():
+            if model.is_resident is not None:
+                try:
+                    model.on_gpu = bool(model.is_resident())
+                except Exception:
+                    pass
+
+    @property
+    def used_mb(self):
+        return sum(m.footprint_mb for m in self._models.values() if m.on_gpu)
+
+    def resident(self):
+        return sorted(m.name for m in self._models.values() if m.on_gpu)
+
+    def _record(self, action, name, **details):
+        self.counters[action] += 1
+        entry = dict(time=self.clock(), action=action, model=name, used_mb=self.used_mb, **details)
+        self.decisions.append(entry)
+        print(f"[VRAM] {action}: {name} | resident {self.resident()} | {entry['used_mb']:.0f}/{self.budget_mb:.0f} MB")
+
+    def _victims(self, needed_mb, keep):
+        """Models to evict (cheapest first) so `needed_mb` fits, or None if impossible."""
+        free = self.budget_mb - self.used_mb
+        if free >= needed_mb:
+            return []
+        candidates = sorted(
+            (m for m in self._models.values() if m.on_gpu and not m.in_use and m.name != keep),
+            key=lambda m: (m.priority, m.last_used),
+        )
+        victims = []
+        for model in candidates:
+            victims.append(model)
+            free += model.footprint_mb
+            if free >= needed_mb:
+                return victims
+        return None
+
+    def _hit(self, name, hold):
+        """Returns "cuda" if `name` is already resident (in use from now with `hold`); caller holds _lock."""
+        self._refresh()
+        model = self._models[name]
+        model.last_used = self.clock()
+        if not model.on_gpu:
+            return None
+        self.counters["hit"] += 1
+        if hold:
+            model.in_use += 1
+        return "cuda"
+
+    def acquire(self, name, hold=False):
+        """Make `name` resident on the GPU; returns "cuda", or "cpu" if it cannot fit.
+
+        On "cpu" the model's run_on_cpu mover has made it usable there. With
+        `hold`, the model is marked in use in the same step (see use()).
+        """
+        with self._lock:
+            device = self._hit(name, hold)
+        if device:
+            return device
+
+        with self._moving:
+            with self._lock:
+                device = self._hit(name, hold)   # Loaded while this call waited its turn
+                if device:
+                    return device
+                model = self._models[name]
+                victims = self._victims(model.footprint_mb, keep=name)
+                if victims is None:
+                    self._record("cpu_fallback", name, needed_mb=model.footprint_mb)
+                for victim in victims or ():
+                    victim.on_gpu = False   # A stage asking for it now waits for the move
+                    self._record("evict", victim.name, for_model=name, freed_mb=victim.footprint_mb)
+
+            if victims is None:
+                if model.run_on_cpu:
+                    model.run_on_cpu()
+                device = "cpu"
+            else:
+                for victim in victims:
+                    victim.to_cpu()
+                if victims and self.on_release:
+                    self.on_release()
+                before = self.probe_free_mb() if self.probe_free_mb else None
+                model.to_gpu()
+                if before is not None:
+                    measured = before - self.probe_free_mb()
+                    if measured > 0:
+                        model.footprint_mb = measured
+                device = "cuda"
+
+            with self._lock:
+                if device == "cuda":
+                    model.on_gpu = True
+                    self._record("load", name, footprint_mb=model.footprint_mb)
+                if hold:
+                    model.in_use += 1
+            return device
+
+    def release(self, name):
+        """Move a model off the GPU now (e.g. on shutdown or model switch)."""
+        with self._moving:
+            with self._lock:
+                model = self._models[name]
+                if not model.on_gpu or model.in_use:
+                    return
+                model.on_gpu = False
+                self._record("evict", name, for_model=None, freed_mb=model.footprint_mb)
+            model.to_cpu()
+            if self.on_release:
+                self.on_release()
+
+    @contextmanager
+    def use(self, name):
+        """Keep `name` resident for the duration of a stage; yields the device it runs on."""
+        device = self.acquire(name, hold=True)
+        try:
+            yield device
+        finally:
+            with self._lock:
+                self._models[name].in_use -= 1
+                self._models[name].last_used = self.clock()
+
+    def metrics(self):
+        return {
+            "budget_mb": self.budget_mb,
+            "used_mb": self.used_mb,
+            "resident": self.resident(),
+            "hits": self.counters["hit"],
+            "loads": self.counters["load"],
+            "evictions": self.counters["evict"],
+            "cpu_fallbacks": self.counters["cpu_fallback"],
+        }
+
+
+# --- Movers for the assistant's models ---------------------------------------
+
+def _pin_module(module):
+    """Move a torch module to page-locked CPU memory so the next upload is fast."""
+    module.to("cpu")
+    for param in module.parameters():
+        param.data = param.data.pin_memory()
+    for buf in module.buffers():
+        buf.data = buf.data.pin_memory()
+
+
+def _xtts_to_gpu():
+    from model_registry import registry
+    model = registry.peek("xtts")
+    if model is None:
+        registry.get("xtts")   # Loader places it on the GPU
+    else:
+        model.to("cuda")
+
+
+def _xtts_to_cpu():
+    from model_registry import registry
+    model = registry.peek("xtts")
+    if model is not None:
+        _pin_module(model)
+
+
+def _xtts_on_cpu():
+    from model_registry import registry
+    from state import load_xtts
+    model = registry.get("xtts", loader=lambda: load_xtts("cpu"))
+    if next(model.parameters()).is_cuda:
+        _pin_module(model)   # A warm-up had put it on the GPU
+
+
+def _whisper_to_gpu():
+    from model_registry import registry
+    from transcriber import load_whisper
+    model = registry.peek("whisper")
+    if model is not None and model.model.device != "cuda":
+        registry.unload("whisper")   # Replace the CPU fallback copy
+        model = None
+    if model is None:
+        registry.get("whisper", loader=lambda: load_whisper("cuda"))
+    elif not model.model.model_is_loaded:
+        model.model.load_model()
+
+
+def _whisper_to_cpu():
+    # CTranslate2 can park its weights in host memory and reload them on demand
+    from model_registry import registry
+    model = registry.peek("whisper")
+    if model is not None and model.model.model_is_loaded:
+        model.model.unload_model(to_cpu=True)
+
+
+def _whisper_on_cpu():
+    # A CTranslate2 model cannot change device, so a CPU copy runs until Whisper fits again
+    from model_registry import registry
+    from transcriber import load_whisper
+    model = registry.get("whisper", loader=lambda: load_whisper("cpu"))
+    if model.model.device == "cuda":
+        registry.unload("whisper")
+        registry.get("whisper", loader=lambda: load_whisper("cpu"))
+
+
+def _xtts_resident():
+    from model_registry import registry
+    model = registry.peek("xtts")
+    return model is not None and next(model.parameters()).is_cuda
+
+
+def _whisper_resident():
+    from model_registry import registry
+    model = registry.peek("whisper")
+    return model is not None and model.model.device == "cuda" and model.model.model_is_loaded
+
+
+def _llm_to_gpu():
+    pass   # The worker uploads its layers when it (re)starts on the next prompt
+
+
+def _llm_to_cpu():
+    from llm_engine import get_engine
+    get_engine().shutdown()
+
+
+def _llm_resident():
+    from llm_engine import get_engine
+    return get_engine().is_alive()
+
+
+_manager = None
+
+
+def get_residency_manager():
+    global _manager
+    if _manager is None:
+        from gpu_manager import get_fresh_free_gpu_mem_mb
+        from vram_gate import get_vram_gate
+        _manager = ResidencyManager(DEFAULT_BUDGET_MB, probe_free_mb=get_fresh_free_gpu_mem_mb,
+                                    on_release=get_vram_gate().release)
+        _manager.register("whisper", FOOTPRINTS_MB["whisper"], _whisper_to_gpu, _whisper_to_cpu,
+                          PRIORITIES["whisper"], _whisper_resident, run_on_cpu=_whisper_on_cpu)
+        _manager.register("xtts", FOOTPRINTS_MB["xtts"], _xtts_to_gpu, _xtts_to_cpu,
+                          PRIORITIES["xtts"], _xtts_resident, run_on_cpu=_xtts_on_cpu)
+        # No CPU mover: a worker started without room gets fewer layers from the layer planner
+        _manager.register("llm", FOOTPRINTS_MB["llm"], _llm_to_gpu, _llm_to_cpu,
+                          PRIORITIES["llm"], _llm_resident)
+    return _manager
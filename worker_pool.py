@@ -0,0 +1,204 @@
+# worker_pool.py — Bounded thread pools that keep each engine's blocking calls off the event loop
+#
+# Every engine (Whisper, the LLM worker, XTTS) gets its own small pool, so a
+# transcription never waits behind a synthesis. A pool runs at most `workers`
+# calls at once and lets at most `queue_limit` more callers wait for a slot;
+# anyone beyond that is turned away with PoolBusy at once instead of piling
+# up behind a busy GPU.
+#
+# The LLM worker serves one model at a time. ModelSwap queues replies by
+# model in front of its pool: replies on the served model borrow it, and a
+# reply on another one waits until the last borrower is done, then the worker
+# swaps and every reply waiting on the new model goes in together.
+
+import asyncio
+import collections
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from pipeline import pump
+
+WORKERS      = 1    # Calls an engine runs at once (one GPU, one LLM worker)
+QUEUE_LIMIT  = 4    # Callers allowed to wait for a slot
+STREAM_QUEUE = 64   # Streamed items buffered ahead of a slow consumer
+SWAP_BATCH   = 4    # Replies on the served model that may still go ahead of a waiting swap
+
+_END = object()
+
+
+class PoolBusy(RuntimeError):
+    """The pool is running and its wait queue is full."""
+
+
+class WorkerPool:
+    def __init__(self, name, workers=WORKERS, queue_limit=QUEUE_LIMIT):
+        self.name = name
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-pool")
+        self._slots = asyncio.Semaphore(workers)
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self, timeout=None, admitted=False):
+        """Hold one of the pool's slots.
+
+        Raises PoolBusy if the wait queue is full, or if no slot frees up
+        within `timeout` seconds (a session's latency budget). A request
+        that was `admitted` by an earlier slot (a reply spoken a sentence at
+        a time) skips both checks: once its response has started it waits
+        its turn instead of failing halfway.
+        """
+        if admitted:
+            timeout = None
+        elif self._slots.locked() and self.waiting >= self.queue_limit:
+            self.rejected += 1
+            raise PoolBusy(f"{self.name} is busy ({self.running} running, {self.waiting} waiting)")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise PoolBusy(f"{self.name} was not free within {timeout:.1f}s")
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    async def call(self, fn, *args, **kwargs):
+        """Run `fn` on the pool's threads; the caller must hold a slot."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def run(self, fn, *args, timeout=None, **kwargs):
+        """Wait for a slot (at most `timeout` seconds) and run `fn` in it."""
+        async with self.slot(timeout):
+            return await self.call(fn, *args, **kwargs)
+
+    async def stream(self, iterable, queue_size=STREAM_QUEUE):
+        """Iterate a blocking iterable on the pool's threads; the caller must hold a slot.
+
+        At most `queue_size` items are buffered: a consumer that falls behind
+        pauses the producer. Leaving the loop early closes the iterable.
+        """
+        items = asyncio.Queue(queue_size)
+
+        async def produce():
+            try:
+                await pump(iterable, items, executor=self._executor)
+            except Exception as e:
+                await items.put(e)
+            await items.put(_END)
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                item = await items.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+    def stats(self):
+        return {"workers": self.workers, "running": self.running, "waiting": self.waiting,
+                "completed": self.completed, "rejected": self.rejected}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ModelSwap:
+    """Reference-counted turns on a one-model engine, grouped by model.
+
+    Swapping the LLM worker's model is a full reload, so replies are not
+    taken strictly in arrival order: replies on the model in use go ahead of
+    a waiting swap (at most `batch` of them, so the swap is never starved),
+    and the replies waiting on the next model are admitted together.
+    """
+
+    def __init__(self, name="llm", queue_limit=QUEUE_LIMIT, batch=SWAP_BATCH):
+        self.name = name
+        self.queue_limit = queue_limit
+        self.batch = batch
+        self.model = None     # Model the current borrowers use (the last one used once they are done)
+        self.refs = 0         # Borrowers of self.model
+        self.swaps = 0
+        self.rejected = 0
+        self._ahead = 0       # Borrowers admitted past the oldest waiting swap
+        self._waiters = collections.deque()   # [model, future], oldest first
+
+    @asynccontextmanager
+    async def borrow(self, model_path, timeout=None):
+        """Use `model_path` on the engine; raises PoolBusy like WorkerPool.slot."""
+        model = os.path.realpath(model_path)
+        if self._may_enter(model):
+            self._enter(model)
+        else:
+            if len(self._waiters) >= self.queue_limit:
+                self.rejected += 1
+                raise PoolBusy(f"{self.name} is busy ({len(self._waiters)} waiting to swap models)")
+            waiter = [model, asyncio.get_running_loop().create_future()]
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter[1]), timeout)
+            except BaseException as e:
+                if waiter[1].done():
+                    self._release()   # Admitted just as the wait ended
+                else:
+                    waiter[1].cancel()
+                    self._waiters.remove(waiter)
+                    self._admit()
+                if isinstance(e, asyncio.TimeoutError):
+                    self.rejected += 1
+                    raise PoolBusy(f"{self.name} did not swap to {os.path.basename(model)} within {timeout:.1f}s")
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _may_enter(self, model):
+        if not self._waiters:
+            return self.refs == 0 or model == self.model
+        return model == self.model and self.refs > 0 and self._ahead < self.batch
+
+    def _enter(self, model):
+        if self._waiters:
+            self._ahead += 1
+        if model != self.model:
+            if self.model is not None:
+                self.swaps += 1
+            self.model = model
+        self.refs += 1
+
+    def _release(self):
+        self.refs -= 1
+        self._admit()
+
+    def _admit(self):
+        if self.refs or not self._waiters:
+            return
+        model = self._waiters[0][0]
+        for waiter in [w for w in self._waiters if w[0] == model]:
+            self._waiters.remove(waiter)
+            self._enter(model)
+            waiter[1].set_result(None)
+        self._ahead = 0   # The batch itself does not count against the next swap
+
+    def stats(self):
+        return {"model": os.path.basename(self.model) if self.model else None, "borrowers": self.refs,
+                "waiting": len(self._waiters), "swaps": self.swaps, "rejected": self.rejected}
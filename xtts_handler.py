@@ -1,23 +1,19 @@
 # xtts_handler.py
 
-from TTS.api import TTS
-import torch
 import os
+from state import get_xtts_model
 
 # Set your cloned reference voice path here
 CLONE_REF_PATH = "samples/optimus_prime.wav"
 
-# Load XTTS model once globally
-print("🚀 Loading XTTS model...")
-xtts_model = TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2")
-xtts_model.to("cuda" if torch.cuda.is_available() else "cpu")
-print("✅ XTTS loaded.")
+# XTTS is shared through the model registry and loaded on first use
 
 # Speaker setup (change this if you add toggling later)
 use_xtts_clone = True  # default to cloning
 current_voice = "Damien Black"
 
 def speak_xtts(text: str):
+    xtts_model = get_xtts_model()
     if use_xtts_clone:
         print(f"🎙️  Voice cloning from: {CLONE_REF_PATH}")
         xtts_model.tts_to_file(
@@ -1,5 +1,6 @@
-from TTS.api import TTS
-import os
+# xtts_test.py — Speak a line in the cloned Optimus Prime voice through the resident daemon
+
+from arc_client import speak
 
 # === CONFIGURATION ===
 # Path to your Optimus Prime voice sample
@@ -12,18 +13,7 @@ TEXT = "Autobots, roll out. The fate of humanity depends on your courage."
 OUTPUT_WAV = "output/optimus_output.wav"
 
 # === RUN TTS ===
-print("Loading XTTS model...")
-tts = TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2", gpu=True)
-
-# Ensure output directory exists
-os.makedirs(os.path.dirname(OUTPUT_WAV), exist_ok=True)
-
-print("Synthesizing...")
-tts.tts_to_file(
-    text=TEXT,
-    speaker_wav=OPTIMUS_WAV,
-    language="en",
-    file_path=OUTPUT_WAV
-)
-
-print(f"✅ Done. Output saved to: {OUTPUT_WAV}")
+if __name__ == "__main__":
+    print("Synthesizing through the assistant daemon (started if needed)...")
+    reply = speak(TEXT, OUTPUT_WAV, ref_wav=OPTIMUS_WAV, session="optimus")
+    print(f"✅ Done. Output saved to: {reply['path']}")